@@ -0,0 +1,31 @@
+"""Index item names in code point order for prefix searches
+
+Revision ID: 4b7e2f9c1a3d
+Revises: 1ce4a4ef6edb
+Create Date: 2026-10-18 09:12:44.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4b7e2f9c1a3d'
+down_revision: Union[str, None] = '1ce4a4ef6edb'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # GET /items/?name_prefix= compares name COLLATE "C" on Postgres; ix_items_name follows the
+    # database's collation and cannot serve that range. SQLite's ix_items_name already does.
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute('CREATE INDEX ix_items_name_c ON items (name COLLATE "C")')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name == "postgresql":
+        op.drop_index('ix_items_name_c', table_name='items')
@@ -0,0 +1,356 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import AsyncIterator, Awaitable, Callable, List, Optional, Set
+
+from redis.exceptions import RedisError
+
+from assistant.llm_client import chat_completion
+from cache import MISSING, LRUCache
+from redis_client import redis_client
+
+logger = logging.getLogger(__name__)
+
+# Idle sessions are forgotten after this many seconds
+CONVERSATION_TTL = int(os.getenv("CONVERSATION_TTL", 86400))
+# Prompt tokens (system prompt, summary, history and the new message) sent per call
+CONVERSATION_TOKEN_BUDGET = int(os.getenv("CONVERSATION_TOKEN_BUDGET", 2000))
+# Once the unsummarized turns pass this many tokens, older ones are folded into the summary
+CONVERSATION_SUMMARY_THRESHOLD = int(os.getenv("CONVERSATION_SUMMARY_THRESHOLD", 1500))
+# Most recent turns always kept verbatim
+CONVERSATION_KEEP_TURNS = int(os.getenv("CONVERSATION_KEEP_TURNS", 6))
+CONVERSATION_LOCAL_SIZE = int(os.getenv("CONVERSATION_LOCAL_SIZE", 1024))
+# In-process copies are short-lived so another replica's turns show up quickly
+CONVERSATION_LOCAL_TTL = float(os.getenv("CONVERSATION_LOCAL_TTL", 5))
+CONVERSATION_REDIS_RETRY = float(os.getenv("CONVERSATION_REDIS_RETRY", 30))
+SUMMARY_MODEL = os.getenv("CONVERSATION_SUMMARY_MODEL", "gpt-3.5-turbo")
+SUMMARY_PROMPT = (
+    "Update the summary of a conversation between a user and an assistant with the new turns. "
+    "Keep names, facts, decisions and open questions; drop small talk. Answer with the summary only."
+)
+
+KEY_PREFIX = "conversation:"
+
+# Tokens per message beyond its text (role and separators), as counted by OpenAI chat models
+MESSAGE_OVERHEAD = 4
+
+
+def count_tokens(text: str) -> int:
+    """Estimate: about four characters per token for English text.
+
+    Close enough for budgeting; an exact tokenizer would be a dependency
+    and several milliseconds per long history.
+    """
+    return len(text) // 4 + 1
+
+
+def message_tokens(message: dict) -> int:
+    return count_tokens(message["content"]) + MESSAGE_OVERHEAD
+
+
+async def llm_summarize(summary: str, turns: List[dict]) -> str:
+    transcript = "\n".join(f"{turn['role']}: {turn['content']}" for turn in turns)
+    return await chat_completion(
+        SUMMARY_MODEL,
+        [
+            {"role": "system", "content": SUMMARY_PROMPT},
+            {"role": "user", "content": f"Summary so far:\n{summary or '(none)'}\n\nNew turns:\n{transcript}"},
+        ],
+        agent="summary",
+    )
+
+
+class Conversation:
+    def __init__(self, summary: str = "", turns: Optional[List[dict]] = None):
+        self.summary = summary
+        self.turns = turns or []
+
+    def tokens(self) -> int:
+        return sum(message_tokens(turn) for turn in self.turns)
+
+    def as_dict(self) -> dict:
+        return {"summary": self.summary, "turns": self.turns, "tokens": self.tokens()}
+
+
+class ConversationStats:
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.local_hits = 0
+        self.redis_hits = 0
+        self.new_sessions = 0
+        self.turns = 0
+        self.trimmed_turns = 0
+        self.summaries = 0
+        self.summary_errors = 0
+        self.summary_seconds = 0.0
+        self.prompts = 0
+        self.prompt_tokens = 0
+        self.max_prompt_tokens = 0
+        self.errors = 0
+
+    def as_dict(self) -> dict:
+        return {
+            "local_hits": self.local_hits,
+            "redis_hits": self.redis_hits,
+            "new_sessions": self.new_sessions,
+            "turns": self.turns,
+            "trimmed_turns": self.trimmed_turns,
+            "summaries": self.summaries,
+            "summary_errors": self.summary_errors,
+            "avg_summary_ms": round(self.summary_seconds / self.summaries * 1000, 3) if self.summaries else 0.0,
+            "prompts": self.prompts,
+            "avg_prompt_tokens": round(self.prompt_tokens / self.prompts, 1) if self.prompts else 0.0,
+            "max_prompt_tokens": self.max_prompt_tokens,
+            "errors": self.errors,
+        }
+
+
+class ConversationStore:
+    """Per-session chat history: in-process LRU in front of Redis.
+
+    Each session is a rolling summary plus the recent turns. Prompts are cut
+    to a token budget, newest turns first; once the history passes a
+    threshold, the older turns are summarized in the background and dropped,
+    so neither Redis nor the prompt grows with the length of the session.
+
+    Redis keeps the turns in a list (appends are atomic RPUSHes, safe across
+    replicas) and the summary in its own key. Without Redis the in-process
+    copy is the only one and lives as long as the session TTL.
+    """
+
+    def __init__(
+        self,
+        redis=redis_client,
+        ttl: int = CONVERSATION_TTL,
+        token_budget: int = CONVERSATION_TOKEN_BUDGET,
+        summary_threshold: int = CONVERSATION_SUMMARY_THRESHOLD,
+        keep_turns: int = CONVERSATION_KEEP_TURNS,
+        local_size: int = CONVERSATION_LOCAL_SIZE,
+        local_ttl: float = CONVERSATION_LOCAL_TTL,
+        summarize: Callable[[str, List[dict]], Awaitable[str]] = llm_summarize,
+    ):
+        self.redis = redis
+        self.ttl = ttl
+        self.token_budget = token_budget
+        self.summary_threshold = summary_threshold
+        self.keep_turns = keep_turns
+        self.local_ttl = local_ttl
+        self.summarize = summarize
+        self.local = LRUCache(local_size, ttl=local_ttl)
+        self.stats = ConversationStats()
+        self._summarizing: Set[str] = set()
+        self._tasks: Set[asyncio.Task] = set()
+        self._redis_retry_at = 0.0
+
+    async def load(self, session_id: str) -> Conversation:
+        conversation = self.local.get(session_id)
+        if conversation is not MISSING:
+            self.stats.local_hits += 1
+            return conversation
+
+        conversation = await self._redis_load(session_id)
+        if conversation is None:
+            conversation = Conversation()
+            self.stats.new_sessions += 1
+        else:
+            self.stats.redis_hits += 1
+        self._store_local(session_id, conversation)
+        return conversation
+
+    async def messages(self, session_id: str, system_prompt: str, prompt: str) -> List[dict]:
+        """System prompt, summary, as many recent turns as the budget allows, then the new message"""
+        conversation = await self.load(session_id)
+        head = [{"role": "system", "content": system_prompt}]
+        if conversation.summary:
+            head.append({"role": "system", "content": f"Summary of the conversation so far: {conversation.summary}"})
+        message = {"role": "user", "content": prompt}
+
+        used = sum(message_tokens(m) for m in head) + message_tokens(message)
+        recent = []
+        for turn in reversed(conversation.turns):
+            used += message_tokens(turn)
+            if used > self.token_budget:
+                used -= message_tokens(turn)
+                break
+            recent.append(turn)
+        recent.reverse()
+
+        self.stats.trimmed_turns += len(conversation.turns) - len(recent)
+        self.stats.prompts += 1
+        self.stats.prompt_tokens += used
+        self.stats.max_prompt_tokens = max(self.stats.max_prompt_tokens, used)
+        return head + recent + [message]
+
+    async def append(self, session_id: str, prompt: str, answer: str):
+        turns = [{"role": "user", "content": prompt}, {"role": "assistant", "content": answer}]
+        conversation = await self.load(session_id)
+        conversation.turns.extend(turns)
+        self.stats.turns += 1
+        self._store_local(session_id, conversation)
+        await self._redis_append(session_id, turns)
+
+        if conversation.tokens() > self.summary_threshold and len(conversation.turns) > self.keep_turns:
+            self._schedule_summary(session_id)
+
+    async def complete(
+        self,
+        session_id: str,
+        system_prompt: str,
+        prompt: str,
+        compute: Callable[[List[dict]], Awaitable[str]],
+    ) -> str:
+        """Answer with the session's context, then record the exchange"""
+        answer = await compute(await self.messages(session_id, system_prompt, prompt))
+        await self.append(session_id, prompt, answer)
+        return answer
+
+    async def stream(
+        self,
+        session_id: str,
+        system_prompt: str,
+        prompt: str,
+        open_stream: Callable[[List[dict]], AsyncIterator[str]],
+    ) -> AsyncIterator[str]:
+        parts = []
+        async for token in open_stream(await self.messages(session_id, system_prompt, prompt)):
+            parts.append(token)
+            yield token
+        # A reply cut off midway is not part of the conversation
+        await self.append(session_id, prompt, "".join(parts))
+
+    async def delete(self, session_id: str):
+        self.local.delete(session_id)
+        if not self._redis_available():
+            return
+        try:
+            await self.redis.delete(self._turns_key(session_id), self._summary_key(session_id))
+        except (RedisError, OSError) as e:
+            self._redis_failed(e)
+
+    def _schedule_summary(self, session_id: str):
+        # One summary per session at a time on this process; Redis guards across replicas
+        if session_id in self._summarizing:
+            return
+        self._summarizing.add(session_id)
+        task = asyncio.create_task(self._summarize(session_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _summarize(self, session_id: str):
+        lock_key = f"{KEY_PREFIX}{session_id}:summarizing"
+        locked = False
+        try:
+            if self._redis_available():
+                try:
+                    locked = await self.redis.set(lock_key, "1", nx=True, ex=60)
+                except (RedisError, OSError) as e:
+                    self._redis_failed(e)
+                else:
+                    if not locked:
+                        return
+
+            # Under the lock Redis is the authority; the local copy may miss another replica's turns
+            conversation = (await self._redis_load(session_id) if locked else None) or await self.load(session_id)
+            folded = conversation.turns[:-self.keep_turns]
+            if not folded:
+                return
+            start = time.perf_counter()
+            summary = await self.summarize(conversation.summary, folded)
+            self.stats.summaries += 1
+            self.stats.summary_seconds += time.perf_counter() - start
+
+            # Turns appended meanwhile sit after the folded ones, so dropping from the front is safe
+            if locked:
+                await self._redis_fold(session_id, summary, len(folded))
+                self.local.delete(session_id)
+            else:
+                conversation.summary = summary
+                del conversation.turns[:len(folded)]
+                self._store_local(session_id, conversation)
+        except Exception as e:
+            self.stats.summary_errors += 1
+            logger.warning("Summarizing conversation %s failed: %s", session_id, e)
+        finally:
+            self._summarizing.discard(session_id)
+            if locked:
+                try:
+                    await self.redis.delete(lock_key)
+                except (RedisError, OSError):
+                    pass
+
+    async def drain(self):
+        """Wait for background summaries, e.g. in tests and benchmarks"""
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+    async def aclose(self):
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+    def _store_local(self, session_id: str, conversation: Conversation):
+        ttl = self.local_ttl if self._redis_available() else self.ttl
+        self.local.set(session_id, conversation, ttl=ttl)
+
+    def _turns_key(self, session_id: str) -> str:
+        return f"{KEY_PREFIX}{session_id}:turns"
+
+    def _summary_key(self, session_id: str) -> str:
+        return f"{KEY_PREFIX}{session_id}:summary"
+
+    def _redis_available(self) -> bool:
+        return self.redis is not None and time.monotonic() >= self._redis_retry_at
+
+    def _redis_failed(self, error: Exception):
+        self.stats.errors += 1
+        self._redis_retry_at = time.monotonic() + CONVERSATION_REDIS_RETRY
+        logger.warning("Conversation store Redis tier unavailable: %s", error)
+
+    async def _redis_load(self, session_id: str) -> Optional[Conversation]:
+        if not self._redis_available():
+            return None
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.get(self._summary_key(session_id))
+            pipe.lrange(self._turns_key(session_id), 0, -1)
+            summary, turns = await pipe.execute()
+        except (RedisError, OSError) as e:
+            self._redis_failed(e)
+            return None
+        if summary is None and not turns:
+            return None
+        return Conversation(summary or "", [json.loads(turn) for turn in turns])
+
+    async def _redis_append(self, session_id: str, turns: List[dict]):
+        if not self._redis_available():
+            return
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.rpush(self._turns_key(session_id), *(json.dumps(turn) for turn in turns))
+            pipe.expire(self._turns_key(session_id), self.ttl)
+            pipe.expire(self._summary_key(session_id), self.ttl)
+            await pipe.execute()
+        except (RedisError, OSError) as e:
+            self._redis_failed(e)
+
+    async def _redis_fold(self, session_id: str, summary: str, folded: int):
+        if not self._redis_available():
+            return
+        try:
+            # Summary and trim land together: readers never see the turns both summarized and kept
+            pipe = self.redis.pipeline(transaction=True)
+            pipe.set(self._summary_key(session_id), summary, ex=self.ttl)
+            pipe.ltrim(self._turns_key(session_id), folded, -1)
+            await pipe.execute()
+        except (RedisError, OSError) as e:
+            self._redis_failed(e)
+
+    def as_dict(self) -> dict:
+        return {**self.stats.as_dict(), "local_sessions": len(self.local), "summarizing": len(self._summarizing)}
+
+
+conversation_store = ConversationStore()
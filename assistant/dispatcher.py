@@ -0,0 +1,184 @@
+import asyncio
+import contextvars
+import hashlib
+import json
+import logging
+import os
+from contextlib import contextmanager
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Identical requests in flight at the same time share one upstream call
+LLM_COALESCE = os.getenv("LLM_COALESCE", "true").lower() == "true"
+# Batch lane: requests are collected for this long (or until LLM_BATCH_MAX_SIZE) and sent together
+LLM_BATCH_WINDOW_MS = float(os.getenv("LLM_BATCH_WINDOW_MS", 50))
+LLM_BATCH_MAX_SIZE = int(os.getenv("LLM_BATCH_MAX_SIZE", 500))
+
+INTERACTIVE = "interactive"
+BATCH = "batch"
+
+# Set by non-interactive work (Celery batch jobs) so its LLM calls take the batch lane
+llm_lane: contextvars.ContextVar = contextvars.ContextVar("llm_lane", default=INTERACTIVE)
+
+
+@contextmanager
+def batch_lane():
+    """LLM calls made inside (including tasks started inside) go through the batch lane"""
+    token = llm_lane.set(BATCH)
+    try:
+        yield
+    finally:
+        llm_lane.reset(token)
+
+
+# (model, messages, agent, kwargs)
+Request = Tuple[str, List[dict], str, dict]
+
+
+def request_key(lane: str, model: str, messages: List[dict], kwargs: dict) -> str:
+    payload = json.dumps([lane, model, messages, kwargs], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class DispatchStats:
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.requests = 0
+        self.coalesced = 0
+        self.upstream_calls = 0
+        self.batches = 0
+        self.batched_requests = 0
+
+    def as_dict(self) -> dict:
+        return {
+            "requests": self.requests,
+            "coalesced": self.coalesced,
+            "upstream_calls": self.upstream_calls,
+            "batches": self.batches,
+            "batched_requests": self.batched_requests,
+            "avg_batch_size": round(self.batched_requests / self.batches, 2) if self.batches else 0.0,
+        }
+
+
+class LLMDispatcher:
+    """Sits in front of chat completions.
+
+    Interactive calls go upstream at once; an identical call (same model,
+    messages and parameters) that arrives while one is in flight waits for
+    it instead of making its own. The response cache only coalesces when it
+    is enabled and only per agent prompt; this covers every caller.
+
+    Calls in the batch lane are collected for a short window and flushed
+    together through submit_batch, e.g. one Batch API job for a whole
+    chat_batch job instead of a request per message. Without submit_batch
+    the collected calls are made individually, still coalesced.
+    """
+
+    def __init__(
+        self,
+        complete: Callable[..., Awaitable[str]],
+        submit_batch: Optional[Callable[[List[Request]], Awaitable[List[object]]]] = None,
+        coalesce: bool = LLM_COALESCE,
+        window_ms: float = LLM_BATCH_WINDOW_MS,
+        max_batch: int = LLM_BATCH_MAX_SIZE,
+    ):
+        self.complete_one = complete
+        self.submit_batch = submit_batch
+        self.coalesce = coalesce
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self.stats = DispatchStats()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._pending: List[Tuple[Request, asyncio.Future]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def complete(self, model: str, messages: List[dict], agent: str = "default", **kwargs) -> str:
+        self.stats.requests += 1
+        lane = llm_lane.get()
+        if not self.coalesce and lane == INTERACTIVE:
+            self.stats.upstream_calls += 1
+            return await self.complete_one(model, messages, agent, **kwargs)
+
+        key = request_key(lane, model, messages, kwargs)
+        future = self._inflight.get(key)
+        if future is not None:
+            self.stats.coalesced += 1
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        # Nobody may be waiting on a failure, so mark it retrieved
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._inflight[key] = future
+        future.add_done_callback(lambda f: self._inflight.pop(key, None))
+        if lane == BATCH:
+            self._enqueue((model, messages, agent, kwargs), future)
+        else:
+            self._spawn(self._run_one((model, messages, agent, kwargs), future))
+        # A caller that gives up does not cancel the call others may be waiting on
+        return await asyncio.shield(future)
+
+    def _spawn(self, coro):
+        task = asyncio.ensure_future(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run_one(self, request: Request, future: asyncio.Future):
+        model, messages, agent, kwargs = request
+        self.stats.upstream_calls += 1
+        try:
+            result = await self.complete_one(model, messages, agent, **kwargs)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+        else:
+            if not future.done():
+                future.set_result(result)
+
+    def _enqueue(self, request: Request, future: asyncio.Future):
+        self._pending.append((request, future))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(self.window, self._flush)
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        pending, self._pending = self._pending, []
+        if pending:
+            self._spawn(self._run_batch(pending))
+
+    async def _run_batch(self, pending: List[Tuple[Request, asyncio.Future]]):
+        if self.submit_batch is None:
+            await asyncio.gather(*(self._run_one(request, future) for request, future in pending))
+            return
+
+        self.stats.batches += 1
+        self.stats.batched_requests += len(pending)
+        try:
+            results = await self.submit_batch([request for request, _ in pending])
+        except asyncio.CancelledError:
+            for _, future in pending:
+                future.cancel()
+            raise
+        except Exception as e:
+            logger.warning("LLM batch of %d requests failed: %s", len(pending), e)
+            results = [e] * len(pending)
+        for (_, future), result in zip(pending, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def pending(self) -> int:
+        return len(self._inflight)
@@ -0,0 +1,242 @@
+import asyncio
+import json
+import os
+import time
+from typing import AsyncIterator, Dict, List
+
+from assistant.dispatcher import LLMDispatcher, Request
+from container import container
+from metrics import llm_errors, llm_request_seconds, llm_tokens, llm_ttft_seconds
+from worker_pool import UpstreamLimiter
+
+
+def _parse_model_map(value: str, cast) -> Dict[str, object]:
+    # "gpt-4=4,gpt-3.5-turbo=16" -> {"gpt-4": 4, "gpt-3.5-turbo": 16}
+    result = {}
+    for pair in filter(None, (p.strip() for p in value.split(","))):
+        model, _, setting = pair.partition("=")
+        result[model.strip()] = cast(setting)
+    return result
+
+
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", 32))
+LLM_MAX_KEEPALIVE = int(os.getenv("LLM_MAX_KEEPALIVE", 16))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", 2))
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", 8))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", 60))
+LLM_MODEL_CONCURRENCY = _parse_model_map(os.getenv("LLM_MODEL_CONCURRENCY", "gpt-4=8,gpt-3.5-turbo=16"), int)
+LLM_MODEL_TIMEOUTS = _parse_model_map(os.getenv("LLM_MODEL_TIMEOUTS", ""), float)
+# Expected seconds in the model's queue before a call is shed instead of waiting
+LLM_QUEUE_BUDGET = float(os.getenv("LLM_QUEUE_BUDGET", 10))
+# Batch-lane calls (Celery chat_batch jobs) go through the OpenAI Batch API: half the price, hours of latency
+LLM_BATCH_API = os.getenv("LLM_BATCH_API", "false").lower() == "true"
+LLM_BATCH_POLL_INTERVAL = float(os.getenv("LLM_BATCH_POLL_INTERVAL", 10))
+
+_limiters: Dict[str, UpstreamLimiter] = {}
+
+
+class StreamStats:
+    def __init__(self):
+        self.streams = 0
+        self.completed = 0
+        self.cancelled = 0
+        self.ttft_count = 0
+        self.ttft_seconds = 0.0
+        self.ttft_max = 0.0
+
+    def observe_ttft(self, seconds: float):
+        self.ttft_count += 1
+        self.ttft_seconds += seconds
+        self.ttft_max = max(self.ttft_max, seconds)
+
+    def as_dict(self) -> dict:
+        return {
+            "streams": self.streams,
+            "completed": self.completed,
+            "cancelled": self.cancelled,
+            "avg_ttft_ms": round(self.ttft_seconds / self.ttft_count * 1000, 3) if self.ttft_count else 0.0,
+            "max_ttft_ms": round(self.ttft_max * 1000, 3),
+        }
+
+
+stream_stats = StreamStats()
+
+
+def build_client():
+    # The openai package is the slowest import in the app; only pay for it on the first LLM call
+    import httpx
+    # openai's own Timeout: newer releases run on a fork of httpx whose transport rejects httpx.Timeout
+    from openai import AsyncOpenAI, DefaultAsyncHttpxClient, Timeout
+
+    return AsyncOpenAI(
+        api_key=os.getenv("OPENAI_API_KEY"),
+        max_retries=LLM_MAX_RETRIES,
+        http_client=DefaultAsyncHttpxClient(
+            limits=httpx.Limits(
+                max_connections=LLM_MAX_CONNECTIONS,
+                max_keepalive_connections=LLM_MAX_KEEPALIVE,
+            ),
+            timeout=Timeout(LLM_TIMEOUT, connect=5.0),
+        ),
+    )
+
+
+container.provide("openai", build_client, close=lambda client: client.close())
+
+
+def get_client():
+    """Shared async OpenAI client backed by one bounded connection pool"""
+    return container.get("openai")
+
+
+def model_limiter(model: str) -> UpstreamLimiter:
+    if model not in _limiters:
+        _limiters[model] = UpstreamLimiter(model, LLM_MODEL_CONCURRENCY.get(model, LLM_CONCURRENCY), LLM_QUEUE_BUDGET)
+    return _limiters[model]
+
+
+def limiter_stats() -> dict:
+    return {model: limiter.stats() for model, limiter in _limiters.items()}
+
+
+def model_timeout(model: str) -> float:
+    return LLM_MODEL_TIMEOUTS.get(model, LLM_TIMEOUT)
+
+
+async def chat_completion(model: str, messages: List[dict], agent: str = "default", **kwargs) -> str:
+    """Run a chat completion without blocking the event loop.
+
+    Goes through the dispatcher: identical concurrent calls share one
+    upstream request, and inside dispatcher.batch_lane() calls are batched.
+    """
+    return await dispatcher.complete(model, messages, agent, **kwargs)
+
+
+async def _chat_completion(model: str, messages: List[dict], agent: str = "default", **kwargs) -> str:
+    async with model_limiter(model).slot():
+        start = time.perf_counter()
+        try:
+            completion = await get_client().chat.completions.create(
+                model=model,
+                messages=messages,
+                timeout=model_timeout(model),
+                **kwargs
+            )
+        except Exception:
+            llm_errors.inc(agent=agent, model=model)
+            raise
+    llm_request_seconds.observe(time.perf_counter() - start, agent=agent, model=model, mode="complete")
+    usage = getattr(completion, "usage", None)
+    if usage is not None:
+        llm_tokens.inc(usage.prompt_tokens, agent=agent, model=model, type="prompt")
+        llm_tokens.inc(usage.completion_tokens, agent=agent, model=model, type="completion")
+    return completion.choices[0].message.content
+
+
+def _batch_result(line: dict, agent: str, model: str, elapsed: float):
+    response = line.get("response") or {}
+    if line.get("error") or response.get("status_code") != 200:
+        llm_errors.inc(agent=agent, model=model)
+        error = line.get("error") or response.get("body", {}).get("error") or {}
+        return RuntimeError(error.get("message", f"Batch request failed with status {response.get('status_code')}"))
+    body = response["body"]
+    llm_request_seconds.observe(elapsed, agent=agent, model=model, mode="batch")
+    usage = body.get("usage")
+    if usage:
+        llm_tokens.inc(usage["prompt_tokens"], agent=agent, model=model, type="prompt")
+        llm_tokens.inc(usage["completion_tokens"], agent=agent, model=model, type="completion")
+    return body["choices"][0]["message"]["content"]
+
+
+async def submit_batch(requests: List[Request]) -> list:
+    """Send the requests as one Batch API job and wait for it: a reply or an exception per request, in order"""
+    client = get_client()
+    start = time.perf_counter()
+    lines = [
+        json.dumps({
+            "custom_id": str(i),
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": {"model": model, "messages": messages, **kwargs},
+        })
+        for i, (model, messages, agent, kwargs) in enumerate(requests)
+    ]
+    batch_file = await client.files.create(file=("batch.jsonl", "\n".join(lines).encode()), purpose="batch")
+    batch = await client.batches.create(
+        input_file_id=batch_file.id, endpoint="/v1/chat/completions", completion_window="24h"
+    )
+    while batch.status not in ("completed", "failed", "expired", "cancelled"):
+        await asyncio.sleep(LLM_BATCH_POLL_INTERVAL)
+        batch = await client.batches.retrieve(batch.id)
+    if batch.status != "completed":
+        raise RuntimeError(f"Batch {batch.id} ended as {batch.status}")
+
+    elapsed = time.perf_counter() - start
+    results = {}
+    # Successful requests are in the output file, failed ones in the error file
+    for file_id in filter(None, (batch.output_file_id, batch.error_file_id)):
+        content = await client.files.content(file_id)
+        for raw in content.text.splitlines():
+            if raw.strip():
+                line = json.loads(raw)
+                model, _, agent, _ = requests[int(line["custom_id"])]
+                results[line["custom_id"]] = _batch_result(line, agent, model, elapsed)
+    return [results.get(str(i), RuntimeError("Request missing from batch output")) for i in range(len(requests))]
+
+
+dispatcher = LLMDispatcher(_chat_completion, submit_batch if LLM_BATCH_API else None)
+
+
+async def stream_chat_completion(model: str, messages: List[dict], agent: str = "default", **kwargs) -> AsyncIterator[str]:
+    """Yield completion tokens as they arrive.
+
+    Closing the generator (e.g. when the HTTP client disconnects) closes the
+    upstream response, so abandoned generations stop being billed.
+    """
+    async with model_limiter(model).slot():
+        start = time.perf_counter()
+        stream_stats.streams += 1
+        try:
+            stream = await get_client().chat.completions.create(
+                model=model,
+                messages=messages,
+                stream=True,
+                timeout=model_timeout(model),
+                **kwargs
+            )
+        except Exception:
+            llm_errors.inc(agent=agent, model=model)
+            raise
+        first_token = True
+        # OpenAI sends one token per content chunk
+        tokens = 0
+        try:
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                token = chunk.choices[0].delta.content
+                if not token:
+                    continue
+                if first_token:
+                    ttft = time.perf_counter() - start
+                    stream_stats.observe_ttft(ttft)
+                    llm_ttft_seconds.observe(ttft, agent=agent, model=model)
+                    first_token = False
+                tokens += 1
+                yield token
+            stream_stats.completed += 1
+            llm_request_seconds.observe(time.perf_counter() - start, agent=agent, model=model, mode="stream")
+        except (asyncio.CancelledError, GeneratorExit):
+            stream_stats.cancelled += 1
+            raise
+        except Exception:
+            llm_errors.inc(agent=agent, model=model)
+            raise
+        finally:
+            llm_tokens.inc(tokens, agent=agent, model=model, type="completion")
+            await stream.close()
+
+
+async def aclose():
+    await container.close("openai")
+    _limiters.clear()
@@ -1,17 +1,44 @@
-import os
-from openai import OpenAI
-from dotenv import load_dotenv
+from assistant.llm_client import chat_completion, stream_chat_completion
+from assistant.response_cache import response_cache
+from assistant.conversation import conversation_store
+from typing import Optional
 
-load_dotenv()
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+MODEL = "gpt-4"
+SYSTEM_PROMPT = "You are a helpful assistant."
 
-def ask_openai(prompt: str) -> str:
-    chat_completion = client.chat.completions.create(
-        model="gpt-4",
-        messages=[
-            {"role": "system", "content": "You are a helpful assistant."},
-            {"role": "user", "content": prompt}
-        ]
+async def ask_openai(prompt: str, session_id: Optional[str] = None) -> str:
+    if session_id:
+        # Replies depend on the history, so they bypass the response cache
+        return await conversation_store.complete(
+            session_id, SYSTEM_PROMPT, prompt,
+            lambda messages: chat_completion(MODEL, messages, agent="main")
+        )
+    return await response_cache.get_or_compute(
+        "main", MODEL, SYSTEM_PROMPT, prompt,
+        lambda: chat_completion(
+            MODEL,
+            [
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ],
+            agent="main"
+        )
     )
-    return chat_completion.choices[0].message.content
 
+def ask_openai_stream(prompt: str, session_id: Optional[str] = None):
+    if session_id:
+        return conversation_store.stream(
+            session_id, SYSTEM_PROMPT, prompt,
+            lambda messages: stream_chat_completion(MODEL, messages, agent="main")
+        )
+    return response_cache.stream(
+        "main", MODEL, SYSTEM_PROMPT, prompt,
+        lambda: stream_chat_completion(
+            MODEL,
+            [
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ],
+            agent="main"
+        )
+    )
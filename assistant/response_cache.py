@@ -0,0 +1,176 @@
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import AsyncIterator, Awaitable, Callable, Optional
+
+from redis.exceptions import RedisError
+
+from cache import MISSING, CacheStats, LRUCache, SingleFlight
+from redis_client import redis_client
+
+logger = logging.getLogger(__name__)
+
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", 3600))
+LLM_CACHE_LOCAL_SIZE = int(os.getenv("LLM_CACHE_LOCAL_SIZE", 1024))
+LLM_CACHE_REDIS_MAX_ENTRIES = int(os.getenv("LLM_CACHE_REDIS_MAX_ENTRIES", 10000))
+# After a Redis failure, skip the Redis tier for this many seconds
+LLM_CACHE_REDIS_RETRY = float(os.getenv("LLM_CACHE_REDIS_RETRY", 30))
+
+KEY_PREFIX = "llm-cache:"
+INDEX_KEY = "llm-cache:index"
+
+
+def normalize_prompt(prompt: str) -> str:
+    return " ".join(prompt.split()).casefold()
+
+
+def cache_key(agent: str, model: str, system_prompt: str, prompt: str) -> str:
+    payload = json.dumps([agent, model, system_prompt, normalize_prompt(prompt)])
+    return KEY_PREFIX + hashlib.sha256(payload.encode()).hexdigest()
+
+
+class ResponseCache:
+    """Exact-match completion cache: in-process LRU in front of Redis, with single-flight misses"""
+
+    def __init__(
+        self,
+        redis=redis_client,
+        ttl: int = LLM_CACHE_TTL,
+        local_size: int = LLM_CACHE_LOCAL_SIZE,
+        redis_max_entries: int = LLM_CACHE_REDIS_MAX_ENTRIES,
+        enabled: bool = LLM_CACHE_ENABLED,
+    ):
+        self.redis = redis
+        self.ttl = ttl
+        self.redis_max_entries = redis_max_entries
+        self.enabled = enabled
+        self.local = LRUCache(local_size, ttl=ttl)
+        self.flight = SingleFlight()
+        self.stats = CacheStats()
+        self._redis_retry_at = 0.0
+
+    async def get_or_compute(
+        self,
+        agent: str,
+        model: str,
+        system_prompt: str,
+        prompt: str,
+        compute: Callable[[], Awaitable[str]],
+    ) -> str:
+        if not self.enabled:
+            return await compute()
+
+        start = time.perf_counter()
+        key = cache_key(agent, model, system_prompt, prompt)
+        value = self.local.get(key)
+        if value is not MISSING:
+            self.stats.local_hits += 1
+            self.stats.hit_seconds += time.perf_counter() - start
+            return value
+
+        if self.flight.pending(key):
+            self.stats.coalesced += 1
+        return await self.flight.do(key, lambda: self._load(key, compute, start))
+
+    async def stream(
+        self,
+        agent: str,
+        model: str,
+        system_prompt: str,
+        prompt: str,
+        open_stream: Callable[[], AsyncIterator[str]],
+    ) -> AsyncIterator[str]:
+        """Yield a cached response in one piece, or stream upstream and cache the finished text"""
+        if not self.enabled:
+            async for token in open_stream():
+                yield token
+            return
+
+        start = time.perf_counter()
+        key = cache_key(agent, model, system_prompt, prompt)
+        value = self.local.get(key, None)
+        if value is not None:
+            self.stats.local_hits += 1
+        else:
+            value = await self._redis_get(key)
+            if value is not None:
+                self.local.set(key, value)
+                self.stats.redis_hits += 1
+        if value is not None:
+            self.stats.hit_seconds += time.perf_counter() - start
+            yield value
+            return
+
+        parts = []
+        async for token in open_stream():
+            parts.append(token)
+            yield token
+        # Only a stream that ran to completion is worth caching
+        value = "".join(parts)
+        self.stats.misses += 1
+        self.stats.miss_seconds += time.perf_counter() - start
+        self.local.set(key, value)
+        await self._redis_set(key, value)
+
+    async def _load(self, key: str, compute: Callable[[], Awaitable[str]], start: float) -> str:
+        value = await self._redis_get(key)
+        if value is not None:
+            self.local.set(key, value)
+            self.stats.redis_hits += 1
+            self.stats.hit_seconds += time.perf_counter() - start
+            return value
+
+        value = await compute()
+        self.stats.misses += 1
+        self.stats.miss_seconds += time.perf_counter() - start
+        self.local.set(key, value)
+        await self._redis_set(key, value)
+        return value
+
+    def _redis_available(self) -> bool:
+        return self.redis is not None and time.monotonic() >= self._redis_retry_at
+
+    def _redis_failed(self, error: Exception):
+        self.stats.errors += 1
+        self._redis_retry_at = time.monotonic() + LLM_CACHE_REDIS_RETRY
+        logger.warning("Response cache Redis tier unavailable: %s", error)
+
+    async def _redis_get(self, key: str) -> Optional[str]:
+        if not self._redis_available():
+            return None
+        try:
+            value = await self.redis.get(key)
+            if value is not None:
+                # Refresh the eviction score so the index behaves like an LRU
+                await self.redis.zadd(INDEX_KEY, {key: time.time()})
+            return value
+        except (RedisError, OSError) as e:
+            self._redis_failed(e)
+            return None
+
+    async def _redis_set(self, key: str, value: str):
+        if not self._redis_available():
+            return
+        now = time.time()
+        try:
+            pipe = self.redis.pipeline()
+            pipe.set(key, value, ex=self.ttl)
+            pipe.zadd(INDEX_KEY, {key: now})
+            pipe.zremrangebyscore(INDEX_KEY, "-inf", now - self.ttl)
+            pipe.zcard(INDEX_KEY)
+            size = (await pipe.execute())[-1]
+            if size > self.redis_max_entries:
+                evicted = await self.redis.zpopmin(INDEX_KEY, size - self.redis_max_entries)
+                if evicted:
+                    await self.redis.delete(*(member for member, _ in evicted))
+        except (RedisError, OSError) as e:
+            self._redis_failed(e)
+
+    def clear_local(self):
+        self.local.clear()
+
+
+response_cache = ResponseCache()
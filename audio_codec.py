@@ -0,0 +1,160 @@
+import logging
+import os
+import queue
+import subprocess
+import threading
+from contextlib import suppress
+from typing import BinaryIO, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+FFMPEG_BINARY = os.getenv("FFMPEG_BINARY", "ffmpeg")
+FFMPEG_POOL_SIZE = int(os.getenv("FFMPEG_POOL_SIZE", 2))
+# Recordings are decoded this far at most; anything longer is rejected
+VOICE_MAX_SECONDS = float(os.getenv("VOICE_MAX_SECONDS", 60))
+# Bytes per read/write on ffmpeg's pipes, so an upload is never held in memory whole
+FFMPEG_CHUNK_SIZE = int(os.getenv("FFMPEG_CHUNK_SIZE", 64 * 1024))
+
+# Recognizer input: 16 kHz mono signed 16-bit little-endian PCM
+SAMPLE_RATE = 16000
+SAMPLE_WIDTH = 2
+
+
+class AudioDecodeError(Exception):
+    pass
+
+
+class AudioTooLong(AudioDecodeError):
+    def __init__(self, max_seconds: float):
+        super().__init__(f"Recording is longer than {max_seconds:g}s")
+        self.max_seconds = max_seconds
+
+
+class OutputTooLarge(Exception):
+    pass
+
+
+class FfmpegPool:
+    """Keeps ffmpeg processes spawned and waiting on stdin.
+
+    A process decodes exactly one input (ffmpeg cannot be reset between
+    streams), so each call takes a warm process and a replacement is spawned
+    in the background, keeping process start-up off the request path.
+    """
+
+    def __init__(self, args, size: int = FFMPEG_POOL_SIZE):
+        self.args = args
+        self.size = size
+        self._ready: "queue.SimpleQueue[subprocess.Popen]" = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._closed = False
+        self.spawned = 0
+
+    def _spawn(self) -> subprocess.Popen:
+        self.spawned += 1
+        return subprocess.Popen(
+            [FFMPEG_BINARY, "-hide_banner", "-loglevel", "error", *self.args],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+
+    def _refill(self):
+        with self._lock:
+            if not self._closed and self._ready.qsize() < self.size:
+                self._ready.put(self._spawn())
+
+    def warm(self):
+        try:
+            for _ in range(self.size):
+                self._refill()
+        except OSError as e:
+            logger.warning("Could not pre-spawn %s: %s", FFMPEG_BINARY, e)
+
+    def acquire(self) -> subprocess.Popen:
+        try:
+            process = self._ready.get_nowait()
+        except queue.Empty:
+            process = self._spawn()
+        if self.size:
+            threading.Thread(target=self._refill, daemon=True).start()
+        return process
+
+    def run(self, data: Union[bytes, BinaryIO], max_output: Optional[int] = None) -> bytes:
+        """Pipe data (bytes or a binary file) through a warm process.
+
+        The input is fed in chunks from a helper thread while the output is
+        read here, so a file is never read into memory whole. Past
+        max_output bytes of output the process is killed and OutputTooLarge
+        raised.
+        """
+        process = self.acquire()
+        errors = bytearray()
+        helpers = [
+            threading.Thread(target=self._feed, args=(process.stdin, data), daemon=True),
+            threading.Thread(target=self._drain, args=(process.stderr, errors), daemon=True),
+        ]
+        for thread in helpers:
+            thread.start()
+        output = bytearray()
+        finished = False
+        try:
+            while chunk := process.stdout.read1(FFMPEG_CHUNK_SIZE):
+                output += chunk
+                if max_output is not None and len(output) > max_output:
+                    raise OutputTooLarge(len(output))
+            finished = True
+        finally:
+            if not finished:
+                # Stopped early: killing ffmpeg unblocks the helpers
+                process.kill()
+            for thread in helpers:
+                thread.join()
+            process.stdout.close()
+            process.wait()
+        if process.returncode != 0:
+            raise AudioDecodeError(errors.decode(errors="replace").strip() or "ffmpeg failed")
+        return bytes(output)
+
+    @staticmethod
+    def _feed(stdin, data: Union[bytes, BinaryIO]):
+        # A broken pipe means ffmpeg gave up on the input; its exit status says why
+        with suppress(OSError):
+            if isinstance(data, (bytes, bytearray, memoryview)):
+                stdin.write(data)
+            else:
+                while chunk := data.read(FFMPEG_CHUNK_SIZE):
+                    stdin.write(chunk)
+        with suppress(OSError):
+            stdin.close()
+
+    @staticmethod
+    def _drain(stderr, errors: bytearray):
+        while chunk := stderr.read1(FFMPEG_CHUNK_SIZE):
+            errors += chunk
+        stderr.close()
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            while not self._ready.empty():
+                process = self._ready.get_nowait()
+                process.kill()
+                process.wait()
+
+
+webm_decoder = FfmpegPool([
+    "-f", "webm", "-i", "pipe:0",
+    "-f", "s16le", "-ac", "1", "-ar", str(SAMPLE_RATE), "pipe:1",
+])
+
+
+def decode_to_pcm(audio_data: Union[bytes, BinaryIO], max_seconds: float = VOICE_MAX_SECONDS) -> bytes:
+    """Decode a WebM/Opus recording (bytes or a file) to recognizer-ready PCM without touching disk.
+
+    Raises AudioTooLong as soon as the decoded audio passes max_seconds.
+    """
+    try:
+        return webm_decoder.run(audio_data, max_output=int(max_seconds * SAMPLE_RATE) * SAMPLE_WIDTH)
+    except OutputTooLarge:
+        raise AudioTooLong(max_seconds) from None
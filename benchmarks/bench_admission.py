@@ -0,0 +1,69 @@
+"""A burst of /ask past the model's concurrency cap, with and without load shedding.
+
+Boots main:app against the stub OpenAI with gpt-4 capped at --limit calls.
+Without a queue budget every request waits its turn, so late ones take
+burst / limit * latency; with --budget, requests past it get a 503 with
+Retry-After straight away and the admitted ones keep their latency.
+
+    python -m benchmarks.bench_admission --burst 200 --limit 4 --llm-latency 0.5 --budget 2
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+
+from benchmarks.common import app_env, percentile, serve
+
+
+async def burst(url, requests):
+    results = []
+
+    async def one(client, i):
+        start = time.perf_counter()
+        response = await client.post("/ask", json={"prompt": f"burst {time.time_ns()} {i}"})
+        results.append((response.status_code, time.perf_counter() - start))
+
+    async with httpx.AsyncClient(base_url=url, timeout=600, limits=httpx.Limits(max_connections=None)) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(one(client, i) for i in range(requests)))
+        return results, time.perf_counter() - start
+
+
+def report(name, results, elapsed):
+    ok = [seconds for status, seconds in results if status == 200]
+    shed = [seconds for status, seconds in results if status == 503]
+    print(f"{name}: {len(ok)} answered, {len(shed)} shed, {len(results) - len(ok) - len(shed)} other errors in {elapsed:.1f}s")
+    if ok:
+        print(f"    answered p50 {percentile(ok, 50) * 1000:.0f}ms  p95 {percentile(ok, 95) * 1000:.0f}ms  max {max(ok) * 1000:.0f}ms")
+    if shed:
+        print(f"    shed     p50 {percentile(shed, 50) * 1000:.0f}ms  p95 {percentile(shed, 95) * 1000:.0f}ms")
+
+
+def main_cli():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--burst", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=4)
+    parser.add_argument("--llm-latency", type=float, default=0.5)
+    parser.add_argument("--budget", type=float, default=2.0, help="LLM_QUEUE_BUDGET in seconds")
+    parser.add_argument("--port", type=int, default=8920)
+    args = parser.parse_args()
+
+    with serve("benchmarks.stub_openai:app", args.port + 1, {"STUB_LLM_LATENCY": str(args.llm_latency)}) as (stub_url, _):
+        env = {
+            **app_env(stub_url),
+            "LLM_CACHE_ENABLED": "false",
+            "LLM_MAX_RETRIES": "0",
+            "LLM_MODEL_CONCURRENCY": f"gpt-4={args.limit}",
+            "LOG_LEVEL": "WARNING",
+        }
+        for name, budget in (("no budget", 3600.0), (f"budget {args.budget}s", args.budget)):
+            with serve("main:app", args.port, {**env, "LLM_QUEUE_BUDGET": str(budget)}) as (url, _):
+                # Warm up, so the limiter's service time is not the cold first call's
+                for _ in range(5):
+                    asyncio.run(burst(url, args.limit))
+                report(name, *asyncio.run(burst(url, args.burst)))
+
+
+if __name__ == "__main__":
+    main_cli()
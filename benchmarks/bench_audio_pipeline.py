@@ -0,0 +1,124 @@
+"""Per-request cost of the voice transcoding path: legacy temp-file pipeline vs in-memory.
+
+Google STT and gTTS are stubbed so only decoding and file handling are
+measured. Needs an ffmpeg binary (FFMPEG_BINARY, default "ffmpeg").
+
+    python -m benchmarks.bench_audio_pipeline --requests 50
+"""
+import argparse
+import io
+import os
+import subprocess
+import tempfile
+import time
+
+import speech_recognition as sr
+from gtts import gTTS
+
+import audio_codec
+from benchmarks.common import print_summary, summarize
+from voice_handler import VoiceHandler
+
+MP3_STUB = b"\xff\xfb" + b"\x00" * 8192
+
+
+def legacy_speech_to_text(recognizer, audio_data):
+    from pydub import AudioSegment
+    audio = AudioSegment.from_file(io.BytesIO(audio_data), format="webm")
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as temp_audio:
+        audio.export(temp_audio.name, format="wav")
+        temp_audio_path = temp_audio.name
+    with sr.AudioFile(temp_audio_path) as source:
+        text = recognizer.recognize_google(recognizer.record(source))
+    os.unlink(temp_audio_path)
+    return text
+
+
+def legacy_text_to_speech(text):
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".mp3") as temp_audio:
+        gTTS(text=text, lang="en").save(temp_audio.name)
+        with open(temp_audio.name, "rb") as audio_file:
+            audio_data = audio_file.read()
+        os.unlink(temp_audio.name)
+        return audio_data
+
+
+def read_proc_io():
+    with open("/proc/self/io") as f:
+        return {key: int(value) for key, value in (line.split(": ") for line in f)}
+
+
+class Counters:
+    def __init__(self):
+        self.temp_files = 0
+        self.processes = 0
+
+    def install(self):
+        original_named = tempfile.NamedTemporaryFile
+        original_popen_init = subprocess.Popen.__init__
+        counters = self
+
+        def named_temporary_file(*args, **kwargs):
+            counters.temp_files += 1
+            return original_named(*args, **kwargs)
+
+        def popen_init(popen, *args, **kwargs):
+            counters.processes += 1
+            original_popen_init(popen, *args, **kwargs)
+
+        tempfile.NamedTemporaryFile = named_temporary_file
+        subprocess.Popen.__init__ = popen_init
+
+
+def run_case(name, fn, requests, counters):
+    counters.temp_files = counters.processes = 0
+    before = read_proc_io()
+    latencies = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - start)
+    after = read_proc_io()
+    print_summary(summarize(name, latencies))
+    print(
+        f"    per request: temp_files={counters.temp_files / requests:.1f} "
+        f"processes={counters.processes / requests:.1f} "
+        f"read_syscalls={(after['syscr'] - before['syscr']) / requests:.0f} "
+        f"write_syscalls={(after['syscw'] - before['syscw']) / requests:.0f} "
+        f"disk_write_bytes={(after['write_bytes'] - before['write_bytes']) / requests:.0f}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--seconds", type=int, default=5, help="length of the generated test recording")
+    args = parser.parse_args()
+
+    sample = os.path.join(tempfile.mkdtemp(), "sample.webm")
+    subprocess.run([
+        audio_codec.FFMPEG_BINARY, "-y", "-loglevel", "error",
+        "-f", "lavfi", "-i", f"sine=frequency=440:duration={args.seconds}",
+        "-c:a", "libopus", sample,
+    ], check=True)
+    with open(sample, "rb") as f:
+        audio_data = f.read()
+
+    # Stub the network backends; only decoding and file handling are measured
+    sr.Recognizer.recognize_google = lambda recognizer, audio, **kwargs: f"{len(audio.frame_data)} bytes"
+    gTTS.write_to_fp = lambda tts, fp: fp.write(MP3_STUB)
+
+    handler = VoiceHandler()
+    audio_codec.webm_decoder.warm()
+    counters = Counters()
+    counters.install()
+
+    run_case("stt legacy (pydub + temp wav)", lambda: legacy_speech_to_text(handler.recognizer, audio_data), args.requests, counters)
+    run_case("stt in-memory (warm ffmpeg)", lambda: handler.speech_to_text(audio_data), args.requests, counters)
+    run_case("tts legacy (temp mp3)", lambda: legacy_text_to_speech("hello there"), args.requests, counters)
+    run_case("tts in-memory (BytesIO)", lambda: handler.text_to_speech("hello there"), args.requests, counters)
+    audio_codec.webm_decoder.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Wall time of /chat in serial vs parallel mode against a stubbed LLM.
+
+    python -m benchmarks.bench_chat_fanout --latency 0.2 --batch-sizes 1,5,10,20
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+import httpx
+
+os.environ.setdefault("OPENAI_API_KEY", "stub")
+os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}")
+# One client drives all the load; per-client rate limits would cap the benchmark, not the app
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+import main  # noqa: E402
+
+
+def stub_agent(latency):
+    async def agent(prompt):
+        await asyncio.sleep(latency)
+        return f"stub reply to: {prompt}"
+    return agent
+
+
+async def timed_chat(client, payload):
+    start = time.perf_counter()
+    response = await client.post("/chat", json=payload)
+    response.raise_for_status()
+    return time.perf_counter() - start
+
+
+async def run(batch_sizes, latency, max_concurrency):
+    main.ask_openai = stub_agent(latency)
+    main.info_agent = stub_agent(latency)
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=300) as client:
+        print(f"{'batch':>6} {'serial_s':>10} {'parallel_s':>11} {'speedup':>8}")
+        for size in batch_sizes:
+            messages = [f"message {i}" for i in range(size)]
+            serial = await timed_chat(client, {"messages": messages})
+            parallel = await timed_chat(client, {
+                "messages": messages,
+                "parallel": True,
+                "max_concurrency": max_concurrency,
+            })
+            print(f"{size:>6} {serial:>10.3f} {parallel:>11.3f} {serial / parallel:>7.1f}x")
+
+
+def main_cli():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--batch-sizes", default="1,5,10,20,40")
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--max-concurrency", type=int, default=10)
+    args = parser.parse_args()
+    batch_sizes = [int(size) for size in args.batch_sizes.split(",")]
+    asyncio.run(run(batch_sizes, args.latency, args.max_concurrency))
+
+
+if __name__ == "__main__":
+    main_cli()
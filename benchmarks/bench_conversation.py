@@ -0,0 +1,130 @@
+"""Prompt size and latency over a long session: full history resent vs the conversation store.
+
+The LLM is modelled: a reply takes --base-latency plus --token-latency per
+prompt token (prefill dominates for long prompts), so growth in the prompt
+shows up as growth in latency. "full" resends every earlier turn, as a
+client without server-side memory would; "store" goes through
+ConversationStore, budgeted and summarized in the background (summary calls
+pay the same modelled latency, off the request path).
+
+Uses the Redis from REDIS_HOST/REDIS_PORT when reachable, otherwise an
+in-process fakeredis.
+
+    python -m benchmarks.bench_conversation --turns 100 --budget 2000 --threshold 1500
+"""
+import argparse
+import asyncio
+import time
+
+from assistant.conversation import ConversationStore, message_tokens
+from benchmarks.common import percentile
+from redis_client import redis_client
+
+SYSTEM_PROMPT = "You are a helpful assistant."
+CHECKPOINTS = (1, 10, 25, 50, 100, 200, 500)
+
+
+async def pick_redis():
+    try:
+        await redis_client.ping()
+        return redis_client, "redis"
+    except Exception:
+        import fakeredis
+        return fakeredis.FakeAsyncRedis(decode_responses=True), "fakeredis"
+
+
+class ModelledLLM:
+    def __init__(self, base_latency, token_latency, reply_chars):
+        self.base_latency = base_latency
+        self.token_latency = token_latency
+        self.reply_chars = reply_chars
+        self.summary_tokens = 0
+
+    async def complete(self, messages):
+        tokens = sum(message_tokens(m) for m in messages)
+        await asyncio.sleep(self.base_latency + tokens * self.token_latency)
+        return ("Sure, here is a detailed answer. " * 20)[:self.reply_chars]
+
+    async def summarize(self, summary, turns):
+        messages = [{"role": "user", "content": summary}, *turns]
+        self.summary_tokens += sum(message_tokens(m) for m in messages)
+        await self.complete(messages)
+        # Summaries stay about the size of a couple of turns
+        return ("Earlier the user asked about topics " + " ".join(str(len(t["content"])) for t in turns))[:600]
+
+
+def question(i):
+    return f"Question {i}: could you explain the next step of the plan in some detail, including trade-offs?"
+
+
+async def run_full(llm, turns):
+    history, rows = [], []
+    for i in range(1, turns + 1):
+        messages = [{"role": "system", "content": SYSTEM_PROMPT}, *history, {"role": "user", "content": question(i)}]
+        start = time.perf_counter()
+        answer = await llm.complete(messages)
+        rows.append((sum(message_tokens(m) for m in messages), time.perf_counter() - start, 0.0))
+        history += [{"role": "user", "content": question(i)}, {"role": "assistant", "content": answer}]
+    return rows
+
+
+async def run_store(llm, turns, store):
+    session_id = f"bench-{time.time_ns()}"
+    rows = []
+    for i in range(1, turns + 1):
+        start = time.perf_counter()
+        messages = await store.messages(session_id, SYSTEM_PROMPT, question(i))
+        overhead = time.perf_counter() - start
+        answer = await llm.complete(messages)
+        appended = time.perf_counter()
+        await store.append(session_id, question(i), answer)
+        overhead += time.perf_counter() - appended
+        rows.append((sum(message_tokens(m) for m in messages), time.perf_counter() - start, overhead))
+    await store.drain()
+    await store.delete(session_id)
+    return rows
+
+
+def report(name, rows):
+    print(f"{name}:")
+    for turn in CHECKPOINTS:
+        if turn <= len(rows):
+            tokens, latency, overhead = rows[turn - 1]
+            print(f"    turn {turn:>4}: prompt {tokens:>7} tokens  latency {latency * 1000:>8.1f}ms  store {overhead * 1000:.2f}ms")
+    latencies = [latency for _, latency, _ in rows]
+    print(f"    total prompt tokens {sum(tokens for tokens, _, _ in rows)}, "
+          f"p50 {percentile(latencies, 50) * 1000:.1f}ms, p95 {percentile(latencies, 95) * 1000:.1f}ms, "
+          f"session {sum(latencies):.1f}s")
+
+
+async def run(args):
+    redis, redis_name = await pick_redis()
+    if not args.skip_full:
+        report("full history resent", await run_full(ModelledLLM(args.base_latency, args.token_latency, args.reply_chars), args.turns))
+
+    llm = ModelledLLM(args.base_latency, args.token_latency, args.reply_chars)
+    store = ConversationStore(
+        redis=redis, token_budget=args.budget, summary_threshold=args.threshold,
+        keep_turns=args.keep_turns, summarize=llm.summarize,
+    )
+    report(f"conversation store ({redis_name})", await run_store(llm, args.turns, store))
+    print(f"    background summaries {store.stats.summaries}, summary prompt tokens {llm.summary_tokens}, "
+          f"trimmed turns {store.stats.trimmed_turns}")
+
+
+def main_cli():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", type=int, default=100)
+    parser.add_argument("--budget", type=int, default=2000)
+    parser.add_argument("--threshold", type=int, default=1500)
+    parser.add_argument("--keep-turns", type=int, default=6)
+    parser.add_argument("--reply-chars", type=int, default=400)
+    parser.add_argument("--base-latency", type=float, default=0.05)
+    parser.add_argument("--token-latency", type=float, default=0.00005, help="seconds per prompt token")
+    parser.add_argument("--skip-full", action="store_true")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main_cli()
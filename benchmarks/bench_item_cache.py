@@ -0,0 +1,82 @@
+"""Item lookup latency: database vs Redis tier vs in-process near-cache.
+
+Uses the Redis from REDIS_HOST/REDIS_PORT when reachable, otherwise an
+in-process fakeredis (which makes the Redis tier look faster than it is).
+
+    python -m benchmarks.bench_item_cache --items 10000 --lookups 5000
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+import httpx
+
+os.environ.setdefault("OPENAI_API_KEY", "stub")
+os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}")
+
+import main  # noqa: E402
+from db.base import Base  # noqa: E402
+from benchmarks.common import print_summary, summarize  # noqa: E402
+from item_cache import ItemCache  # noqa: E402
+from redis_client import redis_client  # noqa: E402
+
+
+async def pick_redis():
+    try:
+        await redis_client.ping()
+        return redis_client, "redis"
+    except Exception:
+        import fakeredis
+        return fakeredis.FakeAsyncRedis(decode_responses=True), "fakeredis"
+
+
+async def timed_lookups(client, ids):
+    latencies = []
+    for item_id in ids:
+        start = time.perf_counter()
+        (await client.get(f"/items/{item_id}")).raise_for_status()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+async def run(items, lookups):
+    async with main.get_engine().begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    redis, redis_name = await pick_redis()
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for offset in range(0, items, 5000):
+            await client.post("/items/bulk", json={"items": [
+                {"id": i, "name": f"item {i}"} for i in range(offset + 1, min(offset + 5000, items) + 1)
+            ]})
+        ids = [random.randint(1, items) for _ in range(lookups)]
+
+        main.item_cache = ItemCache(redis=redis, enabled=False)
+        print_summary(summarize("database", await timed_lookups(client, ids)))
+
+        # local_ttl=0 expires the near-cache immediately, leaving only the Redis tier
+        main.item_cache = ItemCache(redis=redis, local_ttl=0)
+        await timed_lookups(client, ids)
+        print_summary(summarize(f"{redis_name} hit", await timed_lookups(client, ids)))
+
+        main.item_cache = ItemCache(redis=redis)
+        await timed_lookups(client, ids)
+        print_summary(summarize("near-cache hit", await timed_lookups(client, ids)))
+        print(f"    {main.item_cache.as_dict()}")
+    await main.get_engine().dispose()
+
+
+def main_cli():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=10000)
+    parser.add_argument("--lookups", type=int, default=5000)
+    args = parser.parse_args()
+    asyncio.run(run(args.items, args.lookups))
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,62 @@
+"""Insert N items through POST /items/ one by one vs POST /items/bulk.
+
+Uses DATABASE_URL when set (point it at Postgres for asyncpg numbers),
+otherwise a throwaway SQLite file.
+
+    python -m benchmarks.bench_items_bulk --items 100000 --batch-size 5000
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+import httpx
+
+os.environ.setdefault("OPENAI_API_KEY", "stub")
+os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}")
+
+import main  # noqa: E402
+from db.base import Base  # noqa: E402
+
+
+async def reset_table():
+    async with main.get_engine().begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+
+async def run(items, batch_size, single_items):
+    rows = [{"id": i, "name": f"item {i}", "description": "bench"} for i in range(1, items + 1)]
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=600) as client:
+        await reset_table()
+        start = time.perf_counter()
+        for row in rows[:single_items]:
+            (await client.post("/items/", json=row)).raise_for_status()
+        single = time.perf_counter() - start
+        print(f"single: {single_items} items in {single:.2f}s = {single_items / single:.0f} items/s")
+
+        await reset_table()
+        start = time.perf_counter()
+        for offset in range(0, items, batch_size):
+            response = await client.post("/items/bulk", json={"items": rows[offset:offset + batch_size]})
+            response.raise_for_status()
+            assert not response.json()["errors"]
+        bulk = time.perf_counter() - start
+        print(f"bulk:   {items} items in {bulk:.2f}s = {items / bulk:.0f} items/s "
+              f"({items / bulk / (single_items / single):.1f}x faster)")
+    await main.get_engine().dispose()
+
+
+def main_cli():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=100000)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--single-items", type=int, default=None, help="defaults to --items")
+    args = parser.parse_args()
+    asyncio.run(run(args.items, args.batch_size, args.single_items or args.items))
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,80 @@
+"""Latency and peak Python memory of reading the items table.
+
+Compares the old unbounded ORM read (every ItemModel, then every Item),
+one keyset page, a name-prefix page and the NDJSON export.
+
+    python -m benchmarks.bench_items_read --items 200000
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+import tracemalloc
+
+import httpx
+
+os.environ.setdefault("OPENAI_API_KEY", "stub")
+os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}")
+
+import main  # noqa: E402
+from db.base import Base  # noqa: E402
+from sqlalchemy.future import select  # noqa: E402
+
+
+async def measure(label, fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    count = await fn()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<28} rows={count:<8} {elapsed * 1000:>9.1f}ms  peak={peak / 1e6:>8.1f}MB")
+
+
+async def run(items):
+    async with main.get_engine().begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=600) as client:
+        for offset in range(0, items, 5000):
+            await client.post("/items/bulk", json={"items": [
+                {"id": i, "name": f"item-{i:07d}", "description": "benchmark row"}
+                for i in range(offset + 1, min(offset + 5000, items) + 1)
+            ]})
+
+        async def legacy():
+            async with main.open_session() as session:
+                result = await session.execute(select(main.ItemModel))
+                rows = [main.Item.model_validate(row, from_attributes=True) for row in result.scalars().all()]
+            return len(rows)
+
+        async def page(params):
+            response = await client.get("/items/", params=params)
+            return len(response.json())
+
+        async def export():
+            # httpx's ASGI transport buffers whole bodies, so drain the generator directly
+            count = 0
+            async for chunk in main.export_items(main.item_query(None, None, None, None)):
+                count += chunk.count("\n")
+            return count
+
+        await measure("legacy select(ItemModel)", legacy)
+        await measure("keyset page, limit=100", lambda: page({"limit": 100, "after": items // 2}))
+        await measure("prefix page, limit=1000", lambda: page({"limit": 1000, "name_prefix": "item-001"}))
+        await measure("projection page, id only", lambda: page({"limit": 1000, "fields": "id"}))
+        await measure("ndjson export", export)
+    await main.get_engine().dispose()
+
+
+def main_cli():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=200000)
+    args = parser.parse_args()
+    asyncio.run(run(args.items))
+
+
+if __name__ == "__main__":
+    main_cli()
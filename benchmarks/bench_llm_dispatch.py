@@ -0,0 +1,110 @@
+"""Upstream calls and throughput of the LLM dispatcher against the stub OpenAI.
+
+Interactive: prompts arrive as a Poisson process at each --rates level,
+drawn from --distinct prompts with a Zipf-like skew (a few popular
+questions, a long tail), with coalescing off and on. Batch lane: one
+--batch-size job of messages sent as direct calls vs one Batch API job.
+Counts are the requests the stub received.
+
+    python -m benchmarks.bench_llm_dispatch --rates 10,50,200 --seconds 5 --distinct 50
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "stub")
+os.environ.setdefault("LLM_MAX_RETRIES", "0")
+os.environ.setdefault("LLM_MODEL_CONCURRENCY", "gpt-4=256")
+os.environ.setdefault("LLM_MAX_CONNECTIONS", "256")
+
+import httpx  # noqa: E402
+
+from benchmarks.common import percentile, serve  # noqa: E402
+
+
+def stub_counts(url):
+    return httpx.get(url).json()
+
+
+async def interactive(dispatcher, rate, seconds, distinct):
+    weights = [1 / (i + 1) for i in range(distinct)]
+    latencies, errors = [], 0
+
+    async def one(prompt):
+        nonlocal errors
+        start = time.perf_counter()
+        try:
+            await dispatcher.complete("gpt-4", [{"role": "user", "content": prompt}], "bench")
+            latencies.append(time.perf_counter() - start)
+        except Exception:
+            errors += 1
+
+    tasks = []
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        prompt = f"question {random.choices(range(distinct), weights)[0]}"
+        tasks.append(asyncio.create_task(one(prompt)))
+        await asyncio.sleep(random.expovariate(rate))
+    await asyncio.gather(*tasks)
+    return len(tasks), latencies, errors, time.perf_counter() - start
+
+
+async def batch_job(dispatcher, size):
+    from assistant.dispatcher import batch_lane
+
+    start = time.perf_counter()
+    with batch_lane():
+        await asyncio.gather(*(
+            dispatcher.complete("gpt-4", [{"role": "user", "content": f"batch message {i}"}], "bench")
+            for i in range(size)
+        ))
+    return time.perf_counter() - start
+
+
+async def run(args, stub_url):
+    from assistant import llm_client
+    from assistant.dispatcher import LLMDispatcher
+
+    for rate in args.rates:
+        for coalesce in (False, True):
+            dispatcher = LLMDispatcher(llm_client._chat_completion, coalesce=coalesce)
+            before = stub_counts(stub_url)["calls"]
+            sent, latencies, errors, elapsed = await interactive(dispatcher, rate, args.seconds, args.distinct)
+            calls = stub_counts(stub_url)["calls"] - before
+            print(f"rate {rate:>5}/s  coalesce={'on ' if coalesce else 'off'}  requests {sent:>5}  upstream calls {calls:>5} "
+                  f"({calls / sent:.0%})  throughput {len(latencies) / elapsed:>7.1f}/s  "
+                  f"p95 {percentile(latencies, 95) * 1000:.0f}ms  errors {errors}")
+
+    for name, submit in (("direct calls", None), ("Batch API", llm_client.submit_batch)):
+        dispatcher = LLMDispatcher(llm_client._chat_completion, submit)
+        before = stub_counts(stub_url)
+        elapsed = await batch_job(dispatcher, args.batch_size)
+        after = stub_counts(stub_url)
+        requests = after["calls"] - before["calls"] + after["batch_api_calls"] - before["batch_api_calls"]
+        print(f"batch job of {args.batch_size}: {name:<12} upstream HTTP requests {requests:>5}  wall {elapsed:.1f}s")
+    await llm_client.aclose()
+
+
+def main_cli():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rates", type=lambda s: [float(r) for r in s.split(",")], default=[10, 50, 200])
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--distinct", type=int, default=50)
+    parser.add_argument("--llm-latency", type=float, default=0.5)
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--batch-latency", type=float, default=2.0, help="stub seconds until a batch completes")
+    parser.add_argument("--port", type=int, default=8930)
+    args = parser.parse_args()
+
+    with serve("benchmarks.stub_openai:app", args.port, {
+        "STUB_LLM_LATENCY": str(args.llm_latency), "STUB_BATCH_LATENCY": str(args.batch_latency),
+    }) as (stub_url, _):
+        os.environ["OPENAI_BASE_URL"] = f"{stub_url}/v1"
+        os.environ.setdefault("LLM_BATCH_POLL_INTERVAL", "0.5")
+        asyncio.run(run(args, stub_url))
+
+
+if __name__ == "__main__":
+    main_cli()
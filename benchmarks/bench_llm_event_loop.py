@@ -0,0 +1,54 @@
+"""Checks that /items/ latency stays flat while /ask calls are in flight.
+
+    python -m benchmarks.bench_llm_event_loop --llm-calls 32 --item-requests 200
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+
+from benchmarks.common import app_env, print_summary, run_server, summarize
+
+
+async def measure_items(client, count):
+    latencies = []
+    for _ in range(count):
+        start = time.perf_counter()
+        response = await client.get("/items/")
+        response.raise_for_status()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+async def run(base_url, llm_calls, item_requests):
+    async with httpx.AsyncClient(base_url=base_url, timeout=120) as client:
+        await client.post("/items/", json={"id": 1, "name": "bench"})
+        idle = await measure_items(client, item_requests)
+
+        ask_tasks = [
+            asyncio.create_task(client.post("/ask", json={"prompt": f"question {i}"}))
+            for i in range(llm_calls)
+        ]
+        await asyncio.sleep(0.1)
+        loaded = await measure_items(client, item_requests)
+        await asyncio.gather(*ask_tasks)
+
+    print_summary(summarize("/items/ idle", idle))
+    print_summary(summarize(f"/items/ with {llm_calls} /ask in flight", loaded))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--llm-calls", type=int, default=32)
+    parser.add_argument("--item-requests", type=int, default=200)
+    parser.add_argument("--llm-latency", type=float, default=2.0)
+    args = parser.parse_args()
+
+    with run_server("benchmarks.stub_openai:app", 8901, {"STUB_LLM_LATENCY": str(args.llm_latency)}) as stub_url:
+        with run_server("main:app", 8900, app_env(stub_url)) as app_url:
+            asyncio.run(run(app_url, args.llm_calls, args.item_requests))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Cost of the /metrics instrumentation on the request path.
+
+Times GET /cache-example/ in-process with the registry enabled and
+disabled, then the raw cost of one histogram observation.
+
+    python -m benchmarks.bench_metrics_overhead --requests 5000
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+import httpx
+
+os.environ.setdefault("OPENAI_API_KEY", "stub")
+os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}")
+
+import main  # noqa: E402
+from benchmarks.common import print_summary, summarize  # noqa: E402
+from metrics import Registry, registry  # noqa: E402
+
+
+async def timed_requests(client, requests):
+    latencies = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        (await client.get("/cache-example/")).raise_for_status()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def observe_cost(enabled, observations=200000):
+    histogram = Registry(enabled=enabled).histogram("bench_seconds", "Bench", ("stage",))
+    start = time.perf_counter()
+    for _ in range(observations):
+        histogram.observe(0.05, stage="stt")
+    return (time.perf_counter() - start) / observations
+
+
+async def run(requests):
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await timed_requests(client, 200)
+        for enabled in (False, True, False, True):
+            registry.enabled = enabled
+            print_summary(summarize(f"metrics {'on' if enabled else 'off'}", await timed_requests(client, requests)))
+    render_start = time.perf_counter()
+    body = registry.render()
+    print(f"/metrics render: {(time.perf_counter() - render_start) * 1000:.2f}ms, {len(body)} bytes")
+    for enabled in (False, True):
+        print(f"histogram.observe ({'on' if enabled else 'off'}): {observe_cost(enabled) * 1e9:.0f}ns")
+    await main.get_engine().dispose()
+
+
+def main_cli():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args()
+    asyncio.run(run(args.requests))
+
+
+if __name__ == "__main__":
+    main_cli()
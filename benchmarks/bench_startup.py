@@ -0,0 +1,95 @@
+"""Import time of main and cold start to the first answered request, against a budget.
+
+Runs `python -X importtime -c "import main"` and lists the slowest imports,
+then starts uvicorn and times how long until GET / answers. Exits 1 when a
+median is over its budget, so it can gate CI.
+
+    python -m benchmarks.bench_startup --runs 5 --import-budget-ms 1200 --cold-start-budget-ms 3000
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.common import ROOT_DIR
+
+ENV = {
+    **os.environ,
+    "OPENAI_API_KEY": "stub",
+    "DATABASE_URL": f"sqlite+aiosqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}",
+}
+
+
+def import_time():
+    """(total ms for main, [(ms, module)] of its direct imports)"""
+    output = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=ROOT_DIR, env=ENV, capture_output=True, text=True, check=True,
+    ).stderr
+    total, children = 0.0, []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        if name.strip() == "main" and depth == 0:
+            total = int(cumulative) / 1000
+        elif depth == 1:
+            children.append((int(cumulative) / 1000, name.strip()))
+    return total, sorted(children, reverse=True)
+
+
+def cold_start(port):
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT_DIR, env=ENV,
+    )
+    try:
+        while time.perf_counter() - start < 30:
+            try:
+                httpx.get(f"http://127.0.0.1:{port}/", timeout=1.0).raise_for_status()
+                return (time.perf_counter() - start) * 1000
+            except httpx.HTTPError:
+                time.sleep(0.01)
+        raise RuntimeError("main:app did not answer within 30s")
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+
+def main_cli():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--port", type=int, default=8910)
+    parser.add_argument("--import-budget-ms", type=float, default=1200)
+    parser.add_argument("--cold-start-budget-ms", type=float, default=3000)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    imports = [import_time() for _ in range(args.runs)]
+    import_ms = statistics.median(total for total, _ in imports)
+    print(f"import main: median {import_ms:.0f}ms over {args.runs} runs (budget {args.import_budget_ms:.0f}ms)")
+    for ms, module in imports[-1][1][:args.top]:
+        print(f"    {ms:>8.1f}ms  {module}")
+
+    starts = [cold_start(args.port) for _ in range(args.runs)]
+    start_ms = statistics.median(starts)
+    print(f"cold start to first request: median {start_ms:.0f}ms, max {max(starts):.0f}ms (budget {args.cold_start_budget_ms:.0f}ms)")
+
+    over = [name for name, value, budget in (
+        ("import", import_ms, args.import_budget_ms),
+        ("cold start", start_ms, args.cold_start_budget_ms),
+    ) if value > budget]
+    if over:
+        print(f"Over budget: {', '.join(over)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main_cli()
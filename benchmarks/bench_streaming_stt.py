@@ -0,0 +1,105 @@
+"""Replays WebM chunk sequences into StreamingTranscriber and measures
+end-of-speech -> final transcript latency.
+
+By default a recording with two tone bursts (speech at 1.0-2.5s and
+4.0-5.0s) is generated with ffmpeg. Pass --input with a real MediaRecorder
+capture and --speech-ends with the times (seconds) each utterance ends.
+Recognition is stubbed with a fixed delay.
+
+    python -m benchmarks.bench_streaming_stt --chunk-ms 250 --stt-latency 0.3
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import tempfile
+import time
+
+from audio_codec import FFMPEG_BINARY
+from benchmarks.common import print_summary, summarize
+from streaming_stt import StreamingTranscriber, VAD_END_SILENCE_MS
+
+
+def generate_recording(path):
+    subprocess.run([
+        FFMPEG_BINARY, "-y", "-loglevel", "error",
+        "-f", "lavfi", "-i", "sine=frequency=300:duration=6",
+        "-af", "volume='between(t,1,2.5)+between(t,4,5)':eval=frame",
+        "-c:a", "libopus", "-f", "webm", path,
+    ], check=True)
+    return [2.5, 5.0], 6.0
+
+
+def probe_duration(path):
+    output = subprocess.run(
+        [FFMPEG_BINARY, "-i", path, "-f", "null", "-"],
+        capture_output=True, text=True,
+    ).stderr
+    timestamp = output.rsplit("time=", 1)[1].split()[0]
+    hours, minutes, seconds = timestamp.split(":")
+    return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+
+async def replay(data, duration, chunk_ms, stt_latency, speech_ends):
+    chunk_count = max(1, int(duration * 1000 / chunk_ms))
+    chunk_size = -(-len(data) // chunk_count)
+    partials = []
+    finals = []
+
+    async def recognize(pcm):
+        await asyncio.sleep(stt_latency)
+        return f"{len(pcm)} bytes"
+
+    async def on_partial(text):
+        partials.append(time.perf_counter())
+
+    async def on_final(text, speech_ended_at):
+        finals.append(time.perf_counter())
+
+    async def on_error(text):
+        print("error:", text)
+
+    transcriber = StreamingTranscriber(recognize, on_partial, on_final, on_error)
+    start = time.perf_counter()
+    for index in range(chunk_count):
+        # MediaRecorder delivers a chunk every chunk_ms of audio
+        await asyncio.sleep(max(0.0, start + (index + 1) * chunk_ms / 1000 - time.perf_counter()))
+        await transcriber.feed(data[index * chunk_size:(index + 1) * chunk_size])
+    stop_sent = time.perf_counter()
+    await transcriber.finish()
+    await transcriber.close()
+
+    latencies = [
+        final - (start + speech_end)
+        for final, speech_end in zip(finals, speech_ends)
+    ]
+    print(f"chunks={chunk_count} chunk_ms={chunk_ms} partials={len(partials)} finals={len(finals)}")
+    print_summary(summarize("end of speech -> transcript", latencies))
+    print(f"    (includes {VAD_END_SILENCE_MS}ms end-of-speech silence window and {stt_latency * 1000:.0f}ms stub STT)")
+    if finals:
+        print(f"    last transcript {(finals[-1] - stop_sent) * 1000:.1f}ms after stop; "
+              f"whole-blob upload would only start recognizing at {duration:.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--input", help="recorded WebM file to replay")
+    parser.add_argument("--speech-ends", default="", help="comma separated utterance end times in seconds")
+    parser.add_argument("--chunk-ms", type=int, default=250)
+    parser.add_argument("--stt-latency", type=float, default=0.3)
+    args = parser.parse_args()
+
+    if args.input:
+        path = args.input
+        speech_ends = [float(t) for t in args.speech_ends.split(",") if t]
+        duration = probe_duration(path)
+    else:
+        path = os.path.join(tempfile.mkdtemp(), "utterances.webm")
+        speech_ends, duration = generate_recording(path)
+    with open(path, "rb") as f:
+        data = f.read()
+    asyncio.run(replay(data, duration, args.chunk_ms, args.stt_latency, speech_ends))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Time-to-first-audio and payload size: one base64 JSON reply vs sentence-streamed MP3 frames.
+
+LLM and gTTS are stubbed: tokens arrive every --token-delay seconds and
+synthesis costs --tts-per-char seconds per character and ~--bytes-per-char
+bytes of MP3.
+
+    python -m benchmarks.bench_streaming_tts --sentences 4
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "stub")
+os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}")
+# One client drives all the load; per-client rate limits would cap the benchmark, not the app
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+import main  # noqa: E402
+from voice_handler import voice_handler  # noqa: E402
+
+ANSWER_SENTENCE = "The weather today is sunny with a light breeze from the west."
+
+
+def install_stubs(answer, token_delay, tts_per_char, bytes_per_char):
+    async def transcribe(audio_data):
+        return "what is the weather like"
+
+    async def stream_ai_response(text):
+        for word in answer.split(" "):
+            await asyncio.sleep(token_delay)
+            yield word + " "
+
+    async def get_ai_response(text):
+        return "".join([token async for token in stream_ai_response(text)]).strip()
+
+    def text_to_speech(text):
+        time.sleep(len(text) * tts_per_char)
+        return b"\xff" * int(len(text) * bytes_per_char)
+
+    voice_handler.transcribe = transcribe
+    voice_handler.stream_ai_response = stream_ai_response
+    voice_handler.get_ai_response = get_ai_response
+    voice_handler.text_to_speech = text_to_speech
+
+
+def measure(client, url):
+    with client.websocket_connect(url) as websocket:
+        websocket.send_text(json.dumps({"type": "audio", "data": ""}))
+        websocket.receive_json()  # transcription
+        start = time.perf_counter()
+        first_audio = None
+        payload = 0
+        while True:
+            message = websocket.receive()
+            if message.get("bytes") is not None:
+                payload += len(message["bytes"])
+                first_audio = first_audio or time.perf_counter()
+                continue
+            payload += len(message["text"])
+            data = json.loads(message["text"])
+            if data["type"] == "response":
+                first_audio = time.perf_counter()
+                break
+            if data["type"] == "response_end":
+                break
+        return first_audio - start, time.perf_counter() - start, payload
+
+
+def main_cli():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sentences", type=int, default=4)
+    parser.add_argument("--token-delay", type=float, default=0.02)
+    parser.add_argument("--tts-per-char", type=float, default=0.002)
+    parser.add_argument("--bytes-per-char", type=float, default=300)
+    args = parser.parse_args()
+    install_stubs(" ".join([ANSWER_SENTENCE] * args.sentences), args.token_delay, args.tts_per_char, args.bytes_per_char)
+
+    with TestClient(main.app) as client:
+        print(f"{'mode':<22} {'first_audio_ms':>15} {'complete_ms':>12} {'payload_bytes':>14}")
+        for mode, url in [("base64 JSON", "/ws/voice"), ("sentence stream", "/ws/voice?tts=stream")]:
+            first_audio, complete, payload = measure(client, url)
+            print(f"{mode:<22} {first_audio * 1000:>15.1f} {complete * 1000:>12.1f} {payload:>14}")
+        print("server stats:", client.get("/stats/voice-stream").json())
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,65 @@
+"""Hit rate and latency of the TTS phrase cache on a skewed phrase workload.
+
+gTTS is stubbed with a fixed synthesis delay and MP3 size.
+
+    python -m benchmarks.bench_tts_cache --requests 2000 --phrases 300
+"""
+import argparse
+import random
+import tempfile
+import time
+
+import voice_handler as voice_module
+from gtts import gTTS
+from benchmarks.common import print_summary, summarize
+from tts_cache import TTSCache
+from voice_handler import VoiceHandler
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--phrases", type=int, default=300)
+    parser.add_argument("--synthesis", type=float, default=0.05)
+    parser.add_argument("--mp3-bytes", type=int, default=24000)
+    parser.add_argument("--memory-mb", type=float, default=2)
+    parser.add_argument("--disk-mb", type=float, default=64)
+    args = parser.parse_args()
+
+    def write_to_fp(tts, fp):
+        time.sleep(args.synthesis)
+        fp.write(b"\xff" * args.mp3_bytes)
+
+    gTTS.write_to_fp = write_to_fp
+    cache = TTSCache(
+        directory=tempfile.mkdtemp(),
+        memory_bytes=int(args.memory_mb * 1024 * 1024),
+        disk_bytes=int(args.disk_mb * 1024 * 1024),
+    )
+    voice_module.tts_cache = cache
+    handler = VoiceHandler()
+
+    phrases = [f"Sure, here is answer number {i}." for i in range(args.phrases)]
+    # Zipf-like skew: a few short answers dominate
+    weights = [1 / (rank + 1) for rank in range(args.phrases)]
+    latencies = {"memory": [], "disk": [], "miss": []}
+    random.seed(1)
+    for phrase in random.choices(phrases, weights, k=args.requests):
+        before = (cache.memory_hits, cache.disk_hits)
+        start = time.perf_counter()
+        handler.text_to_speech(phrase)
+        elapsed = time.perf_counter() - start
+        if cache.memory_hits > before[0]:
+            latencies["memory"].append(elapsed)
+        elif cache.disk_hits > before[1]:
+            latencies["disk"].append(elapsed)
+        else:
+            latencies["miss"].append(elapsed)
+
+    for tier, values in latencies.items():
+        print_summary(summarize(f"tts {tier}", values))
+    print(cache.stats())
+
+
+if __name__ == "__main__":
+    main()
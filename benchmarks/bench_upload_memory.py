@@ -0,0 +1,87 @@
+"""Memory used to decode a /voice-chat upload, by recording length.
+
+"read whole" is the old path: the upload read into bytes and piped
+through ffmpeg with communicate(), holding the whole input and output.
+"streamed" is the current one: the spooled upload file fed to ffmpeg in
+chunks and decoding stopped at --max-seconds. Each case runs in a fresh
+process; peak is tracemalloc's Python allocation peak and the growth of
+the process' peak RSS. Needs an ffmpeg binary with libopus
+(FFMPEG_BINARY, default "ffmpeg").
+
+    python -m benchmarks.bench_upload_memory --durations 10,60,300,900 --max-seconds 60
+"""
+import argparse
+import os
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+
+import audio_codec
+from benchmarks.common import memory_mb
+
+
+def encode_recording(seconds, directory):
+    """A WebM/Opus file of seconds of tone, like a browser MediaRecorder upload"""
+    path = os.path.join(directory, f"{seconds}s.webm")
+    subprocess.run([
+        audio_codec.FFMPEG_BINARY, "-hide_banner", "-loglevel", "error", "-f", "lavfi",
+        "-i", f"sine=frequency=440:duration={seconds}", "-c:a", "libopus", "-b:a", "32k", "-f", "webm", path,
+    ], check=True)
+    return path
+
+
+def read_whole(path, max_seconds):
+    with open(path, "rb") as upload:
+        audio_data = upload.read()
+    process = subprocess.Popen(
+        [audio_codec.FFMPEG_BINARY, "-hide_banner", "-loglevel", "error", *audio_codec.webm_decoder.args],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+    )
+    pcm, _ = process.communicate(audio_data)
+    return len(pcm)
+
+
+def streamed(path, max_seconds):
+    with open(path, "rb") as upload:
+        return len(audio_codec.decode_to_pcm(upload, max_seconds))
+
+
+MODES = {"read whole": read_whole, "streamed": streamed}
+
+
+def measure(mode, path, max_seconds):
+    rss_before = memory_mb(os.getpid())[1]
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        outcome = f"{MODES[mode](path, max_seconds) / (audio_codec.SAMPLE_RATE * audio_codec.SAMPLE_WIDTH):.0f}s decoded"
+    except audio_codec.AudioTooLong as e:
+        outcome = f"rejected: {e}"
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 2**20, memory_mb(os.getpid())[1] - rss_before, elapsed, outcome
+
+
+def main_cli():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--durations", type=lambda s: [int(d) for d in s.split(",")], default=[10, 60, 300, 900])
+    parser.add_argument("--max-seconds", type=float, default=audio_codec.VOICE_MAX_SECONDS)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        for seconds in args.durations:
+            path = encode_recording(seconds, directory)
+            print(f"{seconds}s recording, {os.path.getsize(path) / 2**20:.1f}MB upload")
+            for mode in MODES:
+                # A fresh process per case, so peak RSS is this case's alone
+                with ProcessPoolExecutor(max_workers=1) as pool:
+                    python_peak, rss_growth, elapsed, outcome = pool.submit(measure, mode, path, args.max_seconds).result()
+                print(f"    {mode:<10}  python peak {python_peak:>7.1f}MB  RSS peak +{rss_growth:>6.1f}MB  "
+                      f"{elapsed * 1000:>6.0f}ms  {outcome}")
+
+
+if __name__ == "__main__":
+    main_cli()
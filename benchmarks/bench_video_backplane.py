@@ -0,0 +1,85 @@
+"""Cross-node frame latency and throughput through the Redis video backplane.
+
+Boots two uvicorn processes with VIDEO_BACKPLANE=true against the local
+Redis, connects the sender to one and the receiver to the other.
+
+    python -m benchmarks.bench_video_backplane --frames 500 --frame-bytes 40000
+"""
+import argparse
+import asyncio
+import struct
+import time
+
+import websockets
+
+from benchmarks.common import app_env, print_summary, run_server, summarize
+from video_frames import decode_frame, encode_frame
+
+ROOM = "bench-backplane"
+
+
+async def measure(url_a, url_b, frames, frame_bytes):
+    filler = bytes(frame_bytes)
+    async with websockets.connect(f"{url_a}/ws/video/{ROOM}", max_size=None) as sender, \
+            websockets.connect(f"{url_b}/ws/video/{ROOM}", max_size=None) as receiver:
+
+        async def next_frame():
+            while True:
+                message = await receiver.recv()
+                if isinstance(message, bytes):
+                    return decode_frame(message)
+
+        # Node B announces itself asynchronously; probe until frames cross over
+        while True:
+            await sender.send(encode_frame(ROOM, "bench", 0, filler))
+            try:
+                await asyncio.wait_for(next_frame(), 0.2)
+                break
+            except asyncio.TimeoutError:
+                pass
+
+        latencies = []
+        for seq in range(1, frames + 1):
+            await sender.send(encode_frame(ROOM, "bench", seq, struct.pack("!d", time.perf_counter()) + filler))
+            frame = await next_frame()
+            latencies.append(time.perf_counter() - struct.unpack_from("!d", frame.payload)[0])
+        print_summary(summarize("cross-node latency", latencies))
+
+        # Throughput: send as fast as the sender can, count arrivals on the other node
+        start = time.perf_counter()
+
+        async def send_all():
+            for seq in range(frames):
+                await sender.send(encode_frame(ROOM, "bench", seq, filler))
+
+        async def receive_all():
+            received, last = 0, start
+            try:
+                while received < frames:
+                    await asyncio.wait_for(next_frame(), 2.0)
+                    received, last = received + 1, time.perf_counter()
+            except asyncio.TimeoutError:
+                pass
+            return received, last - start
+
+        _, (received, elapsed) = await asyncio.gather(send_all(), receive_all())
+        print(f"throughput: {received}/{frames} frames in {elapsed:.2f}s = {received / elapsed:.0f} frames/s "
+              f"({received * frame_bytes / elapsed / 1e6:.1f} MB/s); the rest were dropped for a slow consumer")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--frames", type=int, default=500)
+    parser.add_argument("--frame-bytes", type=int, default=40000)
+    parser.add_argument("--port", type=int, default=8031)
+    args = parser.parse_args()
+
+    # No reachable vision upstream; analysis fails fast and rarely runs
+    env = {**app_env("http://127.0.0.1:9"), "VIDEO_BACKPLANE": "true", "VIDEO_ANALYSIS_INTERVAL": "3600"}
+    with run_server("main:app", args.port, {**env, "NODE_ID": "bench-a"}) as url_a, \
+            run_server("main:app", args.port + 1, {**env, "NODE_ID": "bench-b"}) as url_b:
+        asyncio.run(measure(url_a.replace("http", "ws"), url_b.replace("http", "ws"), args.frames, args.frame_bytes))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Per-peer delivery latency for room broadcasts with one throttled peer.
+
+Compares the old sequential send loop with the per-peer writer engine in
+VideoCallManager, using in-memory sockets with a configurable send delay.
+
+    python -m benchmarks.bench_video_broadcast --peers 50 --frames 30 --slow-delay 0.2
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks.common import print_summary, summarize
+from video_call import VideoCallManager
+
+
+class TimedSocket:
+    def __init__(self, delay):
+        self.delay = delay
+        self.latencies = []
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, message):
+        await asyncio.sleep(self.delay)
+        self.latencies.append(time.perf_counter() - float(message.split(":", 1)[0]))
+
+    send_bytes = send_text
+
+
+async def sequential_broadcast(manager, message, room_id, sender):
+    # The pre-engine implementation: one await per peer, in order
+    for connection in manager.active_connections[room_id]:
+        if connection != sender:
+            await connection.send_text(message)
+
+
+async def run(mode, peers, frames, fps, slow_delay, payload):
+    manager = VideoCallManager()
+    sender = TimedSocket(0)
+    slow = TimedSocket(slow_delay)
+    fast = [TimedSocket(0.0005) for _ in range(peers - 2)]
+    for socket in [sender, slow, *fast]:
+        await manager.connect(socket, "bench")
+
+    broadcast = manager.broadcast if mode == "engine" else lambda *args: sequential_broadcast(manager, *args)
+    start = time.perf_counter()
+    for _ in range(frames):
+        await broadcast(f"{time.perf_counter()}:{payload}", "bench", sender)
+        await asyncio.sleep(1 / fps)
+    await asyncio.sleep(slow_delay * 2)
+    elapsed = time.perf_counter() - start
+
+    print(f"[{mode}] {peers} peers, {frames} frames in {elapsed:.2f}s")
+    print_summary(summarize("  fast peers", [latency for socket in fast for latency in socket.latencies]))
+    print_summary(summarize("  throttled peer", slow.latencies))
+    print(f"    throttled peer received {len(slow.latencies)}/{frames} frames")
+    for socket in [sender, slow, *fast]:
+        manager.disconnect(socket, "bench")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--peers", type=int, default=50)
+    parser.add_argument("--frames", type=int, default=30)
+    parser.add_argument("--fps", type=float, default=10)
+    parser.add_argument("--slow-delay", type=float, default=0.2)
+    parser.add_argument("--frame-bytes", type=int, default=40000)
+    args = parser.parse_args()
+    payload = "x" * args.frame_bytes
+    for mode in ("sequential", "engine"):
+        asyncio.run(run(mode, args.peers, args.frames, args.fps, args.slow_delay, payload))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Bytes on the wire and server CPU per frame: base64 data URLs vs binary frames.
+
+Relays the same JPEG through /ws/video/{room_id} in both modes and reports
+the frame size, the server-side relay time from /stats/video, and the
+process CPU time spent per frame (client and server share the process).
+
+    python -m benchmarks.bench_video_frames --frames 300 --width 640 --height 480
+"""
+import argparse
+import base64
+import os
+import tempfile
+import time
+from io import BytesIO
+
+os.environ.setdefault("OPENAI_API_KEY", "stub")
+os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}")
+# One client drives all the load; per-client rate limits would cap the benchmark, not the app
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+import main  # noqa: E402
+from video_call import manager  # noqa: E402
+from video_frames import encode_frame  # noqa: E402
+
+
+def make_jpeg(width, height):
+    try:
+        from PIL import Image
+    except ImportError:
+        return os.urandom(width * height // 10)
+    image = Image.frombytes("RGB", (width, height), os.urandom(width * height * 3))
+    buffer = BytesIO()
+    image.save(buffer, "JPEG", quality=50)
+    return buffer.getvalue()
+
+
+def main_cli():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=480)
+    args = parser.parse_args()
+
+    jpeg = make_jpeg(args.width, args.height)
+
+    async def process_video_frame(frame_data):
+        return "stub analysis"
+
+    manager.process_video_frame = process_video_frame
+    with TestClient(main.app) as client:
+        for mode in ("text", "binary"):
+            room = f"bench-{mode}"
+            with client.websocket_connect(f"/ws/video/{room}") as sender, \
+                    client.websocket_connect(f"/ws/video/{room}") as receiver:
+                cpu, wall = time.process_time(), time.perf_counter()
+                for seq in range(args.frames):
+                    # Encode on every frame, as the browser would
+                    if mode == "text":
+                        sender.send_text("data:image/jpeg;base64," + base64.b64encode(jpeg).decode())
+                        receiver.receive_text()
+                    else:
+                        sender.send_bytes(encode_frame(room, "bench", seq, jpeg))
+                        receiver.receive_bytes()
+                cpu, wall = time.process_time() - cpu, time.perf_counter() - wall
+            stats = client.get("/stats/video").json()[mode]
+            print(
+                f"{mode:>6}: jpeg={len(jpeg)}B frame={stats['avg_frame_bytes']}B "
+                f"(+{(stats['avg_frame_bytes'] / len(jpeg) - 1) * 100:.1f}%) "
+                f"relay={stats['avg_relay_us']}us cpu/frame={cpu / args.frames * 1e6:.0f}us "
+                f"wall/frame={wall / args.frames * 1e6:.0f}us"
+            )
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,57 @@
+"""Peer relay latency on /ws/video/{room_id} while vision analysis is slow.
+
+The vision call is stubbed with a fixed delay; relay latency should stay
+flat as that delay grows.
+
+    python -m benchmarks.bench_video_relay --frames 50 --vision-latencies 0.1,1,3
+"""
+import argparse
+import asyncio
+import base64
+import os
+import tempfile
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "stub")
+os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}")
+# One client drives all the load; per-client rate limits would cap the benchmark, not the app
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+import main  # noqa: E402
+from benchmarks.common import print_summary, summarize  # noqa: E402
+from video_call import manager  # noqa: E402
+
+FRAME = "data:image/jpeg;base64," + base64.b64encode(os.urandom(30000)).decode()
+
+
+def main_cli():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--frames", type=int, default=50)
+    parser.add_argument("--vision-latencies", default="0.1,1,3")
+    args = parser.parse_args()
+
+    with TestClient(main.app) as client:
+        for vision_latency in [float(v) for v in args.vision_latencies.split(",")]:
+            async def process_video_frame(frame_data, latency=vision_latency):
+                await asyncio.sleep(latency)
+                return "stub analysis"
+
+            manager.process_video_frame = process_video_frame
+            room = f"bench-{vision_latency}"
+            latencies = []
+            with client.websocket_connect(f"/ws/video/{room}") as sender, \
+                    client.websocket_connect(f"/ws/video/{room}") as receiver:
+                for _ in range(args.frames):
+                    start = time.perf_counter()
+                    sender.send_text(FRAME)
+                    receiver.receive_text()
+                    latencies.append(time.perf_counter() - start)
+                analyzer = manager.analyzers[room]
+                print_summary(summarize(f"relay, vision={vision_latency}s", latencies))
+                print(f"    analyzer: {analyzer.stats()}")
+
+
+if __name__ == "__main__":
+    main_cli()
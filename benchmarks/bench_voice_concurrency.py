@@ -0,0 +1,88 @@
+"""N simultaneous /voice-chat clients against stubbed STT/LLM/TTS backends.
+
+The stubs block their thread like pydub/recognize_google/gTTS do, so the
+benchmark shows whether the event loop stays responsive (GET / latency)
+while voice requests are in flight, and how many requests get shed with 503.
+
+    python -m benchmarks.bench_voice_concurrency --clients 1,8,32 --stt 0.3 --tts 0.2
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+import httpx
+
+os.environ.setdefault("OPENAI_API_KEY", "stub")
+os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}")
+# One client drives all the load; per-client rate limits would cap the benchmark, not the app
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+import main  # noqa: E402
+from benchmarks.common import print_summary, summarize  # noqa: E402
+from voice_handler import voice_handler  # noqa: E402
+from worker_pool import voice_pool  # noqa: E402
+
+
+def install_stubs(stt_seconds, llm_seconds, tts_seconds):
+    def speech_to_text(audio_data):
+        time.sleep(stt_seconds)
+        return "what is the weather like"
+
+    async def get_ai_response(text):
+        await asyncio.sleep(llm_seconds)
+        return "It is sunny."
+
+    def text_to_speech(text):
+        time.sleep(tts_seconds)
+        return b"\xff\xfb" + b"\x00" * 4096
+
+    voice_handler.speech_to_text = speech_to_text
+    voice_handler.get_ai_response = get_ai_response
+    voice_handler.text_to_speech = text_to_speech
+
+
+async def probe_loop(client, stop, latencies):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await client.get("/")
+        latencies.append(time.perf_counter() - start)
+        await asyncio.sleep(0.01)
+
+
+async def run(client_counts):
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=300) as client:
+        for count in client_counts:
+            stop = asyncio.Event()
+            probe_latencies = []
+            probe = asyncio.create_task(probe_loop(client, stop, probe_latencies))
+            start = time.perf_counter()
+            responses = await asyncio.gather(*(
+                client.post("/voice-chat", files={"audio_file": ("a.webm", b"\x1a\x45\xdf\xa3", "audio/webm")})
+                for _ in range(count)
+            ))
+            wall = time.perf_counter() - start
+            stop.set()
+            await probe
+            ok = sum(r.status_code == 200 for r in responses)
+            shed = sum(r.status_code == 503 for r in responses)
+            print(f"clients={count:<4} wall={wall:.3f}s ok={ok} shed={shed} throughput={ok / wall:.1f} req/s")
+            print_summary(summarize("  GET / during voice load", probe_latencies))
+
+
+def main_cli():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", default="1,8,32")
+    parser.add_argument("--stt", type=float, default=0.3)
+    parser.add_argument("--llm", type=float, default=0.3)
+    parser.add_argument("--tts", type=float, default=0.2)
+    args = parser.parse_args()
+    install_stubs(args.stt, args.llm, args.tts)
+    print(f"voice pool: {voice_pool.max_workers} workers, queue limit {voice_pool.max_queue}")
+    asyncio.run(run([int(c) for c in args.clients.split(",")]))
+
+
+if __name__ == "__main__":
+    main_cli()
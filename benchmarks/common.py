@@ -0,0 +1,100 @@
+import contextlib
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(name, latencies):
+    return {
+        "name": name,
+        "count": len(latencies),
+        "mean_ms": round(statistics.mean(latencies) * 1000, 2) if latencies else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+    }
+
+
+def print_summary(summary):
+    print("{name:<32} n={count:<5} mean={mean_ms:>8}ms p50={p50_ms:>8}ms p95={p95_ms:>8}ms p99={p99_ms:>8}ms".format(**summary))
+
+
+def wait_until_ready(url, timeout=20.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            httpx.get(url, timeout=1.0)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Server at {url} did not start")
+
+
+@contextlib.contextmanager
+def serve(app, port, env=None):
+    """Run an ASGI app under uvicorn in a subprocess; yields (url, process)"""
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", app, "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT_DIR,
+        env={**os.environ, **(env or {})},
+    )
+    try:
+        wait_until_ready(f"http://127.0.0.1:{port}/")
+        yield f"http://127.0.0.1:{port}", process
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+
+@contextlib.contextmanager
+def run_server(app, port, env=None):
+    """Run an ASGI app under uvicorn in a subprocess for the duration of the block"""
+    with serve(app, port, env) as (url, _):
+        yield url
+
+
+def memory_mb(pid):
+    """(current, peak) resident set size of a process in MB, from /proc; (0, 0) elsewhere"""
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            fields = dict(line.split(":", 1) for line in status if ":" in line)
+    except OSError:
+        return 0.0, 0.0
+    current, peak = (int(fields.get(name, "0 kB").split()[0]) for name in ("VmRSS", "VmHWM"))
+    return round(current / 1024, 1), round(peak / 1024, 1)
+
+
+def app_env(stub_url, database_url=None):
+    """Environment for booting main:app against the stub upstreams and a migrated database.
+
+    Without database_url the database is a throwaway SQLite file.
+    """
+    if database_url is None:
+        database_url = f"sqlite+aiosqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    env = {
+        "OPENAI_API_KEY": "stub",
+        "OPENAI_BASE_URL": f"{stub_url}/v1",
+        "DATABASE_URL": database_url,
+        # One client drives all the load; per-client rate limits would cap the benchmark, not the app
+        "RATE_LIMIT_ENABLED": "false",
+    }
+    subprocess.run(
+        [sys.executable, "-m", "alembic", "upgrade", "head"],
+        cwd=ROOT_DIR, env={**os.environ, **env}, check=True, capture_output=True,
+    )
+    return env
@@ -0,0 +1,103 @@
+"""Soak: thousands of WebSocket clients that connect and walk away.
+
+Boots main:app and, for --rounds rounds, opens --connections sockets
+(half /ws/voice, half /ws/video across --rooms rooms). Half of them then
+drop the TCP connection without a close frame, and the other half stay
+open but never answer the heartbeat, like a half-open connection. Each
+round waits until /stats/connections shows them all reaped, then records
+the app's RSS. After --warmup rounds, the median RSS of the later half of
+the rounds is compared with the earlier half; exits 1 if it grew by more
+than --max-growth-mb.
+
+    python -m benchmarks.soak_websockets --rounds 10 --connections 2000 --idle-timeout 3
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+
+import httpx
+import websockets
+
+from benchmarks.common import app_env, memory_mb, serve
+
+
+async def open_and_abandon(ws_url, count, rooms, round_number):
+    async def one(i):
+        path = "/ws/voice" if i % 2 else f"/ws/video/soak-{round_number}-{i // 2 % rooms}"
+        try:
+            return await websockets.connect(f"{ws_url}{path}", open_timeout=30, ping_interval=None)
+        except Exception:
+            return None
+
+    sockets = await asyncio.gather(*(one(i) for i in range(count)))
+    opened = [ws for ws in sockets if ws is not None]
+    for ws in opened[::2]:
+        # Gone without a close frame
+        ws.transport.abort()
+    return opened, count - len(opened)
+
+
+async def wait_for_reaping(url, timeout):
+    start = time.perf_counter()
+    async with httpx.AsyncClient(base_url=url) as client:
+        while True:
+            stats = (await client.get("/stats/connections")).json()
+            if not stats["connections"] and not stats["video_rooms"] or time.perf_counter() - start > timeout:
+                return stats, time.perf_counter() - start
+            await asyncio.sleep(0.2)
+
+
+async def soak(args, url, pid):
+    ws_url = url.replace("http://", "ws://")
+    rss = []
+    for round_number in range(args.rounds):
+        opened, failed = await open_and_abandon(ws_url, args.connections, args.rooms, round_number)
+        peak = httpx.get(f"{url}/stats/connections").json()
+        stats, reaped_in = await wait_for_reaping(url, args.idle_timeout * 3 + 10)
+        for ws in opened:
+            ws.transport.abort()
+        current, _ = memory_mb(pid)
+        rss.append(current)
+        print(f"round {round_number + 1}: opened {len(opened):>5} ({failed} failed)  "
+              f"open at peak {sum(peak['connections'].values()):>5}  rooms {peak['video_rooms']:>4}  "
+              f"reaped in {reaped_in:>5.1f}s  left open {sum(stats['connections'].values())}  "
+              f"rooms {stats['video_rooms']}  RSS {current:.1f}MB")
+    print(f"closed by reason: {stats['closed']}")
+    return rss
+
+
+def main_cli():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--warmup", type=int, default=2, help="rounds that may grow the heap to its working size")
+    parser.add_argument("--connections", type=int, default=2000)
+    parser.add_argument("--rooms", type=int, default=100)
+    parser.add_argument("--idle-timeout", type=float, default=3)
+    parser.add_argument("--max-growth-mb", type=float, default=10)
+    parser.add_argument("--port", type=int, default=8940)
+    args = parser.parse_args()
+
+    with serve("benchmarks.stub_openai:app", args.port + 1) as (stub_url, _):
+        env = {
+            **app_env(stub_url),
+            "WS_IDLE_TIMEOUT": str(args.idle_timeout),
+            "WS_HEARTBEAT_INTERVAL": str(args.idle_timeout / 3),
+            "LOG_LEVEL": "WARNING",
+        }
+        with serve("main:app", args.port, env) as (url, process):
+            rss = asyncio.run(soak(args, url, process.pid))
+
+    # The first rounds grow the allocator's arenas to their working size and keep them;
+    # medians, because a single sample moves with whatever the allocator has not returned yet
+    measured = rss[args.warmup:]
+    half = len(measured) // 2
+    growth = statistics.median(measured[half:]) - statistics.median(measured[:half]) if half else 0.0
+    print(f"RSS growth after {args.warmup} warm-up rounds (median of later vs earlier rounds): {growth:+.1f}MB")
+    if growth > args.max_growth_mb:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main_cli()
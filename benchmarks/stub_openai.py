@@ -0,0 +1,156 @@
+"""Local stand-in for the OpenAI chat completions API, vision messages included,
+and the Batch API (files, batches) for chat completions.
+
+    STUB_LLM_LATENCY=1.0 uvicorn benchmarks.stub_openai:app --port 8901
+
+STUB_ERROR_RATE fails that share of requests with a 500. Batches complete
+STUB_BATCH_LATENCY seconds after they are created. GET / reports how many
+requests each API received.
+"""
+import asyncio
+import json
+import os
+import random
+import time
+import uuid
+
+from fastapi import FastAPI, File, Form, HTTPException, Request, UploadFile
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+STUB_LLM_LATENCY = float(os.getenv("STUB_LLM_LATENCY", 1.0))
+STUB_LLM_TOKEN_DELAY = float(os.getenv("STUB_LLM_TOKEN_DELAY", 0.02))
+STUB_ERROR_RATE = float(os.getenv("STUB_ERROR_RATE", 0))
+STUB_BATCH_LATENCY = float(os.getenv("STUB_BATCH_LATENCY", 2.0))
+
+app = FastAPI()
+app.state.calls = 0
+app.state.batch_api_calls = 0
+app.state.batched = 0
+files = {}
+batches = {}
+
+
+@app.get("/")
+async def root():
+    return {"calls": app.state.calls, "batch_api_calls": app.state.batch_api_calls, "batched": app.state.batched}
+
+
+def prompt_text(body):
+    prompt = body["messages"][-1]["content"]
+    if isinstance(prompt, list):
+        # Vision request: text parts plus image_url parts
+        prompt = " ".join(part["text"] for part in prompt if part.get("type") == "text")
+    return prompt
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    app.state.calls += 1
+    prompt = prompt_text(body)
+    if random.random() < STUB_ERROR_RATE:
+        await asyncio.sleep(STUB_LLM_LATENCY)
+        return JSONResponse({"error": {"message": "injected failure", "type": "server_error"}}, status_code=500)
+    if body.get("stream"):
+        return StreamingResponse(stream_reply(body["model"], f"stub reply to: {prompt}"), media_type="text/event-stream")
+    await asyncio.sleep(STUB_LLM_LATENCY)
+    return completion(body["model"], prompt)
+
+
+def completion(model, prompt):
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": f"stub reply to: {prompt}"},
+            "finish_reason": "stop",
+        }],
+        "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15},
+    }
+
+
+def file_object(file_id, data, purpose):
+    return {
+        "id": file_id, "object": "file", "bytes": len(data), "created_at": int(time.time()),
+        "filename": f"{file_id}.jsonl", "purpose": purpose, "status": "processed",
+    }
+
+
+@app.post("/v1/files")
+async def create_file(file: UploadFile = File(...), purpose: str = Form(...)):
+    app.state.batch_api_calls += 1
+    file_id = f"file-{uuid.uuid4().hex}"
+    files[file_id] = await file.read()
+    return file_object(file_id, files[file_id], purpose)
+
+
+@app.get("/v1/files/{file_id}/content")
+async def file_content(file_id: str):
+    app.state.batch_api_calls += 1
+    if file_id not in files:
+        raise HTTPException(status_code=404, detail="No such file")
+    return Response(files[file_id], media_type="application/octet-stream")
+
+
+@app.post("/v1/batches")
+async def create_batch(request: Request):
+    app.state.batch_api_calls += 1
+    body = await request.json()
+    batch_id = f"batch_{uuid.uuid4().hex}"
+    batches[batch_id] = {
+        "id": batch_id, "object": "batch", "endpoint": body["endpoint"], "input_file_id": body["input_file_id"],
+        "completion_window": body["completion_window"], "status": "in_progress", "created_at": int(time.time()),
+        "output_file_id": None, "error_file_id": None,
+    }
+    asyncio.get_running_loop().create_task(run_batch(batch_id))
+    return batches[batch_id]
+
+
+@app.get("/v1/batches/{batch_id}")
+async def get_batch(batch_id: str):
+    app.state.batch_api_calls += 1
+    if batch_id not in batches:
+        raise HTTPException(status_code=404, detail="No such batch")
+    return batches[batch_id]
+
+
+async def run_batch(batch_id):
+    batch = batches[batch_id]
+    await asyncio.sleep(STUB_BATCH_LATENCY)
+    output, errors = [], []
+    for line in files[batch["input_file_id"]].decode().splitlines():
+        request = json.loads(line)
+        app.state.batched += 1
+        if random.random() < STUB_ERROR_RATE:
+            errors.append({"id": uuid.uuid4().hex, "custom_id": request["custom_id"], "response": {
+                "status_code": 500, "body": {"error": {"message": "injected failure", "type": "server_error"}},
+            }, "error": None})
+            continue
+        output.append({"id": uuid.uuid4().hex, "custom_id": request["custom_id"], "response": {
+            "status_code": 200, "body": completion(request["body"]["model"], prompt_text(request["body"])),
+        }, "error": None})
+    for key, lines in (("output_file_id", output), ("error_file_id", errors)):
+        if lines:
+            file_id = f"file-{uuid.uuid4().hex}"
+            files[file_id] = "\n".join(json.dumps(line) for line in lines).encode()
+            batch[key] = file_id
+    batch["status"] = "completed"
+
+
+async def stream_reply(model, text):
+    completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+    await asyncio.sleep(STUB_LLM_LATENCY)
+    for word in text.split(" "):
+        chunk = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "delta": {"content": word + " "}, "finish_reason": None}],
+        }
+        yield f"data: {json.dumps(chunk)}\n\n"
+        await asyncio.sleep(STUB_LLM_TOKEN_DELAY)
+    yield "data: [DONE]\n\n"
@@ -0,0 +1,60 @@
+"""Local stand-ins for Google speech recognition and the gTTS backend.
+
+    STUB_STT_LATENCY=0.3 STUB_TTS_LATENCY=0.2 uvicorn benchmarks.stub_speech:app --port 8902
+
+Point the app at it with GOOGLE_STT_ENDPOINT=http://127.0.0.1:8902/speech-api/v2/recognize
+and GTTS_URL=http://127.0.0.1:8902. STUB_ERROR_RATE fails that share of requests with a 500.
+"""
+import asyncio
+import base64
+import json
+import os
+import random
+import urllib.parse
+
+from fastapi import FastAPI, Request
+from fastapi.responses import PlainTextResponse
+
+STUB_STT_LATENCY = float(os.getenv("STUB_STT_LATENCY", 0.3))
+STUB_TTS_LATENCY = float(os.getenv("STUB_TTS_LATENCY", 0.2))
+STUB_ERROR_RATE = float(os.getenv("STUB_ERROR_RATE", 0))
+STUB_TRANSCRIPT = os.getenv("STUB_TRANSCRIPT", "what is the weather like today")
+# Roughly what gTTS returns: about 1.5KB of 32kbps MP3 per word
+MP3_BYTES_PER_CHAR = 300
+
+app = FastAPI()
+app.state.calls = {"stt": 0, "tts": 0}
+
+
+def failed():
+    return random.random() < STUB_ERROR_RATE
+
+
+@app.get("/")
+async def root():
+    return app.state.calls
+
+
+@app.post("/speech-api/v2/recognize")
+async def recognize(request: Request):
+    await request.body()
+    app.state.calls["stt"] += 1
+    await asyncio.sleep(STUB_STT_LATENCY)
+    if failed():
+        return PlainTextResponse("injected failure", status_code=500)
+    result = {"result": [{"alternative": [{"transcript": STUB_TRANSCRIPT, "confidence": 0.9}], "final": True}], "result_index": 0}
+    return PlainTextResponse('{"result":[]}\n' + json.dumps(result) + "\n")
+
+
+@app.post("/_/TranslateWebserverUi/data/batchexecute")
+async def batchexecute(request: Request):
+    form = urllib.parse.parse_qs((await request.body()).decode())
+    text = json.loads(json.loads(form["f.req"][0])[0][0][1])[0]
+    app.state.calls["tts"] += 1
+    await asyncio.sleep(STUB_TTS_LATENCY)
+    if failed():
+        return PlainTextResponse("injected failure", status_code=500)
+    audio = base64.b64encode(b"\xff\xfb" + os.urandom(max(len(text), 1) * MP3_BYTES_PER_CHAR)).decode()
+    # The line gTTS scans for: ["wrb.fr","jQ1olc","[\"<base64 mp3>\"]",...]
+    line = json.dumps([["wrb.fr", "jQ1olc", json.dumps([audio]), None, None, None, "generic"]], separators=(",", ":"))
+    return PlainTextResponse(")]}'\n\n" + str(len(line)) + "\n" + line + "\n")
@@ -1,19 +1,132 @@
 # celery_worker.py
-import os
-from celery import Celery
+# Entry point of the worker process: .env is loaded before the modules below read their settings
 from dotenv import load_dotenv
-
 load_dotenv()
 
+import asyncio
+import base64
+import os
+import threading
+from contextlib import suppress
+from celery import Celery
+from kombu import Queue
+from assistant import llm_client
+from assistant.dispatcher import batch_lane
+from assistant.info_agent import info_agent
+from assistant.openai_assistant import ask_openai
+from voice_handler import voice_handler
+
 REDIS_HOST = os.getenv("REDIS_HOST", "redis")
 REDIS_PORT = os.getenv("REDIS_PORT", "6379")
 
-celery_app = Celery(
-    "worker",
-    broker=f"redis://{REDIS_HOST}:{REDIS_PORT}/0",
-    backend=f"redis://{REDIS_HOST}:{REDIS_PORT}/0"
+# Finished job results are kept in the result backend for this many seconds
+JOB_RESULT_TTL = int(os.getenv("JOB_RESULT_TTL", 3600))
+# Messages in one chat batch job answered at once
+JOB_CHAT_CONCURRENCY = int(os.getenv("JOB_CHAT_CONCURRENCY", 5))
+
+# Short user-facing work and long batch work get separate queues (and workers),
+# so a backlog of batch jobs never delays a transcription someone is waiting on:
+#   celery -A celery_worker.celery_app worker -Q interactive
+#   celery -A celery_worker.celery_app worker -Q batch
+INTERACTIVE_QUEUE = "interactive"
+BATCH_QUEUE = "batch"
+
+celery_app = Celery("worker")
+
+celery_app.conf.update(
+    broker_url=f"redis://{REDIS_HOST}:{REDIS_PORT}/0",
+    result_backend=f"redis://{REDIS_HOST}:{REDIS_PORT}/0",
+    task_queues=[Queue(INTERACTIVE_QUEUE), Queue(BATCH_QUEUE), Queue("celery")],
+    task_routes={
+        "celery_worker.transcribe_audio": {"queue": INTERACTIVE_QUEUE},
+        "celery_worker.render_tts": {"queue": INTERACTIVE_QUEUE},
+        "celery_worker.chat_batch": {"queue": BATCH_QUEUE},
+    },
+    # Priorities 0 (highest) to 9 within a queue
+    broker_transport_options={"priority_steps": list(range(10)), "queue_order_strategy": "priority"},
+    task_default_priority=5,
+    result_expires=JOB_RESULT_TTL,
+    task_track_started=True,
+    # Jobs are long: don't let one worker hoard messages another could start on
+    worker_prefetch_multiplier=1,
+    task_acks_late=True,
+    task_always_eager=os.getenv("CELERY_TASK_ALWAYS_EAGER", "false").lower() == "true",
 )
 
+_local = threading.local()
+
+def run_async(coro):
+    """Run a coroutine on this worker thread's long-lived event loop.
+
+    The loop outlives the task so the shared LLM client keeps its pooled connections.
+    """
+    loop = getattr(_local, "loop", None)
+    if loop is None:
+        loop = _local.loop = asyncio.new_event_loop()
+    return loop.run_until_complete(coro)
+
+def report_progress(task, done: int, total: int):
+    if not task.request.is_eager:
+        task.update_state(state="PROGRESS", meta={"done": done, "total": total})
+
 @celery_app.task
 def add(x, y):
     return x + y
+
+@celery_app.task(bind=True)
+def chat_batch(self, messages, strategy="alternate"):
+    """Same replies as /chat, with progress reported as each message is answered"""
+    agents = {"main": ask_openai, "info": info_agent}
+
+    def agent_for(idx):
+        if strategy == "alternate":
+            return "main" if idx % 2 == 0 else "info"
+        return strategy if strategy in agents else "main"
+
+    async def run():
+        # A Batch API job takes every message at once; direct calls are paced
+        semaphore = asyncio.Semaphore(len(messages) if llm_client.LLM_BATCH_API else JOB_CHAT_CONCURRENCY)
+        done = 0
+
+        async def answer(idx, message):
+            nonlocal done
+            name = agent_for(idx)
+            async with semaphore:
+                try:
+                    result = {"agent": name, "response": await agents[name](message)}
+                except Exception as e:
+                    result = {"agent": name, "error": str(e)}
+            done += 1
+            report_progress(self, done, len(messages))
+            return result
+
+        # Nobody is waiting on these replies interactively: their LLM calls take the batch lane
+        with batch_lane():
+            return await asyncio.gather(*(answer(idx, message) for idx, message in enumerate(messages)))
+
+    report_progress(self, 0, len(messages))
+    return {"chat": run_async(run())}
+
+@celery_app.task
+def transcribe_audio(pcm_path):
+    """pcm_path is a recording the API already decoded (and held to VOICE_MAX_SECONDS); removed once done.
+
+    It stays until the task finishes, so a job redelivered after a worker crash still finds it.
+    """
+    try:
+        with open(pcm_path, "rb") as f:
+            pcm = f.read()
+        text = voice_handler.pcm_to_text(pcm)
+    except Exception as e:
+        raise RuntimeError(f"Error in speech recognition: {e}") from e
+    finally:
+        with suppress(FileNotFoundError):
+            os.remove(pcm_path)
+    return {"text": text}
+
+@celery_app.task
+def render_tts(text, lang="en"):
+    audio = voice_handler.text_to_speech(text, lang=lang)
+    if not audio:
+        raise RuntimeError("Error generating speech")
+    return {"audio": base64.b64encode(audio).decode()}
@@ -0,0 +1,53 @@
+import inspect
+import threading
+from typing import Any, Callable, Dict, Optional
+
+
+class Container:
+    """Shared clients, each built on first use and closed on shutdown.
+
+    Modules register a factory at import time, which costs nothing; the
+    client, and usually the import of its library, only happens when
+    something first asks for it. Voice pool threads may ask concurrently,
+    so building is locked.
+    """
+
+    def __init__(self):
+        self._factories: Dict[str, Callable[[], Any]] = {}
+        self._closers: Dict[str, Callable[[Any], Any]] = {}
+        self._instances: Dict[str, Any] = {}
+        # Reentrant: a factory may get() the clients its own client is built on
+        self._lock = threading.RLock()
+
+    def provide(self, name: str, factory: Callable[[], Any], close: Optional[Callable[[Any], Any]] = None):
+        self._factories[name] = factory
+        if close is not None:
+            self._closers[name] = close
+
+    def get(self, name: str):
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+        with self._lock:
+            if name not in self._instances:
+                self._instances[name] = self._factories[name]()
+            return self._instances[name]
+
+    def built(self, name: str) -> bool:
+        return name in self._instances
+
+    async def close(self, name: str):
+        instance = self._instances.pop(name, None)
+        close = self._closers.get(name)
+        if instance is not None and close is not None:
+            result = close(instance)
+            if inspect.isawaitable(result):
+                await result
+
+    async def aclose(self):
+        """Close what was built, newest first"""
+        for name in reversed(list(self._instances)):
+            await self.close(name)
+
+
+container = Container()
@@ -1,15 +1,118 @@
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
-from sqlalchemy.orm import sessionmaker
-from dotenv import load_dotenv
 import os
+import time
+
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
-load_dotenv()
+from container import container
 
 DATABASE_URL = os.getenv("DATABASE_URL")
+DB_ECHO = os.getenv("DB_ECHO", "false").lower() == "true"
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 10))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+# Seconds a request waits for a free connection before failing
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 10))
+# Connections older than this are replaced, ahead of server or proxy idle timeouts
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", 30000))
+# Prepared statements cached per asyncpg connection; set to 0 behind pgbouncer in transaction mode
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", 500))
+
+
+class PoolMetrics:
+    """Checkout counters for the engine's connection pool"""
+
+    def __init__(self):
+        self.waiting = 0
+        self.checkouts = 0
+        self.timeouts = 0
+        self.checkout_seconds = 0.0
+        self.max_checkout_seconds = 0.0
+
+    def as_dict(self, pool) -> dict:
+        return {
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "overflow": max(pool.overflow(), 0),
+            "idle": pool.checkedin(),
+            "waiting": self.waiting,
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "avg_checkout_ms": round(self.checkout_seconds / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+            "max_checkout_ms": round(self.max_checkout_seconds * 1000, 3),
+        }
+
+
+pool_metrics = PoolMetrics()
+
+
+class MeteredPool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long and how many callers wait for a connection"""
+
+    def connect(self):
+        pool_metrics.waiting += 1
+        start = time.perf_counter()
+        try:
+            connection = super().connect()
+        except Exception:
+            pool_metrics.timeouts += 1
+            raise
+        finally:
+            pool_metrics.waiting -= 1
+        elapsed = time.perf_counter() - start
+        pool_metrics.checkouts += 1
+        pool_metrics.checkout_seconds += elapsed
+        pool_metrics.max_checkout_seconds = max(pool_metrics.max_checkout_seconds, elapsed)
+        return connection
+
+
+def engine_options(url: str) -> dict:
+    options = {
+        "echo": DB_ECHO,
+        "poolclass": MeteredPool,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+    if make_url(url).get_driver_name() == "asyncpg":
+        options["connect_args"] = {
+            "prepared_statement_cache_size": DB_STATEMENT_CACHE_SIZE,
+            "server_settings": {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)},
+        }
+    return options
+
+
+def build_engine():
+    if not DATABASE_URL:
+        raise RuntimeError("DATABASE_URL is not set")
+    return create_async_engine(DATABASE_URL, **engine_options(DATABASE_URL))
+
+
+# Built on first use, so importing the app needs no database settings
+container.provide("db_engine", build_engine, close=lambda engine: engine.dispose())
+container.provide("db_sessions", lambda: sessionmaker(bind=get_engine(), class_=AsyncSession, expire_on_commit=False))
+
+
+def get_engine():
+    return container.get("db_engine")
+
+
+def open_session() -> AsyncSession:
+    return container.get("db_sessions")()
+
+
+def pool_stats() -> dict:
+    """Empty until something has used the database: collecting stats never builds the engine"""
+    if not container.built("db_engine"):
+        return {}
+    return pool_metrics.as_dict(get_engine().pool)
 
-engine = create_async_engine(DATABASE_URL, echo=True)
-AsyncSessionLocal = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
 
 async def get_session():
-    async with AsyncSessionLocal() as session:
+    async with open_session() as session:
         yield session
@@ -0,0 +1,170 @@
+import json
+import logging
+import os
+import time
+from typing import Awaitable, Callable, Dict, Optional
+
+from redis.exceptions import RedisError, WatchError
+
+from cache import MISSING, CacheStats, LRUCache, SingleFlight
+from redis_client import redis_client
+
+logger = logging.getLogger(__name__)
+
+ITEM_CACHE_ENABLED = os.getenv("ITEM_CACHE_ENABLED", "true").lower() == "true"
+ITEM_CACHE_TTL = int(os.getenv("ITEM_CACHE_TTL", 300))
+# Misses are cached too, briefly, so lookups of absent ids don't all reach the database
+ITEM_CACHE_NEGATIVE_TTL = int(os.getenv("ITEM_CACHE_NEGATIVE_TTL", 30))
+# The near-cache is not invalidated across processes, so keep it short
+ITEM_CACHE_LOCAL_TTL = float(os.getenv("ITEM_CACHE_LOCAL_TTL", 2))
+ITEM_CACHE_LOCAL_SIZE = int(os.getenv("ITEM_CACHE_LOCAL_SIZE", 10000))
+ITEM_CACHE_REDIS_RETRY = float(os.getenv("ITEM_CACHE_REDIS_RETRY", 30))
+
+KEY_PREFIX = "item:"
+VERSION_PREFIX = "item-version:"
+
+Item = Optional[dict]
+Loader = Callable[[], Awaitable[Item]]
+
+
+class ItemCache:
+    """Read-through item cache: short-lived in-process near-cache over Redis.
+
+    Writers call invalidate() after committing. It bumps a per-item version
+    in Redis, and a reader only stores what it loaded if the version is
+    still the one it saw before going to the database (WATCH/MULTI), so a
+    load that raced with a write can't put the old row back.
+    """
+
+    def __init__(
+        self,
+        redis=redis_client,
+        ttl: int = ITEM_CACHE_TTL,
+        negative_ttl: int = ITEM_CACHE_NEGATIVE_TTL,
+        local_ttl: float = ITEM_CACHE_LOCAL_TTL,
+        local_size: int = ITEM_CACHE_LOCAL_SIZE,
+        enabled: bool = ITEM_CACHE_ENABLED,
+    ):
+        self.redis = redis
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.local_ttl = local_ttl
+        self.enabled = enabled
+        self.local = LRUCache(local_size, ttl=local_ttl)
+        self.flight = SingleFlight()
+        self.stats = CacheStats()
+        self.negative_hits = 0
+        self.stale_writes_skipped = 0
+        # Bumped on every local invalidation, guards the near-cache the way the version guards Redis
+        self._generations: Dict[int, int] = {}
+        self._redis_retry_at = 0.0
+
+    async def get(self, item_id: int, load: Loader) -> Item:
+        if not self.enabled:
+            return await load()
+
+        start = time.perf_counter()
+        value = self.local.get(KEY_PREFIX + str(item_id))
+        if value is not MISSING:
+            self._hit(value, start, local=True)
+            return value
+
+        if self.flight.pending(str(item_id)):
+            self.stats.coalesced += 1
+        return await self.flight.do(str(item_id), lambda: self._load(item_id, load, start))
+
+    async def invalidate(self, *item_ids: int):
+        """Call after the write has committed"""
+        if not self.enabled or not item_ids:
+            return
+        for item_id in item_ids:
+            self._generations[item_id] = self._generations.get(item_id, 0) + 1
+            self.local.delete(KEY_PREFIX + str(item_id))
+        if not self._redis_available():
+            return
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            for item_id in item_ids:
+                pipe.incr(VERSION_PREFIX + str(item_id))
+                pipe.expire(VERSION_PREFIX + str(item_id), self.ttl * 2)
+            pipe.delete(*(KEY_PREFIX + str(item_id) for item_id in item_ids))
+            await pipe.execute()
+        except (RedisError, OSError) as e:
+            self._redis_failed(e)
+
+    async def _load(self, item_id: int, load: Loader, start: float) -> Item:
+        key = KEY_PREFIX + str(item_id)
+        cached, version = await self._redis_read(item_id)
+        if cached is not None:
+            value = json.loads(cached)
+            self.local.set(key, value)
+            self._hit(value, start, local=False)
+            return value
+
+        generation = self._generations.get(item_id, 0)
+        value = await load()
+        self.stats.misses += 1
+        self.stats.miss_seconds += time.perf_counter() - start
+        fresh = True
+        if version is not MISSING:
+            fresh = await self._redis_store(item_id, value, version)
+        if fresh and self._generations.get(item_id, 0) == generation:
+            self.local.set(key, value)
+        return value
+
+    def _hit(self, value: Item, start: float, local: bool):
+        if local:
+            self.stats.local_hits += 1
+        else:
+            self.stats.redis_hits += 1
+        if value is None:
+            self.negative_hits += 1
+        self.stats.hit_seconds += time.perf_counter() - start
+
+    async def _redis_read(self, item_id: int):
+        """(cached json or None, version); version is MISSING when Redis is unavailable"""
+        if not self._redis_available():
+            return None, MISSING
+        try:
+            return tuple(await self.redis.mget(KEY_PREFIX + str(item_id), VERSION_PREFIX + str(item_id)))
+        except (RedisError, OSError) as e:
+            self._redis_failed(e)
+            return None, MISSING
+
+    async def _redis_store(self, item_id: int, value: Item, version: Optional[str]) -> bool:
+        """Cache what was loaded unless a write bumped the version meanwhile; False if it did"""
+        ttl = self.ttl if value is not None else self.negative_ttl
+        try:
+            async with self.redis.pipeline() as pipe:
+                await pipe.watch(VERSION_PREFIX + str(item_id))
+                if await pipe.get(VERSION_PREFIX + str(item_id)) != version:
+                    self.stale_writes_skipped += 1
+                    return False
+                pipe.multi()
+                pipe.set(KEY_PREFIX + str(item_id), json.dumps(value), ex=ttl)
+                await pipe.execute()
+        except WatchError:
+            self.stale_writes_skipped += 1
+            return False
+        except (RedisError, OSError) as e:
+            self._redis_failed(e)
+        return True
+
+    def _redis_available(self) -> bool:
+        return self.redis is not None and time.monotonic() >= self._redis_retry_at
+
+    def _redis_failed(self, error: Exception):
+        self.stats.errors += 1
+        self._redis_retry_at = time.monotonic() + ITEM_CACHE_REDIS_RETRY
+        logger.warning("Item cache Redis tier unavailable: %s", error)
+
+    def as_dict(self) -> dict:
+        return {
+            **self.stats.as_dict(),
+            "negative_hits": self.negative_hits,
+            "stale_writes_skipped": self.stale_writes_skipped,
+            "local_entries": len(self.local),
+        }
+
+
+item_cache = ItemCache()
@@ -1,43 +1,61 @@
-from fastapi import FastAPI, HTTPException, Depends, WebSocket, WebSocketDisconnect, UploadFile, File
-from fastapi.responses import FileResponse, StreamingResponse, HTMLResponse
+# Entry point: .env is loaded here, before the modules below read their settings
+from dotenv import load_dotenv
+load_dotenv()
+
+from fastapi import FastAPI, HTTPException, Depends, Query, WebSocket, WebSocketDisconnect, UploadFile, File
+from fastapi.responses import FileResponse, StreamingResponse, HTMLResponse, JSONResponse, PlainTextResponse, Response
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Optional
-from assistant.info_agent import info_agent
-from assistant.openai_assistant import ask_openai
-from sqlalchemy import Column, Integer, String
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+from assistant.info_agent import info_agent, info_agent_stream
+from assistant.openai_assistant import ask_openai, ask_openai_stream
+from assistant import llm_client
+from assistant.response_cache import response_cache
+from assistant.conversation import conversation_store
+from sqlalchemy import and_, case, delete, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from dotenv import load_dotenv
+from database import get_engine, get_session, open_session, pool_stats
+from models import Item as ItemModel
+from contextlib import asynccontextmanager
+import importlib
 import os
 from video_call import manager
 import json
 from io import BytesIO
-from voice_handler import voice_handler
+from voice_handler import stt_limiter, tts_limiter, voice_handler
+from worker_pool import PoolSaturated, voice_pool
+from rate_limit import RateLimited, client_id, rate_limiter
+from audio_codec import AudioDecodeError, AudioTooLong, decode_to_pcm, webm_decoder
+from upload_limit import UploadLimitMiddleware
+from ws_lifecycle import WS_VIDEO_MAX_MESSAGE, WS_VOICE_MAX_MESSAGE, ConnectionReaped, connection_tracker
+from streaming_stt import StreamingTranscriber
+from speech_pipeline import SpeechStreamTimer, speech_stream_stats
+from tts_cache import tts_cache
+from item_cache import item_cache
+from metrics import MetricsMiddleware, registry
+from container import container
 import base64
-
-# .env
-load_dotenv()
-DATABASE_URL = os.getenv("DATABASE_URL")
-
-# SQLAlchemy setup
-Base = declarative_base()
-engine = create_async_engine(DATABASE_URL, echo=True)
-AsyncSessionLocal = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
-
-# Dependency
-async def get_session():
-    async with AsyncSessionLocal() as session:
-        yield session
-
-# SQLAlchemy model
-class ItemModel(Base):
-    __tablename__ = "items"
-    id = Column(Integer, primary_key=True, index=True)
-    name = Column(String)
-    description = Column(String, nullable=True)
+import asyncio
+import logging
+import tempfile
+import uuid
+
+logger = logging.getLogger(__name__)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# Rows accepted by one bulk request, and rows per UPDATE/DELETE statement inside it
+ITEMS_BULK_MAX = int(os.getenv("ITEMS_BULK_MAX", 10000))
+ITEMS_BULK_CHUNK = int(os.getenv("ITEMS_BULK_CHUNK", 1000))
+# Largest page GET /items/ returns, and rows fetched per round trip by the NDJSON export
+ITEMS_PAGE_MAX = int(os.getenv("ITEMS_PAGE_MAX", 1000))
+ITEMS_EXPORT_CHUNK = int(os.getenv("ITEMS_EXPORT_CHUNK", 1000))
+# Decoded recordings waiting for a transcription job; must be storage the Celery workers see too
+JOB_UPLOAD_DIR = os.getenv("JOB_UPLOAD_DIR", tempfile.gettempdir())
+
+# INSERT ... ON CONFLICT lives in the dialect modules; only the one in use is imported
+def dialect_insert(table):
+    return importlib.import_module(f"sqlalchemy.dialects.{get_engine().dialect.name}").insert(table)
 
 # Pydantic models
 class Item(BaseModel):
@@ -48,16 +66,55 @@ class Item(BaseModel):
     class Config:
         orm_mode = True
 
+class BulkItems(BaseModel):
+    items: List[Item] = Field(..., max_length=ITEMS_BULK_MAX)
+
+class BulkDelete(BaseModel):
+    ids: List[int] = Field(..., max_length=ITEMS_BULK_MAX)
+
 class ChatRequest(BaseModel):
     messages: List[str]
     strategy: str = "alternate"
+    parallel: bool = False
+    max_concurrency: int = Field(5, ge=1, le=50)
+    # Continue a stored conversation; messages are then answered in order
+    session_id: Optional[str] = Field(None, max_length=128)
+
+class ChatJobRequest(BaseModel):
+    messages: List[str] = Field(..., min_length=1)
+    strategy: str = "alternate"
+    # 0 is the highest priority within the job's queue
+    priority: int = Field(5, ge=0, le=9)
+
+class TTSJobRequest(BaseModel):
+    text: str = Field(..., min_length=1)
+    lang: str = "en"
+    priority: int = Field(5, ge=0, le=9)
 
 class AskRequest(BaseModel):
     prompt: str
     agent: str = "main"
+    session_id: Optional[str] = Field(None, max_length=128)
+
+# Startup and shutdown
+# The schema is managed by Alembic: run `alembic upgrade head` before starting the app
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Configured here rather than at import, so importing the app has no logging side effects
+    logging.basicConfig(level=LOG_LEVEL)
+    webm_decoder.warm()
+    yield
+    await conversation_store.aclose()
+    await connection_tracker.aclose()
+    # Clients nobody used were never built and are skipped
+    await container.aclose()
+    await llm_client.aclose()
+    voice_pool.shutdown()
+    webm_decoder.close()
+    await manager.aclose()
 
 # FastAPI app
-app = FastAPI(debug=True)
+app = FastAPI(debug=True, lifespan=lifespan)
 
 # CORS middleware
 app.add_middleware(
@@ -68,6 +125,21 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Upload size cap for /voice-chat and /jobs/transcribe -> 413
+app.add_middleware(UploadLimitMiddleware)
+
+# Latency per route for /metrics
+app.add_middleware(MetricsMiddleware)
+
+# Admission control: over a client's rate limit -> 429, upstream queue over its budget -> 503
+@app.exception_handler(RateLimited)
+async def rate_limited_handler(request, exc: RateLimited):
+    return JSONResponse({"detail": str(exc)}, status_code=429, headers={"Retry-After": str(exc.retry_after)})
+
+@app.exception_handler(PoolSaturated)
+async def pool_saturated_handler(request, exc: PoolSaturated):
+    return JSONResponse({"detail": str(exc)}, status_code=503, headers={"Retry-After": str(exc.retry_after)})
+
 # Static files
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
@@ -82,27 +154,50 @@ async def root():
 # Voice chat endpoints
 @app.get("/voice-chat", response_class=HTMLResponse)
 async def voice_chat_page():
-    print("Accessing voice-chat page")  # Debug info
+    logger.debug("Accessing voice-chat page")
     return FileResponse(os.path.join(BASE_DIR, "voice_chat.html"))
 
-@app.post("/voice-chat")
-async def voice_chat(audio_file: UploadFile = File(...)):
+async def stream_audio(first, speech, timer: SpeechStreamTimer):
     try:
-        # Read audio file
-        audio_data = await audio_file.read()
-        
-        # Convert speech to text
-        text = voice_handler.speech_to_text(audio_data)
+        sentence, audio = first
+        timer.sent(sentence, audio)
+        yield audio
+        async for sentence, audio in speech:
+            timer.sent(sentence, audio)
+            yield audio
+    finally:
+        timer.finish()
+        await speech.aclose()
+
+@app.post("/voice-chat", dependencies=[Depends(rate_limiter.dependency("voice"))])
+async def voice_chat(audio_file: UploadFile = File(...), stream: bool = False, session_id: Optional[str] = Query(None, max_length=128)):
+    try:
+        # Спулированный файл загрузки декодируется по частям, целиком в память не читается
+        text = await voice_handler.transcribe(audio_file.file)
         if text.startswith("Error"):
             raise HTTPException(status_code=400, detail=text)
+
+        if stream:
+            # Chunked MP3: playback can start after the first sentence
+            timer = SpeechStreamTimer()
+            speech = voice_handler.stream_speech(text, session_id)
+            try:
+                first = await speech.__anext__()
+            except StopAsyncIteration:
+                raise HTTPException(status_code=500, detail="Empty AI response")
+            return StreamingResponse(
+                stream_audio(first, speech, timer),
+                media_type="audio/mpeg",
+                headers={"Content-Disposition": "attachment; filename=response.mp3"}
+            )
         
         # Get AI response
-        ai_response = voice_handler.get_ai_response(text)
+        ai_response = await voice_handler.get_ai_response(text, session_id)
         if ai_response.startswith("Error"):
             raise HTTPException(status_code=500, detail=ai_response)
         
         # Convert AI response to speech
-        audio_response = voice_handler.text_to_speech(ai_response)
+        audio_response = await voice_handler.synthesize(ai_response)
         if not audio_response:
             raise HTTPException(status_code=500, detail="Error generating speech response")
         
@@ -111,97 +206,516 @@ async def voice_chat(audio_file: UploadFile = File(...)):
             media_type="audio/mpeg",
             headers={"Content-Disposition": "attachment; filename=response.mp3"}
         )
+    except PoolSaturated as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except AudioTooLong as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 # Video call endpoints
 @app.get("/video-call", response_class=HTMLResponse)
 async def video_call_page():
-    print("Accessing video-call page")  # Debug info
+    logger.debug("Accessing video-call page")
     return FileResponse(os.path.join(BASE_DIR, "video_call.html"))
 
 @app.websocket("/ws/video/{room_id}")
 async def video_call_endpoint(websocket: WebSocket, room_id: str):
+    try:
+        await rate_limiter.hit("video", client_id(websocket))
+    except RateLimited:
+        # Закрытие до accept: клиент получает отказ в handshake
+        await websocket.close(code=1013)
+        return
     await manager.connect(websocket, room_id)
+    peer = manager.peers[websocket]
+    connection_tracker.open(websocket, "video", room_id, buffered=lambda: peer.queued_bytes)
+    reason = "error"
     try:
         while True:
-            data = await websocket.receive_text()
+            data = await connection_tracker.receive(websocket, WS_VIDEO_MAX_MESSAGE)
+            if data["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(data.get("code", 1000))
             try:
-                ai_analysis = await manager.process_video_frame(data, room_id)
-                await manager.broadcast(data, room_id, websocket)
-                await websocket.send_text(json.dumps({
-                    "type": "ai_analysis",
-                    "content": ai_analysis
-                }))
+                # Бинарные кадры с заголовком или старый текстовый data URL
+                frame = data["bytes"] if data.get("bytes") is not None else data["text"]
+                await manager.relay_frame(frame, room_id, websocket)
             except Exception as e:
                 await websocket.send_text(json.dumps({
                     "type": "error",
                     "content": str(e)
                 }))
     except WebSocketDisconnect:
+        reason = "disconnect"
+    except ConnectionReaped as e:
+        reason = e.reason
+        await connection_tracker.reap(websocket, e)
+    finally:
+        # Любой выход (обрыв, таймаут, ошибка) освобождает место в комнате
+        connection_tracker.close(websocket, reason)
         manager.disconnect(websocket, room_id)
-        await manager.broadcast(json.dumps({
+        await manager.broadcast({
             "type": "system",
             "content": "A participant has left the call"
-        }), room_id, websocket)
+        }, room_id, websocket)
 
 # AI endpoints
-@app.post("/ask")
-def ask(request: AskRequest):
+@app.post("/ask", dependencies=[Depends(rate_limiter.dependency("ask"))])
+async def ask(request: AskRequest):
     if request.agent == "info":
-        answer = info_agent(request.prompt)
+        answer = await info_agent(request.prompt, session_id=request.session_id)
     else:
-        answer = ask_openai(request.prompt)
+        answer = await ask_openai(request.prompt, session_id=request.session_id)
     return {"response": answer}
 
-@app.post("/chat")
+def sse_event(data, event: Optional[str] = None) -> str:
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+def sse_response(events):
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.post("/ask/stream", dependencies=[Depends(rate_limiter.dependency("ask"))])
+async def ask_stream(request: AskRequest):
+    agent_stream = info_agent_stream if request.agent == "info" else ask_openai_stream
+    tokens = agent_stream(request.prompt, session_id=request.session_id)
+
+    async def events():
+        try:
+            async for token in tokens:
+                yield sse_event({"token": token})
+        except Exception as e:
+            yield sse_event({"error": str(e)}, event="error")
+        yield sse_event({}, event="done")
+
+    return sse_response(events())
+
+def pick_agent(strategy: str, idx: int):
+    if strategy == "alternate":
+        return ask_openai if idx % 2 == 0 else info_agent
+    return {"main": ask_openai, "info": info_agent}.get(strategy, ask_openai)
+
+def agent_name(agent) -> str:
+    return "info" if agent == info_agent else "main"
+
+async def run_chat_message(agent, message: str, semaphore: asyncio.Semaphore):
+    async with semaphore:
+        try:
+            return {"agent": agent_name(agent), "response": await agent(message)}
+        except Exception as e:
+            return {"agent": agent_name(agent), "error": str(e)}
+
+@app.post("/chat", dependencies=[Depends(rate_limiter.dependency("chat"))])
 async def chat_endpoint(request: ChatRequest):
+    if request.parallel and request.session_id:
+        raise HTTPException(status_code=400, detail="Messages in a session are answered in order; drop parallel or session_id")
+    if request.parallel:
+        semaphore = asyncio.Semaphore(request.max_concurrency)
+        response_log = await asyncio.gather(*(
+            run_chat_message(pick_agent(request.strategy, idx), message, semaphore)
+            for idx, message in enumerate(request.messages)
+        ))
+        return {"chat": response_log}
+
     response_log = []
-    agents = {"main": ask_openai, "info": info_agent}
-    
     for idx, message in enumerate(request.messages):
-        if request.strategy == "alternate":
-            agent = ask_openai if idx % 2 == 0 else info_agent
-        else:
-            agent = agents.get(request.strategy, ask_openai)
-
-        reply = agent(message)
-        response_log.append({"agent": "info" if agent == info_agent else "main", "response": reply})
+        agent = pick_agent(request.strategy, idx)
+        reply = await agent(message, session_id=request.session_id)
+        response_log.append({"agent": agent_name(agent), "response": reply})
 
     return {"chat": response_log}
 
+@app.post("/chat/stream", dependencies=[Depends(rate_limiter.dependency("chat"))])
+async def chat_stream(request: ChatRequest):
+    async def events():
+        for idx, message in enumerate(request.messages):
+            name = agent_name(pick_agent(request.strategy, idx))
+            agent_stream = info_agent_stream if name == "info" else ask_openai_stream
+            tokens = agent_stream(message, session_id=request.session_id)
+            yield sse_event({"index": idx, "agent": name}, event="message_start")
+            try:
+                async for token in tokens:
+                    yield sse_event({"index": idx, "token": token})
+            except Exception as e:
+                yield sse_event({"index": idx, "error": str(e)}, event="error")
+            yield sse_event({"index": idx}, event="message_end")
+        yield sse_event({}, event="done")
+
+    return sse_response(events())
+
+# Conversation memory
+@app.get("/sessions/{session_id}")
+async def get_conversation(session_id: str):
+    conversation = await conversation_store.load(session_id)
+    if not conversation.summary and not conversation.turns:
+        raise HTTPException(status_code=404, detail="Session not found")
+    return {"session_id": session_id, **conversation.as_dict()}
+
+@app.delete("/sessions/{session_id}")
+async def delete_conversation(session_id: str):
+    await conversation_store.delete(session_id)
+    return {"message": "Session deleted"}
+
 # Task endpoints
+# Celery is imported with the first job request, not at startup
+container.provide("jobs", lambda: importlib.import_module("celery_worker"))
+
+async def submit_job(task_name: str, *args, priority: int = 5):
+    task = getattr(container.get("jobs"), task_name)
+    # Publishing is blocking broker I/O
+    try:
+        result = await asyncio.to_thread(task.apply_async, args=args, priority=priority)
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Job queue unavailable: {e}")
+    return JSONResponse({"job_id": result.id, "status_url": f"/jobs/{result.id}"}, status_code=202)
+
+def job_status(job_id: str) -> dict:
+    from celery.result import AsyncResult
+
+    result = AsyncResult(job_id, app=container.get("jobs").celery_app)
+    # Unknown and expired ids are reported as PENDING by Celery
+    status = {"job_id": job_id, "state": result.state}
+    if result.state == "PROGRESS":
+        status["progress"] = result.info
+    elif result.state == "SUCCESS":
+        status["result"] = result.result
+    elif result.state == "FAILURE":
+        status["error"] = str(result.info)
+    return status
+
 @app.get("/task/")
 async def run_task():
-    return {"task_id": "667e7a72-4cd6-4fe9-94f4-466fa575dcb1"}
+    response = await submit_job("add", 2, 2)
+    return {"task_id": json.loads(response.body)["job_id"]}
+
+@app.post("/jobs/chat", dependencies=[Depends(rate_limiter.dependency("jobs"))])
+async def submit_chat_job(request: ChatJobRequest):
+    return await submit_job("chat_batch", request.messages, request.strategy, priority=request.priority)
+
+def write_file(path: str, data: bytes):
+    with open(path, "wb") as f:
+        f.write(data)
+
+@app.post("/jobs/transcribe", dependencies=[Depends(rate_limiter.dependency("jobs"))])
+async def submit_transcription_job(audio_file: UploadFile = File(...), priority: int = Query(5, ge=0, le=9)):
+    # Декодируется до постановки в очередь: слишком длинная или битая запись отклоняется сразу,
+    # а брокер получает только путь к PCM, размер которого ограничен VOICE_MAX_SECONDS
+    try:
+        pcm = await asyncio.to_thread(decode_to_pcm, audio_file.file)
+    except AudioTooLong as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except AudioDecodeError as e:
+        raise HTTPException(status_code=400, detail=f"Could not decode recording: {e}")
+    path = os.path.join(JOB_UPLOAD_DIR, f"transcribe-{uuid.uuid4().hex}.pcm")
+    await asyncio.to_thread(write_file, path, pcm)
+    try:
+        return await submit_job("transcribe_audio", path, priority=priority)
+    except HTTPException:
+        os.remove(path)
+        raise
+
+@app.post("/jobs/tts", dependencies=[Depends(rate_limiter.dependency("jobs"))])
+async def submit_tts_job(request: TTSJobRequest):
+    return await submit_job("render_tts", request.text, request.lang, priority=request.priority)
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    status = await asyncio.to_thread(job_status, job_id)
+    if status["state"] == "SUCCESS" and "audio" in status["result"]:
+        # The MP3 is served by /jobs/{job_id}/audio instead of inline base64
+        status["result"] = {"audio_url": f"/jobs/{job_id}/audio"}
+    return status
+
+@app.get("/jobs/{job_id}/audio")
+async def get_job_audio(job_id: str):
+    status = await asyncio.to_thread(job_status, job_id)
+    if status["state"] != "SUCCESS" or "audio" not in status["result"]:
+        raise HTTPException(status_code=404, detail="No audio for this job")
+    return Response(base64.b64decode(status["result"]["audio"]), media_type="audio/mpeg")
 
 @app.get("/cache-example/")
 async def cache_example():
     return {"message": "This is a cached response"}
 
+@app.get("/stats/cache")
+async def cache_stats():
+    return response_cache.stats.as_dict()
+
+@app.get("/stats/db")
+async def db_stats():
+    return pool_stats()
+
+@app.get("/stats/item-cache")
+async def item_cache_stats():
+    return item_cache.as_dict()
+
+@app.get("/stats/voice-pool")
+async def voice_pool_stats():
+    return voice_pool.stats()
+
+@app.get("/stats/voice-stream")
+async def voice_stream_stats():
+    return speech_stream_stats.as_dict()
+
+@app.get("/stats/tts-cache")
+async def tts_cache_stats():
+    return tts_cache.stats()
+
+@app.get("/stats/video")
+async def video_stats():
+    stats = manager.frame_stats.as_dict()
+    if manager.backplane is not None:
+        stats["backplane"] = manager.backplane.stats()
+    return stats
+
+@app.get("/stats/llm")
+async def llm_stats():
+    return {**llm_client.stream_stats.as_dict(), "dispatch": llm_client.dispatcher.stats.as_dict()}
+
+@app.get("/stats/admission")
+async def admission_stats():
+    return admission_stats_dict()
+
+def admission_stats_dict() -> dict:
+    return {
+        "rate_limit": rate_limiter.stats(),
+        "upstreams": {**llm_client.limiter_stats(), "stt": stt_limiter.stats(), "tts": tts_limiter.stats()},
+    }
+
+@app.get("/stats/conversations")
+async def conversation_stats():
+    return conversation_store.as_dict()
+
+@app.get("/stats/connections")
+async def connection_stats():
+    return connection_stats_dict()
+
+def connection_stats_dict() -> dict:
+    # Состояние менеджера рядом с трекером: утечка комнат или пиров видна сразу
+    return {
+        **connection_tracker.stats(),
+        "video_rooms": len(manager.active_connections),
+        "video_peers": len(manager.peers),
+        "video_analyzers": len(manager.analyzers),
+    }
+
+registry.stats("response_cache", response_cache.stats.as_dict)
+registry.stats("db_pool", pool_stats)
+registry.stats("item_cache", item_cache.as_dict)
+registry.stats("voice_pool", voice_pool.stats)
+registry.stats("voice_stream", speech_stream_stats.as_dict)
+registry.stats("tts_cache", tts_cache.stats)
+registry.stats("video", manager.frame_stats.as_dict)
+registry.stats("llm_stream", llm_client.stream_stats.as_dict)
+registry.stats("llm_dispatch", llm_client.dispatcher.stats.as_dict)
+registry.stats("conversations", conversation_store.as_dict)
+registry.stats("admission", admission_stats_dict)
+registry.stats("websockets", connection_stats_dict)
+if manager.backplane is not None:
+    registry.stats("video_backplane", manager.backplane.stats)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus text format; the /stats endpoints above are included as gauges"""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
 # Database endpoints
 @app.post("/items/", response_model=Item)
 async def create_item(item: Item, session: AsyncSession = Depends(get_session)):
-    result = await session.execute(select(ItemModel).where(ItemModel.id == item.id))
-    existing = result.scalar_one_or_none()
-    if existing:
+    # One statement instead of SELECT + INSERT + refresh
+    result = await session.execute(
+        dialect_insert(ItemModel).values(**item.dict())
+        .on_conflict_do_nothing(index_elements=["id"])
+        .returning(ItemModel.id, ItemModel.name, ItemModel.description)
+    )
+    created = result.mappings().one_or_none()
+    if created is None:
         raise HTTPException(status_code=400, detail="Item already exists")
-
-    new_item = ItemModel(**item.dict())
-    session.add(new_item)
     await session.commit()
-    await session.refresh(new_item)
-    return new_item
-
-@app.get("/items/", response_model=List[Item])
-async def read_items(session: AsyncSession = Depends(get_session)):
-    result = await session.execute(select(ItemModel))
-    return result.scalars().all()
+    # Drops a cached "not found" for this id
+    await item_cache.invalidate(item.id)
+    return created
+
+def chunks(rows: list, size: int = ITEMS_BULK_CHUNK):
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+def unique_rows(ids: List[int]):
+    """Split a bulk request into first occurrences and per-row errors for repeated ids"""
+    seen, rows, errors = set(), [], []
+    for index, item_id in enumerate(ids):
+        if item_id in seen:
+            errors.append({"index": index, "id": item_id, "detail": "Duplicate id in request"})
+        else:
+            seen.add(item_id)
+            rows.append(index)
+    return rows, errors
+
+def missing_rows(ids: List[int], rows: List[int], done: set, detail: str) -> list:
+    return [{"index": index, "id": ids[index], "detail": detail} for index in rows if ids[index] not in done]
+
+@app.post("/items/bulk")
+async def create_items(request: BulkItems, session: AsyncSession = Depends(get_session)):
+    """Multi-row INSERT ... ON CONFLICT DO NOTHING; existing ids are reported per row"""
+    ids = [item.id for item in request.items]
+    rows, errors = unique_rows(ids)
+    created = set()
+    if rows:
+        result = await session.execute(
+            dialect_insert(ItemModel).on_conflict_do_nothing(index_elements=["id"]).returning(ItemModel.id),
+            [request.items[index].dict() for index in rows],
+        )
+        created = set(result.scalars())
+    await session.commit()
+    await item_cache.invalidate(*created)
+    errors += missing_rows(ids, rows, created, "Item already exists")
+    return {"created": [ids[index] for index in rows if ids[index] in created], "errors": sorted(errors, key=lambda e: e["index"])}
+
+@app.put("/items/bulk")
+async def upsert_items(request: BulkItems, session: AsyncSession = Depends(get_session)):
+    """Multi-row INSERT ... ON CONFLICT DO UPDATE"""
+    ids = [item.id for item in request.items]
+    rows, errors = unique_rows(ids)
+    if rows:
+        statement = dialect_insert(ItemModel)
+        await session.execute(
+            statement.on_conflict_do_update(
+                index_elements=["id"],
+                set_={"name": statement.excluded.name, "description": statement.excluded.description},
+            ),
+            [request.items[index].dict() for index in rows],
+        )
+    await session.commit()
+    await item_cache.invalidate(*(ids[index] for index in rows))
+    return {"upserted": [ids[index] for index in rows], "errors": errors}
+
+@app.patch("/items/bulk")
+async def update_items(request: BulkItems, session: AsyncSession = Depends(get_session)):
+    """UPDATE ... SET col = CASE id ... END WHERE id IN (...) RETURNING id, one statement per chunk"""
+    ids = [item.id for item in request.items]
+    rows, errors = unique_rows(ids)
+    updated = set()
+    for chunk in chunks([request.items[index] for index in rows]):
+        result = await session.execute(
+            update(ItemModel)
+            .where(ItemModel.id.in_([item.id for item in chunk]))
+            .values(
+                name=case({item.id: item.name for item in chunk}, value=ItemModel.id),
+                description=case({item.id: item.description for item in chunk}, value=ItemModel.id),
+            )
+            .returning(ItemModel.id)
+            .execution_options(synchronize_session=False)
+        )
+        updated.update(result.scalars())
+    await session.commit()
+    await item_cache.invalidate(*updated)
+    errors += missing_rows(ids, rows, updated, "Item not found")
+    return {"updated": [ids[index] for index in rows if ids[index] in updated], "errors": sorted(errors, key=lambda e: e["index"])}
+
+@app.post("/items/bulk/delete")
+async def delete_items(request: BulkDelete, session: AsyncSession = Depends(get_session)):
+    rows, errors = unique_rows(request.ids)
+    deleted = set()
+    for chunk in chunks([request.ids[index] for index in rows]):
+        result = await session.execute(
+            delete(ItemModel).where(ItemModel.id.in_(chunk)).returning(ItemModel.id)
+            .execution_options(synchronize_session=False)
+        )
+        deleted.update(result.scalars())
+    await session.commit()
+    await item_cache.invalidate(*deleted)
+    errors += missing_rows(request.ids, rows, deleted, "Item not found")
+    return {"deleted": [request.ids[index] for index in rows if request.ids[index] in deleted], "errors": sorted(errors, key=lambda e: e["index"])}
+
+def prefix_upper_bound(prefix: str) -> Optional[str]:
+    """Smallest string greater than every string starting with prefix, in code point order"""
+    while prefix and prefix[-1] == chr(0x10FFFF):
+        prefix = prefix[:-1]
+    if not prefix:
+        return None
+    following = ord(prefix[-1]) + 1
+    # Surrogates cannot be stored as UTF-8; the next storable code point follows them
+    if 0xD800 <= following <= 0xDFFF:
+        following = 0xE000
+    return prefix[:-1] + chr(following)
+
+def name_prefix_filter(prefix: str, dialect: str):
+    """name LIKE 'prefix%' as a range compared by code point.
+
+    Only then is the range the same as the prefix match: under a linguistic
+    collation such as Postgres' default en_US.utf8, case and punctuation only
+    break ties, so the range would let in names that do not start with the
+    prefix and leave out some that do. Postgres compares under COLLATE "C",
+    which ix_items_name_c indexes; SQLite's default BINARY collation already
+    compares by code point (and its LIKE would ignore case).
+    """
+    column = ItemModel.name.collate("C") if dialect == "postgresql" else ItemModel.name
+    upper = prefix_upper_bound(prefix)
+    return and_(column >= prefix, column < upper) if upper is not None else column >= prefix
+
+def item_query(fields: Optional[str], after: Optional[int], name: Optional[str], name_prefix: Optional[str]):
+    """Plain column SELECT ordered by id, so rows come back as tuples without ORM objects"""
+    names = ["id"] + [f for f in (fields or "name,description").split(",") if f and f != "id"]
+    unknown = set(names) - set(ItemModel.__table__.c.keys())
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    query = select(*(ItemModel.__table__.c[f] for f in names)).order_by(ItemModel.id)
+    if after is not None:
+        query = query.where(ItemModel.id > after)
+    if name is not None:
+        query = query.where(ItemModel.name == name)
+    if name_prefix:
+        query = query.where(name_prefix_filter(name_prefix, get_engine().dialect.name))
+    return query
+
+async def export_items(query):
+    async with open_session() as session:
+        result = await session.stream(query.execution_options(yield_per=ITEMS_EXPORT_CHUNK))
+        async for rows in result.mappings().partitions():
+            yield "".join(json.dumps(dict(row)) + "\n" for row in rows)
+
+@app.get("/items/")
+async def read_items(
+    limit: int = Query(100, ge=1, le=ITEMS_PAGE_MAX),
+    after: Optional[int] = None,
+    name: Optional[str] = None,
+    name_prefix: Optional[str] = None,
+    fields: Optional[str] = None,
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+    session: AsyncSession = Depends(get_session),
+):
+    """Keyset-paginated items; pass the X-Next-Cursor header back as ?after= for the next page.
+
+    format=ndjson streams every matching row instead, through a server-side cursor.
+    """
+    query = item_query(fields, after, name, name_prefix)
+    if format == "ndjson":
+        return StreamingResponse(export_items(query), media_type="application/x-ndjson")
+
+    result = await session.execute(query.limit(limit + 1))
+    rows = [dict(row) for row in result.mappings()]
+    headers = {}
+    if len(rows) > limit:
+        rows = rows[:limit]
+        headers["X-Next-Cursor"] = str(rows[-1]["id"])
+    return JSONResponse(rows, headers=headers)
+
+async def load_item(item_id: int) -> Optional[dict]:
+    # Own session: cache hits never check out a connection
+    async with open_session() as session:
+        result = await session.execute(item_query(None, None, None, None).where(ItemModel.id == item_id))
+        row = result.mappings().one_or_none()
+    return dict(row) if row else None
 
 @app.get("/items/{item_id}", response_model=Item)
-async def read_item(item_id: int, session: AsyncSession = Depends(get_session)):
-    result = await session.execute(select(ItemModel).where(ItemModel.id == item_id))
-    item = result.scalar_one_or_none()
+async def read_item(item_id: int):
+    item = await item_cache.get(item_id, lambda: load_item(item_id))
     if not item:
         raise HTTPException(status_code=404, detail="Item not found")
     return item
@@ -216,6 +730,7 @@ async def update_item(item_id: int, updated: Item, session: AsyncSession = Depen
     item.name = updated.name
     item.description = updated.description
     await session.commit()
+    await item_cache.invalidate(item_id)
     await session.refresh(item)
     return item
 
@@ -228,24 +743,104 @@ async def delete_item(item_id: int, session: AsyncSession = Depends(get_session)
 
     await session.delete(item)
     await session.commit()
+    await item_cache.invalidate(item_id)
     return {"message": "Item deleted"}
 
 # WebSocket для голосового чата
+async def send_voice_reply_stream(websocket: WebSocket, text: str, session_id: str):
+    # Ответ по предложениям: текст кадром JSON, следом MP3 бинарным кадром
+    timer = SpeechStreamTimer()
+    await websocket.send_json({"type": "response_start"})
+    try:
+        async for sentence, audio in voice_handler.stream_speech(text, session_id):
+            message = json.dumps({"type": "response_chunk", "text": sentence})
+            await websocket.send_text(message)
+            await websocket.send_bytes(audio)
+            timer.sent(sentence, audio, overhead=len(message))
+    finally:
+        timer.finish()
+    await websocket.send_json({"type": "response_end", "text": " ".join(timer.text)})
+
+async def send_voice_reply(websocket: WebSocket, text: str, session_id: str):
+    if websocket.query_params.get("tts") == "stream":
+        await send_voice_reply_stream(websocket, text, session_id)
+        return
+
+    # Получаем ответ от AI
+    ai_response = await voice_handler.get_ai_response(text, session_id)
+    if ai_response.startswith("Error"):
+        await websocket.send_json({
+            "type": "error",
+            "text": ai_response
+        })
+        return
+
+    # Конвертируем ответ в речь
+    audio_response = await voice_handler.synthesize(ai_response)
+    if not audio_response:
+        await websocket.send_json({
+            "type": "error",
+            "text": "Error generating speech response"
+        })
+        return
+
+    # Отправляем ответ
+    await websocket.send_json({
+        "type": "response",
+        "text": ai_response,
+        "audio": base64.b64encode(audio_response).decode()
+    })
+
+def voice_transcriber(websocket: WebSocket, session_id: str) -> StreamingTranscriber:
+    """Streaming protocol: binary frames carry WebM chunks, {"type": "stop"} ends the recording"""
+    async def on_partial(text):
+        await websocket.send_json({"type": "partial", "text": text})
+
+    async def on_final(text, speech_ended_at):
+        await websocket.send_json({"type": "transcription", "text": text})
+        await rate_limiter.hit("voice", client_id(websocket))
+        await send_voice_reply(websocket, text, session_id)
+
+    async def on_error(text):
+        await websocket.send_json({"type": "error", "text": text})
+
+    return StreamingTranscriber(voice_handler.transcribe_pcm, on_partial, on_final, on_error)
+
 @app.websocket("/ws/voice")
 async def voice_chat_websocket(websocket: WebSocket):
     await websocket.accept()
+    # Память разговора: ?session_id= продолжает сохранённую сессию, иначе своя на каждое подключение
+    session_id = websocket.query_params.get("session_id") or f"voice-{uuid.uuid4().hex}"
+    transcriber = None
+    connection_tracker.open(websocket, "voice", buffered=lambda: transcriber.buffered_bytes() if transcriber else 0)
+    reason = "error"
     try:
         while True:
-            data = await websocket.receive_text()
+            data = await connection_tracker.receive(websocket, WS_VOICE_MAX_MESSAGE)
+            if data["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(data.get("code", 1000))
             try:
+                if data.get("bytes") is not None:
+                    # Потоковый режим: куски WebM по мере записи
+                    if transcriber is None:
+                        transcriber = voice_transcriber(websocket, session_id)
+                    await transcriber.feed(data["bytes"])
+                    continue
+
                 # Парсим JSON данные
-                message = json.loads(data)
-                if message["type"] == "audio":
+                message = json.loads(data["text"])
+                if message["type"] == "stop":
+                    if transcriber is not None:
+                        await transcriber.finish()
+                        transcriber = None
+                elif message["type"] == "audio":
+                    # Каждая реплика — это STT, LLM и TTS: лимит на реплику, а не на подключение
+                    await rate_limiter.hit("voice", client_id(websocket))
                     # Декодируем base64 аудио
                     audio_data = base64.b64decode(message["data"])
                     
                     # Конвертируем в текст
-                    text = voice_handler.speech_to_text(audio_data)
+                    text = await voice_handler.transcribe(audio_data)
                     if text.startswith("Error"):
                         await websocket.send_json({
                             "type": "error",
@@ -258,42 +853,24 @@ async def voice_chat_websocket(websocket: WebSocket):
                         "type": "transcription",
                         "text": text
                     })
-                    
-                    # Получаем ответ от AI
-                    ai_response = voice_handler.get_ai_response(text)
-                    if ai_response.startswith("Error"):
-                        await websocket.send_json({
-                            "type": "error",
-                            "text": ai_response
-                        })
-                        continue
-                    
-                    # Конвертируем ответ в речь
-                    audio_response = voice_handler.text_to_speech(ai_response)
-                    if not audio_response:
-                        await websocket.send_json({
-                            "type": "error",
-                            "text": "Error generating speech response"
-                        })
-                        continue
-                    
-                    # Отправляем ответ
-                    await websocket.send_json({
-                        "type": "response",
-                        "text": ai_response,
-                        "audio": base64.b64encode(audio_response).decode()
-                    })
+                    await send_voice_reply(websocket, text, session_id)
+            except PoolSaturated:
+                await websocket.send_json({
+                    "type": "error",
+                    "text": "Server is busy, please try again"
+                })
             except Exception as e:
                 await websocket.send_json({
                     "type": "error",
                     "text": str(e)
                 })
     except WebSocketDisconnect:
-        print("Client disconnected")
-
-# Startup event
-@app.on_event("startup")
-async def startup():
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
-
+        reason = "disconnect"
+        logger.debug("Voice chat client disconnected")
+    except ConnectionReaped as e:
+        reason = e.reason
+        await connection_tracker.reap(websocket, e)
+    finally:
+        connection_tracker.close(websocket, reason)
+        if transcriber is not None:
+            await transcriber.close()
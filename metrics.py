@@ -0,0 +1,273 @@
+import os
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+# Seconds; covers cache hits through slow LLM and speech calls
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+Labels = Tuple[str, ...]
+
+
+def format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def format_labels(names: Iterable[str], values: Iterable[str]) -> str:
+    pairs = ",".join(
+        '{}="{}"'.format(name, str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"'))
+        for name, value in zip(names, values)
+    )
+    return "{" + pairs + "}" if pairs else ""
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, registry: "Registry", name: str, help: str, labels: Iterable[str] = ()):
+        self.registry = registry
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labels)
+        self._series: Dict[Labels, object] = {}
+
+    def _key(self, labels: dict) -> Labels:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def remove(self, **labels):
+        """Drop every series matching the given labels, e.g. a room that has closed"""
+        wanted = {self.labelnames.index(name): str(value) for name, value in labels.items()}
+        for key in [k for k in self._series if all(k[i] == v for i, v in wanted.items())]:
+            del self._series[key]
+
+    def clear(self):
+        self._series.clear()
+
+    def samples(self) -> List[Tuple[str, Labels, float]]:
+        return [(self.name, key, value) for key, value in self._series.items()]
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for name, key, value in self.samples():
+            lines.append(f"{name}{format_labels(self.labelnames, key)} {format_value(value)}")
+        return lines
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        if not self.registry.enabled:
+            return
+        key = self._key(labels)
+        self._series[key] = self._series.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._series.get(self._key(labels), 0)
+
+
+class Gauge(Metric):
+    """Set directly, or computed at scrape time by collect() -> {label values: value}"""
+
+    kind = "gauge"
+
+    def __init__(self, registry, name, help, labels=(), collect: Optional[Callable[[], Dict[Labels, float]]] = None):
+        super().__init__(registry, name, help, labels)
+        self.collect = collect
+
+    def set(self, value: float, **labels):
+        if self.registry.enabled:
+            self._series[self._key(labels)] = value
+
+    def samples(self):
+        if self.collect is not None:
+            return [(self.name, tuple(map(str, key)), value) for key, value in self.collect().items()]
+        return super().samples()
+
+
+class _Timer:
+    __slots__ = ("histogram", "labels", "start")
+
+    def __init__(self, histogram: "Histogram", labels: dict):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+        return False
+
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_TIMER = _NullTimer()
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, registry, name, help, labels=(), buckets: Iterable[float] = DEFAULT_BUCKETS):
+        super().__init__(registry, name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        if not self.registry.enabled:
+            return
+        key = self._key(labels)
+        series = self._series.get(key)
+        if series is None:
+            # Per-bucket counts (the last one is +Inf), sum, count
+            series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def time(self, **labels):
+        """with histogram.time(stage="stt"): ... ; free when metrics are disabled"""
+        if not self.registry.enabled:
+            return NULL_TIMER
+        return _Timer(self, labels)
+
+    def count(self, **labels) -> int:
+        series = self._series.get(self._key(labels))
+        return series[2] if series else 0
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        names = self.labelnames + ("le",)
+        for key, (counts, total, count) in self._series.items():
+            cumulative = 0
+            for bound, bucket in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket
+                lines.append(f"{self.name}_bucket{format_labels(names, key + (format_value(bound),))} {cumulative}")
+            lines.append(f"{self.name}_sum{format_labels(self.labelnames, key)} {format_value(total)}")
+            lines.append(f"{self.name}_count{format_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class Registry:
+    """Metrics rendered in the Prometheus text format by /metrics.
+
+    Hot paths only touch counters and histograms; the existing /stats
+    dictionaries are read when /metrics is scraped, not when events happen.
+    """
+
+    def __init__(self, enabled: bool = METRICS_ENABLED):
+        self.enabled = enabled
+        self._metrics: Dict[str, Metric] = {}
+        self._stats: Dict[str, Callable[[], dict]] = {}
+
+    def _add(self, metric: Metric) -> Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labels: Iterable[str] = ()) -> Counter:
+        return self._add(Counter(self, name, help, labels))
+
+    def gauge(self, name: str, help: str, labels: Iterable[str] = (), collect=None) -> Gauge:
+        return self._add(Gauge(self, name, help, labels, collect))
+
+    def histogram(self, name: str, help: str, labels: Iterable[str] = (), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._add(Histogram(self, name, help, labels, buckets))
+
+    def stats(self, prefix: str, collect: Callable[[], dict]):
+        """Export the numeric values of a /stats dictionary as <prefix>_<key> gauges"""
+        self._stats[prefix] = collect
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        for prefix, collect in self._stats.items():
+            for name, value in sorted(flatten(prefix, collect())):
+                lines.append(f"# TYPE {name} gauge")
+                lines.append(f"{name} {format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+    def clear(self):
+        for metric in self._metrics.values():
+            metric.clear()
+
+
+def flatten(prefix: str, stats: dict):
+    for key, value in stats.items():
+        name = f"{prefix}_{key}".replace("-", "_").replace(".", "_")
+        if isinstance(value, dict):
+            yield from flatten(name, value)
+        elif isinstance(value, bool):
+            yield name, int(value)
+        elif isinstance(value, (int, float)):
+            yield name, value
+
+
+registry = Registry()
+
+http_request_seconds = registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency until the response body is sent",
+    ("method", "route", "status"),
+)
+voice_stage_seconds = registry.histogram(
+    "voice_stage_duration_seconds", "Voice pipeline stage latency", ("stage",),
+)
+llm_request_seconds = registry.histogram(
+    "llm_request_duration_seconds", "LLM call latency until the last token", ("agent", "model", "mode"),
+)
+llm_ttft_seconds = registry.histogram(
+    "llm_time_to_first_token_seconds", "Streaming LLM time to first token", ("agent", "model"),
+)
+llm_tokens = registry.counter("llm_tokens_total", "LLM tokens by direction", ("agent", "model", "type"))
+llm_errors = registry.counter("llm_errors_total", "Failed LLM calls", ("agent", "model"))
+video_frames = registry.counter(
+    "video_frames_total", "Video call frames received, sent and dropped per room", ("room", "direction"),
+)
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording http_request_duration_seconds per route template.
+
+    Labelled with the matched route (/items/{item_id}), not the raw path,
+    so the number of series stays bounded.
+    """
+
+    def __init__(self, app, histogram: Histogram = http_request_seconds):
+        self.app = app
+        self.histogram = histogram
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.histogram.registry.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            self.histogram.observe(
+                time.perf_counter() - start,
+                method=scope["method"],
+                route=getattr(route, "path", "unmatched"),
+                status=status,
+            )
@@ -0,0 +1,164 @@
+import logging
+import math
+import os
+import time
+from typing import Callable, Dict, Tuple
+
+from redis.exceptions import RedisError
+from starlette.requests import HTTPConnection
+
+from cache import MISSING, LRUCache
+from redis_client import redis_client
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+# Per client and route: "route=requests/seconds", e.g. 60 requests per minute with bursts up to 60
+RATE_LIMITS = os.getenv("RATE_LIMITS", "ask=60/60,chat=20/60,voice=30/60,video=10/60,jobs=30/60")
+# Behind a proxy the client is the first X-Forwarded-For address; only trust it when the proxy sets it
+RATE_LIMIT_TRUST_FORWARDED = os.getenv("RATE_LIMIT_TRUST_FORWARDED", "false").lower() == "true"
+RATE_LIMIT_REDIS_RETRY = float(os.getenv("RATE_LIMIT_REDIS_RETRY", 30))
+RATE_LIMIT_LOCAL_SIZE = int(os.getenv("RATE_LIMIT_LOCAL_SIZE", 10000))
+
+KEY_PREFIX = "ratelimit:"
+
+# Refill, take and store in one step, so every worker shares one bucket per key.
+# Returns {allowed, seconds until enough tokens} (as a string: Lua numbers become integers).
+TOKEN_BUCKET = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local cost = tonumber(ARGV[4])
+local state = redis.call("HMGET", KEYS[1], "tokens", "ts")
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+local wait = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+else
+    wait = (cost - tokens) / rate
+end
+redis.call("HSET", KEYS[1], "tokens", tokens, "ts", now)
+redis.call("PEXPIRE", KEYS[1], math.ceil(capacity / rate * 1000) + 1000)
+return {allowed, tostring(wait)}
+"""
+
+
+def parse_limits(value: str) -> Dict[str, Tuple[int, float]]:
+    # "ask=60/60,chat=20/60" -> {"ask": (60, 60.0), "chat": (20, 60.0)}
+    limits = {}
+    for pair in filter(None, (p.strip() for p in value.split(","))):
+        route, _, limit = pair.partition("=")
+        requests, _, seconds = limit.partition("/")
+        limits[route.strip()] = (int(requests), float(seconds or 1))
+    return limits
+
+
+def client_id(conn: HTTPConnection) -> str:
+    if RATE_LIMIT_TRUST_FORWARDED:
+        forwarded = conn.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return conn.client.host if conn.client else "unknown"
+
+
+class RateLimited(Exception):
+    def __init__(self, route: str, retry_after: int):
+        super().__init__(f"Rate limit for {route} exceeded, retry in {retry_after}s")
+        self.route = route
+        self.retry_after = retry_after
+
+
+class RateLimiter:
+    """Token bucket per client and route, kept in Redis so all workers share it.
+
+    If Redis fails, each worker falls back to its own in-process buckets
+    (so the effective limit is multiplied by the number of workers) until
+    the retry window passes.
+    """
+
+    def __init__(
+        self,
+        redis=redis_client,
+        limits: str = RATE_LIMITS,
+        enabled: bool = RATE_LIMIT_ENABLED,
+        clock: Callable[[], float] = time.time,
+        local_size: int = RATE_LIMIT_LOCAL_SIZE,
+    ):
+        self.redis = redis
+        self.limits = parse_limits(limits)
+        self.enabled = enabled
+        self.clock = clock
+        self.local = LRUCache(local_size)
+        self.allowed = 0
+        self.limited: Dict[str, int] = {}
+        self.errors = 0
+        self._script = None
+        self._redis_retry_at = 0.0
+
+    async def hit(self, route: str, client: str, cost: int = 1):
+        """Take cost tokens from the client's bucket for route, or raise RateLimited"""
+        limit = self.limits.get(route)
+        if not self.enabled or limit is None:
+            return
+        capacity, seconds = limit
+        rate = capacity / seconds
+        key = f"{KEY_PREFIX}{route}:{client}"
+
+        result = await self._redis_take(key, capacity, rate, cost) if self._redis_available() else None
+        allowed, wait = result if result is not None else self._local_take(key, capacity, rate, cost)
+        if allowed:
+            self.allowed += 1
+            return
+        self.limited[route] = self.limited.get(route, 0) + 1
+        raise RateLimited(route, max(1, math.ceil(wait)))
+
+    async def _redis_take(self, key: str, capacity: int, rate: float, cost: int):
+        try:
+            if self._script is None:
+                self._script = self.redis.register_script(TOKEN_BUCKET)
+            allowed, wait = await self._script(keys=[key], args=[capacity, rate, self.clock(), cost])
+            return bool(int(allowed)), float(wait)
+        except (RedisError, OSError) as e:
+            self._redis_failed(e)
+            return None
+
+    def _local_take(self, key: str, capacity: int, rate: float, cost: int):
+        now = self.clock()
+        state = self.local.get(key)
+        tokens, ts = (capacity, now) if state is MISSING else state
+        tokens = min(capacity, tokens + max(0.0, now - ts) * rate)
+        if tokens >= cost:
+            self.local.set(key, (tokens - cost, now))
+            return True, 0.0
+        self.local.set(key, (tokens, now))
+        return False, (cost - tokens) / rate
+
+    def _redis_available(self) -> bool:
+        return self.redis is not None and time.monotonic() >= self._redis_retry_at
+
+    def _redis_failed(self, error: Exception):
+        self.errors += 1
+        self._redis_retry_at = time.monotonic() + RATE_LIMIT_REDIS_RETRY
+        logger.warning("Rate limiter Redis tier unavailable, using per-process buckets: %s", error)
+
+    def dependency(self, route: str):
+        """FastAPI dependency: Depends(rate_limiter.dependency("ask"))"""
+        async def check(conn: HTTPConnection):
+            await self.hit(route, client_id(conn))
+        return check
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "allowed": self.allowed,
+            "limited": sum(self.limited.values()),
+            "limited_by_route": dict(self.limited),
+            "errors": self.errors,
+        }
+
+
+rate_limiter = RateLimiter()
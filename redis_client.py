@@ -1,11 +1,17 @@
 import os
 import redis.asyncio as redis
-from dotenv import load_dotenv
 
-load_dotenv()
+REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
+REDIS_PORT = int(os.getenv("REDIS_PORT", 6379))
 
 redis_client = redis.Redis(
-    host=os.getenv("REDIS_HOST", "localhost"),
-    port=int(os.getenv("REDIS_PORT", 6379)),
+    host=REDIS_HOST,
+    port=REDIS_PORT,
     decode_responses=True,
 )
+
+# Raw bytes in and out, for binary payloads such as video frames
+redis_binary_client = redis.Redis(
+    host=REDIS_HOST,
+    port=REDIS_PORT,
+)
@@ -0,0 +1,130 @@
+import asyncio
+import os
+import re
+import time
+from typing import AsyncIterator, Awaitable, Callable, Optional, Tuple
+
+# Sentences shorter than this are merged with the next one so gTTS isn't called per word
+TTS_MIN_SENTENCE_CHARS = int(os.getenv("TTS_MIN_SENTENCE_CHARS", 20))
+# How many sentences may be synthesizing ahead of the one being sent
+TTS_LOOKAHEAD = int(os.getenv("TTS_LOOKAHEAD", 2))
+
+SENTENCE_END = re.compile(r"(?<=[.!?…])\s+|\n+")
+
+
+async def split_sentences(tokens: AsyncIterator[str], min_chars: int = TTS_MIN_SENTENCE_CHARS) -> AsyncIterator[str]:
+    """Re-chunk a token stream at sentence boundaries"""
+    buffer = ""
+    async for token in tokens:
+        buffer += token
+        while True:
+            match = None
+            for candidate in SENTENCE_END.finditer(buffer):
+                if candidate.start() >= min_chars:
+                    match = candidate
+                    break
+            if match is None:
+                break
+            sentence, buffer = buffer[:match.start()].strip(), buffer[match.end():]
+            if sentence:
+                yield sentence
+    if buffer.strip():
+        yield buffer.strip()
+
+
+async def stream_speech(
+    tokens: AsyncIterator[str],
+    synthesize: Callable[[str], Awaitable[Optional[bytes]]],
+    lookahead: int = TTS_LOOKAHEAD,
+) -> AsyncIterator[Tuple[str, bytes]]:
+    """Yield (sentence, mp3) in order, synthesizing upcoming sentences while earlier ones are sent"""
+    pending: "asyncio.Queue[Optional[Tuple[str, asyncio.Task]]]" = asyncio.Queue(maxsize=lookahead)
+
+    async def produce():
+        cancelled = False
+        try:
+            async for sentence in split_sentences(tokens):
+                synthesis = asyncio.create_task(synthesize(sentence))
+                try:
+                    await pending.put((sentence, synthesis))
+                except asyncio.CancelledError:
+                    # Not queued, so the cleanup below would never see it
+                    synthesis.cancel()
+                    raise
+        except asyncio.CancelledError:
+            cancelled = True
+            raise
+        finally:
+            # Once cancelled nobody reads the queue, and a full one would block here forever
+            if not cancelled:
+                await pending.put(None)
+
+    producer = asyncio.create_task(produce())
+    try:
+        while True:
+            item = await pending.get()
+            if item is None:
+                break
+            sentence, synthesis = item
+            audio = await synthesis
+            if not audio:
+                raise RuntimeError("Error generating speech response")
+            yield sentence, audio
+        await producer
+    finally:
+        producer.cancel()
+        while not pending.empty():
+            item = pending.get_nowait()
+            if item is not None:
+                item[1].cancel()
+
+
+class SpeechStreamStats:
+    def __init__(self):
+        self.responses = 0
+        self.first_audio_count = 0
+        self.first_audio_seconds = 0.0
+        self.bytes_sent = 0
+        self.base64_envelope_bytes = 0
+
+    def observe(self, first_audio_seconds: Optional[float], bytes_sent: int, text: str, audio_bytes: int):
+        self.responses += 1
+        if first_audio_seconds is not None:
+            self.first_audio_count += 1
+            self.first_audio_seconds += first_audio_seconds
+        self.bytes_sent += bytes_sent
+        # What the single {"type": "response", "audio": <base64>} message would have cost
+        self.base64_envelope_bytes += len(text) + 4 * -(-audio_bytes // 3) + 48
+
+    def as_dict(self) -> dict:
+        return {
+            "responses": self.responses,
+            "avg_time_to_first_audio_ms": round(self.first_audio_seconds / self.first_audio_count * 1000, 3) if self.first_audio_count else 0.0,
+            "bytes_sent": self.bytes_sent,
+            "base64_envelope_bytes": self.base64_envelope_bytes,
+        }
+
+
+speech_stream_stats = SpeechStreamStats()
+
+
+class SpeechStreamTimer:
+    """Tracks one streamed reply for speech_stream_stats"""
+
+    def __init__(self, started_at: Optional[float] = None):
+        self.started_at = started_at or time.perf_counter()
+        self.first_audio_at = None
+        self.bytes_sent = 0
+        self.audio_bytes = 0
+        self.text = []
+
+    def sent(self, sentence: str, audio: bytes, overhead: int = 0):
+        if self.first_audio_at is None:
+            self.first_audio_at = time.perf_counter()
+        self.text.append(sentence)
+        self.audio_bytes += len(audio)
+        self.bytes_sent += len(audio) + overhead
+
+    def finish(self):
+        first_audio = self.first_audio_at - self.started_at if self.first_audio_at else None
+        speech_stream_stats.observe(first_audio, self.bytes_sent, " ".join(self.text), self.audio_bytes)
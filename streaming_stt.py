@@ -0,0 +1,256 @@
+import asyncio
+import logging
+import math
+import os
+import time
+from array import array
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+from audio_codec import FFMPEG_BINARY, SAMPLE_RATE, SAMPLE_WIDTH
+
+logger = logging.getLogger(__name__)
+
+FRAME_MS = 30
+FRAME_BYTES = SAMPLE_RATE * SAMPLE_WIDTH * FRAME_MS // 1000
+
+VAD_ENERGY_THRESHOLD = float(os.getenv("VAD_ENERGY_THRESHOLD", 500))
+VAD_START_MS = int(os.getenv("VAD_START_MS", 90))
+VAD_END_SILENCE_MS = int(os.getenv("VAD_END_SILENCE_MS", 600))
+VAD_PREROLL_MS = int(os.getenv("VAD_PREROLL_MS", 300))
+VAD_MAX_UTTERANCE_MS = int(os.getenv("VAD_MAX_UTTERANCE_MS", 15000))
+STT_PARTIAL_INTERVAL_MS = int(os.getenv("STT_PARTIAL_INTERVAL_MS", 1000))
+# Partials recognize only the latest audio of the utterance, so their cost does not grow with its length
+STT_PARTIAL_WINDOW_MS = int(os.getenv("STT_PARTIAL_WINDOW_MS", 3000))
+
+
+def frame_energy(frame: bytes) -> float:
+    samples = array("h", frame)
+    if not samples:
+        return 0.0
+    return math.sqrt(sum(s * s for s in samples) / len(samples))
+
+
+class UtteranceSegmenter:
+    """Energy-based voice activity detection over a PCM stream.
+
+    feed() returns ("partial", pcm) events with the last
+    STT_PARTIAL_WINDOW_MS of an utterance while it grows, and a ("final",
+    pcm) event with all of it once VAD_END_SILENCE_MS of silence closes it.
+    """
+
+    def __init__(
+        self,
+        threshold: float = VAD_ENERGY_THRESHOLD,
+        start_ms: int = VAD_START_MS,
+        end_silence_ms: int = VAD_END_SILENCE_MS,
+        preroll_ms: int = VAD_PREROLL_MS,
+        max_utterance_ms: int = VAD_MAX_UTTERANCE_MS,
+        partial_interval_ms: int = STT_PARTIAL_INTERVAL_MS,
+        partial_window_ms: int = STT_PARTIAL_WINDOW_MS,
+    ):
+        self.threshold = threshold
+        self.start_frames = max(1, start_ms // FRAME_MS)
+        self.end_frames = max(1, end_silence_ms // FRAME_MS)
+        self.preroll_frames = preroll_ms // FRAME_MS
+        self.max_frames = max_utterance_ms // FRAME_MS
+        self.partial_frames = max(1, partial_interval_ms // FRAME_MS)
+        self.partial_window_frames = max(1, partial_window_ms // FRAME_MS)
+        self._pending = b""
+        self._preroll: List[bytes] = []
+        self._speech: List[bytes] = []
+        self._voiced_run = 0
+        self._silent_run = 0
+        self._since_partial = 0
+        self.in_speech = False
+
+    def feed(self, pcm: bytes) -> List[Tuple[str, bytes]]:
+        events = []
+        data = self._pending + pcm
+        usable = len(data) - len(data) % FRAME_BYTES
+        self._pending = data[usable:]
+        for offset in range(0, usable, FRAME_BYTES):
+            event = self._feed_frame(data[offset:offset + FRAME_BYTES])
+            if event:
+                events.append(event)
+        return events
+
+    def _feed_frame(self, frame: bytes) -> Optional[Tuple[str, bytes]]:
+        voiced = frame_energy(frame) >= self.threshold
+        if not self.in_speech:
+            self._preroll.append(frame)
+            self._voiced_run = self._voiced_run + 1 if voiced else 0
+            if self._voiced_run >= self.start_frames:
+                self.in_speech = True
+                self._speech = self._preroll
+                self._preroll = []
+                self._silent_run = 0
+                self._since_partial = 0
+            else:
+                del self._preroll[:-(self.preroll_frames + self.start_frames)]
+            return None
+
+        self._speech.append(frame)
+        self._silent_run = 0 if voiced else self._silent_run + 1
+        self._since_partial += 1
+        if self._silent_run >= self.end_frames or len(self._speech) >= self.max_frames:
+            return "final", self._take_utterance()
+        if self._since_partial >= self.partial_frames:
+            self._since_partial = 0
+            return "partial", b"".join(self._speech[-self.partial_window_frames:])
+        return None
+
+    def buffered_bytes(self) -> int:
+        return len(self._pending) + FRAME_BYTES * (len(self._preroll) + len(self._speech))
+
+    def _take_utterance(self) -> bytes:
+        utterance = b"".join(self._speech)
+        self._speech = []
+        self._voiced_run = 0
+        self.in_speech = False
+        return utterance
+
+    def flush(self) -> Optional[bytes]:
+        """End of stream: return whatever speech is still open"""
+        if self.in_speech and self._speech:
+            return self._take_utterance()
+        return None
+
+
+async def start_decoder():
+    """Long-lived ffmpeg process that turns a WebM chunk stream into PCM as it arrives"""
+    return await asyncio.create_subprocess_exec(
+        FFMPEG_BINARY, "-hide_banner", "-loglevel", "error",
+        "-f", "webm", "-i", "pipe:0",
+        "-f", "s16le", "-ac", "1", "-ar", str(SAMPLE_RATE), "pipe:1",
+        stdin=asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.PIPE,
+    )
+
+
+class StreamingTranscriber:
+    """One recording on /ws/voice: WebM chunks in, partial and final transcripts out.
+
+    Partials are best-effort (skipped while a previous one is still being
+    recognized); finals are recognized in order and passed to on_final along
+    with the time the utterance ended. If the decoder fails, on_error is
+    called once and later chunks are dropped.
+    """
+
+    def __init__(
+        self,
+        recognize: Callable[[bytes], Awaitable[str]],
+        on_partial: Callable[[str], Awaitable[None]],
+        on_final: Callable[[str, float], Awaitable[None]],
+        on_error: Callable[[str], Awaitable[None]],
+        decoder_factory=start_decoder,
+        segmenter: Optional[UtteranceSegmenter] = None,
+    ):
+        self.recognize = recognize
+        self.on_partial = on_partial
+        self.on_final = on_final
+        self.on_error = on_error
+        self.decoder_factory = decoder_factory
+        self.segmenter = segmenter or UtteranceSegmenter()
+        self.decoder = None
+        self._reader: Optional[asyncio.Task] = None
+        self._partial: Optional[asyncio.Task] = None
+        self._finals: "asyncio.Queue[Optional[Tuple[bytes, float]]]" = asyncio.Queue()
+        self._finals_bytes = 0
+        self._final_worker: Optional[asyncio.Task] = None
+        self._finishing = False
+        self.failed = False
+
+    async def feed(self, chunk: bytes):
+        if self.failed:
+            return
+        if self.decoder is None:
+            self.decoder = await self.decoder_factory()
+            self._reader = asyncio.create_task(self._read_pcm())
+            self._final_worker = asyncio.create_task(self._process_finals())
+        try:
+            self.decoder.stdin.write(chunk)
+            await self.decoder.stdin.drain()
+        except (BrokenPipeError, ConnectionResetError) as e:
+            await self._fail(f"decoder stopped reading: {e}")
+
+    async def _fail(self, reason: str):
+        if self.failed:
+            return
+        self.failed = True
+        logger.warning("Streaming audio decoder failed: %s", reason)
+        try:
+            await self.on_error("Error decoding the audio stream; stop and start a new recording")
+        except Exception as e:
+            logger.debug("Could not report decoder failure: %s", e)
+
+    async def finish(self):
+        """Client stopped recording: drain the decoder and emit the last utterance"""
+        if self.decoder is None:
+            return
+        self._finishing = True
+        self.decoder.stdin.close()
+        await self._reader
+        await self.decoder.wait()
+        tail = self.segmenter.flush()
+        if tail:
+            self._queue_final(tail)
+        self._finals.put_nowait(None)
+        await self._final_worker
+
+    async def close(self):
+        for task in (self._reader, self._partial, self._final_worker):
+            if task and not task.done():
+                task.cancel()
+        if self.decoder is not None and self.decoder.returncode is None:
+            self.decoder.kill()
+            await self.decoder.wait()
+
+    async def _read_pcm(self):
+        while True:
+            pcm = await self.decoder.stdout.read(FRAME_BYTES * 8)
+            if not pcm:
+                if not self._finishing:
+                    # Output ended while chunks were still coming: ffmpeg gave up on the stream
+                    await self.decoder.wait()
+                    await self._fail(f"ffmpeg exited with status {self.decoder.returncode}")
+                return
+            for kind, utterance in self.segmenter.feed(pcm):
+                if kind == "final":
+                    self._queue_final(utterance)
+                elif self._partial is None or self._partial.done():
+                    self._partial = asyncio.create_task(self._emit_partial(utterance))
+
+    def _queue_final(self, utterance: bytes):
+        self._finals_bytes += len(utterance)
+        self._finals.put_nowait((utterance, time.perf_counter()))
+
+    def buffered_bytes(self) -> int:
+        """PCM held for this recording: the open utterance plus finals waiting for recognition"""
+        return self.segmenter.buffered_bytes() + self._finals_bytes
+
+    async def _emit_partial(self, pcm: bytes):
+        try:
+            text = await self.recognize(pcm)
+        except Exception as e:
+            logger.debug("Partial recognition failed: %s", e)
+            return
+        if text:
+            await self.on_partial(text)
+
+    async def _process_finals(self):
+        while True:
+            item = await self._finals.get()
+            if item is None:
+                return
+            pcm, speech_ended_at = item
+            self._finals_bytes -= len(pcm)
+            try:
+                text = await self.recognize(pcm)
+            except Exception as e:
+                await self.on_error(f"Error in speech recognition: {e}")
+                continue
+            try:
+                await self.on_final(text, speech_ended_at)
+            except Exception as e:
+                logger.error("Failed to answer utterance: %s", e)
+                await self.on_error(str(e))
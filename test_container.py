@@ -0,0 +1,33 @@
+import asyncio
+import os
+import subprocess
+import sys
+
+from container import Container
+
+
+def test_builds_once_on_first_use_and_closes_only_what_was_built():
+    container = Container()
+    built, closed = [], []
+
+    async def close(client):
+        closed.append(client)
+
+    container.provide("llm", lambda: built.append("llm") or "llm client", close=close)
+    container.provide("speech", lambda: built.append("speech") or "recognizer", close=close)
+    assert built == []
+
+    assert container.get("llm") == "llm client"
+    assert container.get("llm") == "llm client"
+    assert built == ["llm"] and container.built("llm") and not container.built("speech")
+
+    asyncio.run(container.aclose())
+    assert closed == ["llm client"]
+    assert not container.built("llm")
+
+
+def test_importing_the_app_leaves_heavy_clients_unloaded():
+    code = "import sys, main; print(sorted(m for m in ('openai', 'celery_worker', 'gtts', 'speech_recognition') if m in sys.modules))"
+    env = {**os.environ, "OPENAI_API_KEY": "stub"}
+    output = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True).stdout
+    assert output.strip() == "[]"
@@ -0,0 +1,124 @@
+import asyncio
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+
+from assistant import openai_assistant
+from assistant.conversation import ConversationStore, message_tokens
+from main import app
+
+client = TestClient(app)
+
+
+class FakeSummarizer:
+    def __init__(self):
+        self.calls = []
+
+    async def __call__(self, summary, turns):
+        self.calls.append((summary, [turn["content"] for turn in turns]))
+        await asyncio.sleep(0)
+        return (summary + " " if summary else "") + "|".join(turn["content"] for turn in turns if turn["role"] == "user")
+
+
+def make_store(redis=None, **kwargs):
+    options = {"token_budget": 1000, "summary_threshold": 10000, "keep_turns": 4, "summarize": FakeSummarizer()}
+    options.update(kwargs)
+    return ConversationStore(redis=redis, **options)
+
+
+def test_prompt_keeps_newest_turns_within_the_token_budget():
+    async def run():
+        store = make_store(token_budget=100)
+        for i in range(20):
+            await store.append("s", f"question {i} " + "x" * 40, f"answer {i}")
+
+        messages = await store.messages("s", "system", "next")
+        assert messages[0] == {"role": "system", "content": "system"}
+        assert messages[-1] == {"role": "user", "content": "next"}
+        assert sum(message_tokens(m) for m in messages) <= 100
+        # Whatever fits is the most recent history, oldest first
+        history = [m["content"] for m in messages[1:-1]]
+        assert history and history[-1] == "answer 19"
+        assert history == [turn["content"] for turn in (await store.load("s")).turns[-len(history):]]
+        assert store.stats.trimmed_turns == 40 - len(history)
+
+    asyncio.run(run())
+
+
+def test_long_sessions_are_summarized_in_the_background_and_shared_through_redis():
+    fakeredis = pytest.importorskip("fakeredis")
+
+    async def run():
+        redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+        summarizer = FakeSummarizer()
+        node_a = make_store(redis, summary_threshold=50, summarize=summarizer)
+        node_b = make_store(redis, summary_threshold=50, summarize=summarizer, local_ttl=0)
+
+        for i in range(6):
+            await node_a.append("s", f"q{i} " + "x" * 40, f"a{i}")
+        await node_a.drain()
+
+        assert summarizer.calls
+        conversation = await node_b.load("s")
+        assert [turn["content"] for turn in conversation.turns] == ["q4 " + "x" * 40, "a4", "q5 " + "x" * 40, "a5"]
+        assert conversation.summary.startswith("q0 ")
+        assert await redis.llen("conversation:s:turns") == 4
+
+        # The summary takes the place of the folded turns in the prompt
+        messages = await node_b.messages("s", "system", "next")
+        assert messages[1]["role"] == "system" and "q0" in messages[1]["content"]
+
+        await node_b.delete("s")
+        node_a.local.clear()
+        assert (await node_a.load("s")).turns == []
+
+    asyncio.run(run())
+
+
+def test_only_completed_streams_are_recorded():
+    async def run():
+        store = make_store()
+
+        def open_stream(messages):
+            async def tokens():
+                yield "Hel"
+                yield "lo"
+            return tokens()
+
+        tokens = [token async for token in store.stream("s", "system", "hi", open_stream)]
+        assert tokens == ["Hel", "lo"]
+        assert [turn["content"] for turn in (await store.load("s")).turns] == ["hi", "Hello"]
+
+        def failing_stream(messages):
+            async def tokens():
+                yield "partial"
+                raise RuntimeError("upstream failed")
+            return tokens()
+
+        with pytest.raises(RuntimeError):
+            async for _ in store.stream("s", "system", "again", failing_stream):
+                pass
+        assert len((await store.load("s")).turns) == 2
+
+    asyncio.run(run())
+
+
+def test_ask_with_session_id_sends_history(monkeypatch):
+    prompts = []
+
+    async def fake_chat_completion(model, messages, agent="default", **kwargs):
+        prompts.append(messages)
+        return f"reply {len(prompts)}"
+
+    monkeypatch.setattr(openai_assistant, "chat_completion", fake_chat_completion)
+    session_id = uuid.uuid4().hex
+    for prompt in ["my name is Ann", "what is my name?"]:
+        response = client.post("/ask", json={"prompt": prompt, "session_id": session_id})
+        assert response.status_code == 200
+
+    assert [m["content"] for m in prompts[1][1:]] == ["my name is Ann", "reply 1", "what is my name?"]
+    assert client.get(f"/sessions/{session_id}").json()["turns"][-1] == {"role": "assistant", "content": "reply 2"}
+    assert client.delete(f"/sessions/{session_id}").status_code == 200
+    assert client.get(f"/sessions/{session_id}").status_code == 404
+    assert client.post("/chat", json={"messages": ["a"], "parallel": True, "session_id": session_id}).status_code == 400
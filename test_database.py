@@ -0,0 +1,62 @@
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from database import MeteredPool, engine_options, pool_metrics
+
+
+def test_engine_options_only_pass_asyncpg_settings_to_asyncpg():
+    assert "connect_args" not in engine_options("sqlite+aiosqlite:///x.db")
+    options = engine_options("postgresql+asyncpg://u:p@localhost/db")
+    assert options["poolclass"] is MeteredPool and options["echo"] is False
+    assert set(options["connect_args"]) == {"prepared_statement_cache_size", "server_settings"}
+
+
+def test_pool_metrics_record_waiting_checkouts():
+    async def run():
+        url = f"sqlite+aiosqlite:///{os.path.join(tempfile.mkdtemp(), 'pool.db')}"
+        engine = create_async_engine(url, poolclass=MeteredPool, pool_size=1, max_overflow=0)
+        before = pool_metrics.checkouts
+
+        async def hold():
+            async with engine.connect() as conn:
+                await conn.execute(text("select 1"))
+                await asyncio.sleep(0.1)
+
+        first = asyncio.create_task(hold())
+        await asyncio.sleep(0.02)
+        second = asyncio.create_task(hold())
+        await asyncio.sleep(0.02)
+        assert pool_metrics.as_dict(engine.pool)["waiting"] == 1
+        assert pool_metrics.as_dict(engine.pool)["checked_out"] == 1
+        await asyncio.gather(first, second)
+        assert pool_metrics.checkouts - before == 2
+        assert pool_metrics.max_checkout_seconds >= 0.05
+        await engine.dispose()
+
+    asyncio.run(run())
+
+
+def run_without_database_url(code):
+    env = {k: v for k, v in os.environ.items() if k != "DATABASE_URL"}
+    return subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True)
+
+
+def test_main_imports_without_a_database_url():
+    result = run_without_database_url("import main; assert not main.container.built('db_engine')")
+    assert result.returncode == 0, result.stderr
+
+
+def test_metrics_scrape_without_a_database_url_skips_the_pool():
+    result = run_without_database_url(
+        "from fastapi.testclient import TestClient; import main\n"
+        "response = TestClient(main.app).get('/metrics')\n"
+        "assert response.status_code == 200 and 'db_pool_' not in response.text, response.text\n"
+        "assert 'voice_pool_' in response.text and not main.container.built('db_engine')"
+    )
+    assert result.returncode == 0, result.stderr
@@ -0,0 +1,100 @@
+import asyncio
+
+import httpx
+import pytest
+
+from assistant import llm_client
+from assistant.dispatcher import LLMDispatcher, batch_lane
+from benchmarks import stub_openai
+
+
+class FakeUpstream:
+    def __init__(self, delay=0.02):
+        self.delay = delay
+        self.calls = []
+        self.batches = []
+
+    async def complete(self, model, messages, agent="default", **kwargs):
+        self.calls.append(messages[-1]["content"])
+        await asyncio.sleep(self.delay)
+        if messages[-1]["content"] == "fail":
+            raise RuntimeError("upstream failed")
+        return f"reply to {messages[-1]['content']}"
+
+    async def submit_batch(self, requests):
+        self.batches.append([messages[-1]["content"] for _, messages, _, _ in requests])
+        return [
+            RuntimeError("bad") if messages[-1]["content"] == "fail" else f"batched {messages[-1]['content']}"
+            for _, messages, _, _ in requests
+        ]
+
+
+def ask(dispatcher, prompt, **kwargs):
+    return dispatcher.complete("gpt-4", [{"role": "user", "content": prompt}], "test", **kwargs)
+
+
+def test_identical_concurrent_calls_share_one_upstream_call():
+    upstream = FakeUpstream()
+    dispatcher = LLMDispatcher(upstream.complete)
+
+    async def run():
+        results = await asyncio.gather(
+            *(ask(dispatcher, "same") for _ in range(5)),
+            ask(dispatcher, "same", temperature=0),
+            ask(dispatcher, "other"),
+            *(ask(dispatcher, "fail") for _ in range(2)),
+            return_exceptions=True,
+        )
+        assert results[:7] == ["reply to same"] * 6 + ["reply to other"]
+        assert all(isinstance(r, RuntimeError) for r in results[7:])
+        # Once the first call has finished, the next identical one goes upstream again
+        assert await ask(dispatcher, "same") == "reply to same"
+
+    asyncio.run(run())
+    assert sorted(upstream.calls) == ["fail", "other", "same", "same", "same"]
+    assert dispatcher.stats.as_dict()["coalesced"] == 5
+    assert dispatcher.pending() == 0
+
+
+def test_batch_lane_collects_calls_within_the_window():
+    upstream = FakeUpstream()
+    dispatcher = LLMDispatcher(upstream.complete, upstream.submit_batch, window_ms=20, max_batch=3)
+
+    async def run():
+        with batch_lane():
+            results = await asyncio.gather(
+                *(ask(dispatcher, p) for p in ["a", "b", "b", "fail", "c"]), return_exceptions=True
+            )
+        assert results[:3] == ["batched a", "batched b", "batched b"]
+        assert isinstance(results[3], RuntimeError)
+        assert results[4] == "batched c"
+        # Outside the lane calls go straight upstream
+        assert await ask(dispatcher, "a") == "reply to a"
+
+    asyncio.run(run())
+    # Three unique calls fill a batch at once, the rest go when the window closes
+    assert upstream.batches == [["a", "b", "fail"], ["c"]]
+    assert upstream.calls == ["a"]
+
+
+def test_submit_batch_round_trips_through_the_batch_api(monkeypatch):
+    pytest.importorskip("openai")
+    from openai import AsyncOpenAI
+
+    monkeypatch.setattr(stub_openai, "STUB_BATCH_LATENCY", 0)
+    monkeypatch.setattr(stub_openai, "STUB_ERROR_RATE", 0)
+    monkeypatch.setattr(llm_client, "LLM_BATCH_POLL_INTERVAL", 0.01)
+
+    async def run():
+        client = AsyncOpenAI(
+            api_key="stub", base_url="http://stub/v1",
+            http_client=httpx.AsyncClient(transport=httpx.ASGITransport(app=stub_openai.app)),
+        )
+        monkeypatch.setattr(llm_client, "get_client", lambda: client)
+        results = await llm_client.submit_batch([
+            ("gpt-4", [{"role": "user", "content": f"question {i}"}], "batch-test", {}) for i in range(3)
+        ])
+        await client.close()
+        return results
+
+    assert asyncio.run(run()) == [f"stub reply to: question {i}" for i in range(3)]
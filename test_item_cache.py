@@ -0,0 +1,135 @@
+import asyncio
+
+import pytest
+
+from item_cache import ItemCache
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+class FakeTable:
+    """Stands in for the items table; reads can be made slow to open race windows"""
+
+    def __init__(self):
+        self.rows = {}
+        self.reads = 0
+
+    def loader(self, item_id, delay=0.0):
+        async def load():
+            self.reads += 1
+            row = self.rows.get(item_id)
+            await asyncio.sleep(delay)
+            return dict(row) if row else None
+        return load
+
+
+def make_cache(redis=None, **kwargs):
+    return ItemCache(redis=redis or fakeredis.FakeAsyncRedis(decode_responses=True), ttl=60, **kwargs)
+
+
+def test_read_through_tiers_and_negative_caching():
+    async def run():
+        redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+        table = FakeTable()
+        table.rows[1] = {"id": 1, "name": "one", "description": None}
+        node_a, node_b = make_cache(redis), make_cache(redis)
+
+        assert await node_a.get(1, table.loader(1)) == table.rows[1]
+        assert await node_a.get(1, table.loader(1)) == table.rows[1]
+        assert await node_b.get(1, table.loader(1)) == table.rows[1]
+        assert await node_a.get(2, table.loader(2)) is None
+        assert await node_b.get(2, table.loader(2)) is None
+        assert table.reads == 2
+        assert node_b.as_dict()["redis_hits"] == 2 and node_b.negative_hits == 1
+
+        # Creating the row must clear the cached "not found" on every node's Redis tier
+        table.rows[2] = {"id": 2, "name": "two", "description": None}
+        await node_a.invalidate(2)
+        node_b.local.clear()
+        assert await node_b.get(2, table.loader(2)) == table.rows[2]
+
+    asyncio.run(run())
+
+
+def test_concurrent_misses_are_coalesced():
+    async def run():
+        cache, table = make_cache(), FakeTable()
+        table.rows[1] = {"id": 1, "name": "one", "description": None}
+        results = await asyncio.gather(*(cache.get(1, table.loader(1, delay=0.05)) for _ in range(20)))
+        assert all(result == table.rows[1] for result in results)
+        assert table.reads == 1 and cache.stats.coalesced == 19
+
+    asyncio.run(run())
+
+
+def test_aborted_reader_does_not_fail_concurrent_readers():
+    async def run():
+        cache, table = make_cache(), FakeTable()
+        table.rows[1] = {"id": 1, "name": "one", "description": None}
+        leader = asyncio.create_task(cache.get(1, table.loader(1, delay=0.05)))
+        await asyncio.sleep(0.01)
+        readers = [asyncio.create_task(cache.get(1, table.loader(1, delay=0.05))) for _ in range(5)]
+        await asyncio.sleep(0.01)
+        # The client behind the first GET /items/1 went away
+        leader.cancel()
+        assert await asyncio.gather(*readers) == [table.rows[1]] * 5
+        assert table.reads == 1 and len(cache.flight) == 0
+
+    asyncio.run(run())
+
+
+def test_load_racing_with_write_does_not_cache_stale_row():
+    async def run():
+        redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+        reader, writer = make_cache(redis), make_cache(redis)
+        table = FakeTable()
+        table.rows[1] = {"id": 1, "name": "old", "description": None}
+
+        # The reader reads the old row, then the write commits and invalidates before it stores
+        slow_read = asyncio.create_task(reader.get(1, table.loader(1, delay=0.1)))
+        await asyncio.sleep(0.02)
+        table.rows[1] = {"id": 1, "name": "new", "description": None}
+        await writer.invalidate(1)
+        assert (await slow_read)["name"] == "old"
+        assert reader.stale_writes_skipped == 1
+
+        assert (await reader.get(1, table.loader(1)))["name"] == "new"
+        assert (await writer.get(1, table.loader(1)))["name"] == "new"
+
+    asyncio.run(run())
+
+
+def test_many_concurrent_writers_leave_cache_consistent():
+    async def run():
+        redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+        nodes = [make_cache(redis) for _ in range(3)]
+        table = FakeTable()
+        table.rows[1] = {"id": 1, "name": "v0", "description": None}
+
+        async def write(version):
+            await asyncio.sleep(0.003 * version)
+            table.rows[1] = {"id": 1, "name": f"v{version}", "description": None}
+            await nodes[version % 3].invalidate(1)
+
+        async def read(i):
+            await asyncio.sleep(0.002 * i)
+            await nodes[i % 3].get(1, table.loader(1, delay=0.005))
+
+        await asyncio.gather(*(write(v) for v in range(1, 21)), *(read(i) for i in range(60)))
+        for node in nodes:
+            node.local.clear()
+            assert (await node.get(1, table.loader(1)))["name"] == "v20"
+
+    asyncio.run(run())
+
+
+def test_falls_back_to_loader_when_redis_is_down():
+    async def run():
+        cache, table = make_cache(fakeredis.FakeAsyncRedis(decode_responses=True, connected=False)), FakeTable()
+        table.rows[1] = {"id": 1, "name": "one", "description": None}
+        assert await cache.get(1, table.loader(1)) == table.rows[1]
+        await cache.invalidate(1)
+        assert await cache.get(1, table.loader(1)) == table.rows[1]
+        assert table.reads == 2 and cache.stats.errors == 1
+
+    asyncio.run(run())
@@ -0,0 +1,95 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import celery_worker
+import main
+from audio_codec import AudioTooLong
+from celery_worker import celery_app, chat_batch, render_tts, transcribe_audio
+from main import app
+
+client = TestClient(app)
+
+
+@pytest.fixture(autouse=True)
+def eager_celery(monkeypatch):
+    previous = dict(celery_app.conf)
+    celery_app.conf.update(task_always_eager=True, task_eager_propagates=False, result_backend="cache+memory://")
+    # Tasks copy this setting when they are bound, which may already have happened
+    for task in (chat_batch, transcribe_audio, render_tts):
+        monkeypatch.setattr(task, "store_eager_result", True)
+    yield
+    celery_app.conf.update(previous)
+
+
+def test_chat_batch_job_runs_agents_and_stores_result(monkeypatch):
+    async def fake_main(prompt):
+        return f"main: {prompt}"
+
+    async def fake_info(prompt):
+        if prompt == "boom":
+            raise RuntimeError("upstream failed")
+        return f"info: {prompt}"
+
+    monkeypatch.setattr(celery_worker, "ask_openai", fake_main)
+    monkeypatch.setattr(celery_worker, "info_agent", fake_info)
+    response = client.post("/jobs/chat", json={"messages": ["a", "b", "c", "boom"], "priority": 1})
+    assert response.status_code == 202
+    job = client.get(response.json()["status_url"]).json()
+    assert job["state"] == "SUCCESS"
+    assert job["result"]["chat"] == [
+        {"agent": "main", "response": "main: a"},
+        {"agent": "info", "response": "info: b"},
+        {"agent": "main", "response": "main: c"},
+        {"agent": "info", "error": "upstream failed"},
+    ]
+
+
+def test_tts_job_serves_audio_and_failed_jobs_report_errors(monkeypatch):
+    monkeypatch.setattr(celery_worker.voice_handler, "text_to_speech", lambda text, lang="en": b"ID3" + text.encode())
+
+    def noise(pcm):
+        raise ValueError("noise")
+
+    monkeypatch.setattr(celery_worker.voice_handler, "pcm_to_text", noise)
+    monkeypatch.setattr(main, "decode_to_pcm", lambda upload: b"\x00\x01" * 1600)
+
+    job_id = client.post("/jobs/tts", json={"text": "hello"}).json()["job_id"]
+    assert client.get(f"/jobs/{job_id}").json()["result"] == {"audio_url": f"/jobs/{job_id}/audio"}
+    audio = client.get(f"/jobs/{job_id}/audio")
+    assert audio.headers["content-type"] == "audio/mpeg" and audio.content == b"ID3hello"
+
+    job_id = client.post("/jobs/transcribe", files={"audio_file": ("a.webm", b"audio", "audio/webm")}).json()["job_id"]
+    job = client.get(f"/jobs/{job_id}").json()
+    assert job["state"] == "FAILURE" and "noise" in job["error"]
+
+
+def test_transcription_job_queues_a_path_to_the_decoded_recording(monkeypatch, tmp_path):
+    monkeypatch.setattr(main, "JOB_UPLOAD_DIR", str(tmp_path))
+    monkeypatch.setattr(main, "decode_to_pcm", lambda upload: upload.read() * 2)
+    heard = []
+    monkeypatch.setattr(celery_worker.voice_handler, "pcm_to_text", lambda pcm: heard.append(pcm) or "hello")
+
+    job_id = client.post("/jobs/transcribe", files={"audio_file": ("a.webm", b"audio", "audio/webm")}).json()["job_id"]
+    assert client.get(f"/jobs/{job_id}").json()["result"] == {"text": "hello"}
+    assert heard == [b"audioaudio"]
+    # The worker removes the recording once it is done with it
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_overlong_recordings_are_refused_before_they_are_queued(monkeypatch, tmp_path):
+    monkeypatch.setattr(main, "JOB_UPLOAD_DIR", str(tmp_path))
+
+    def too_long(upload):
+        raise AudioTooLong(60)
+
+    monkeypatch.setattr(main, "decode_to_pcm", too_long)
+    monkeypatch.setattr(transcribe_audio, "apply_async", lambda *args, **kwargs: pytest.fail("queued"))
+    response = client.post("/jobs/transcribe", files={"audio_file": ("a.webm", b"audio", "audio/webm")})
+    assert response.status_code == 413 and "60s" in response.json()["detail"]
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_jobs_are_routed_to_priority_queues():
+    routes = celery_app.conf.task_routes
+    assert routes[chat_batch.name]["queue"] == "batch"
+    assert routes["celery_worker.transcribe_audio"]["queue"] == routes["celery_worker.render_tts"]["queue"] == "interactive"
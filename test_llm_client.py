@@ -0,0 +1,47 @@
+import asyncio
+from types import SimpleNamespace
+
+from assistant import llm_client
+
+
+class FakeStream:
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.closed = False
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for token in self.tokens:
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=token))])
+
+    async def close(self):
+        self.closed = True
+
+
+def fake_client(stream):
+    async def create(**kwargs):
+        assert kwargs["stream"] is True
+        return stream
+    return SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+
+def test_stream_records_ttft_and_closes_upstream_on_disconnect(monkeypatch):
+    stream = FakeStream(["a", "b", "c"])
+    monkeypatch.setattr(llm_client, "get_client", lambda: fake_client(stream))
+    monkeypatch.setattr(llm_client, "stream_stats", llm_client.StreamStats())
+
+    async def run():
+        tokens = llm_client.stream_chat_completion("gpt-4", [], agent="test")
+        assert await tokens.__anext__() == "a"
+        # Client went away after the first token
+        await tokens.aclose()
+
+    asyncio.run(run())
+    assert stream.closed
+    stats = llm_client.stream_stats.as_dict()
+    assert stats["streams"] == 1 and stats["cancelled"] == 1 and stats["completed"] == 0
+    assert llm_client.stream_stats.ttft_count == 1
+    assert llm_client.llm_ttft_seconds.count(agent="test", model="gpt-4") == 1
+    assert llm_client.llm_tokens.value(agent="test", model="gpt-4", type="completion") == 1
@@ -1,8 +1,209 @@
+import asyncio
+import json
 from fastapi.testclient import TestClient
-from main import app
+from sqlalchemy.dialects import postgresql
+from audio_codec import AudioTooLong
+from main import app, name_prefix_filter
+from voice_handler import voice_handler
+from worker_pool import PoolSaturated
 
 client = TestClient(app)
 
 def test_read_items():
     response = client.get("/items/")
     assert response.status_code == 200
+
+def test_ask_awaits_selected_agent(monkeypatch):
+    async def fake_info_agent(prompt, session_id=None):
+        return f"info: {prompt}"
+
+    monkeypatch.setattr("main.info_agent", fake_info_agent)
+    response = client.post("/ask", json={"prompt": "hi", "agent": "info"})
+    assert response.status_code == 200
+    assert response.json() == {"response": "info: hi"}
+
+def test_chat_parallel_preserves_order_and_reports_item_errors(monkeypatch):
+    async def fake_ask_openai(prompt):
+        await asyncio.sleep(0.01 * (5 - int(prompt)))
+        if prompt == "2":
+            raise RuntimeError("upstream failed")
+        return f"main: {prompt}"
+
+    async def fake_info_agent(prompt):
+        return f"info: {prompt}"
+
+    monkeypatch.setattr("main.ask_openai", fake_ask_openai)
+    monkeypatch.setattr("main.info_agent", fake_info_agent)
+    response = client.post("/chat", json={
+        "messages": ["0", "1", "2", "3", "4"],
+        "parallel": True,
+        "max_concurrency": 3,
+    })
+    assert response.status_code == 200
+    assert response.json()["chat"] == [
+        {"agent": "main", "response": "main: 0"},
+        {"agent": "info", "response": "info: 1"},
+        {"agent": "main", "error": "upstream failed"},
+        {"agent": "info", "response": "info: 3"},
+        {"agent": "main", "response": "main: 4"},
+    ]
+
+def test_ask_stream_emits_sse_tokens(monkeypatch):
+    async def fake_stream(prompt, session_id=None):
+        for token in ["Hel", "lo"]:
+            yield token
+
+    monkeypatch.setattr("main.ask_openai_stream", fake_stream)
+    response = client.post("/ask/stream", json={"prompt": "hi"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert response.text == (
+        'data: {"token": "Hel"}\n\n'
+        'data: {"token": "lo"}\n\n'
+        'event: done\ndata: {}\n\n'
+    )
+
+def test_voice_chat_returns_503_when_voice_pool_is_saturated(monkeypatch):
+    async def saturated(audio_data):
+        raise PoolSaturated("voice")
+
+    monkeypatch.setattr(voice_handler, "transcribe", saturated)
+    response = client.post("/voice-chat", files={"audio_file": ("a.webm", b"audio", "audio/webm")})
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+
+def test_voice_chat_returns_503_when_the_llm_is_saturated(monkeypatch):
+    import voice_handler as voice_module
+
+    async def fake_transcribe(audio_file):
+        return "are you overloaded?"
+
+    async def saturated(model, messages, agent="default", **kwargs):
+        raise PoolSaturated(model, retry_after=3)
+
+    monkeypatch.setattr(voice_handler, "transcribe", fake_transcribe)
+    monkeypatch.setattr(voice_module, "chat_completion", saturated)
+    response = client.post("/voice-chat", files={"audio_file": ("a.webm", b"audio", "audio/webm")})
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "3"
+
+def test_voice_chat_streams_the_upload_file_and_refuses_long_recordings(monkeypatch):
+    async def too_long(audio_file):
+        assert audio_file.read() == b"audio"
+        raise AudioTooLong(60)
+
+    monkeypatch.setattr(voice_handler, "transcribe", too_long)
+    response = client.post("/voice-chat", files={"audio_file": ("a.webm", b"audio", "audio/webm")})
+    assert response.status_code == 413
+    assert response.json() == {"detail": "Recording is longer than 60s"}
+
+def test_voice_websocket_streams_sentence_audio_frames(monkeypatch):
+    async def fake_stream_speech(text, session_id=None):
+        for sentence in ["First sentence.", "Second sentence."]:
+            yield sentence, sentence.encode()
+
+    async def fake_transcribe(audio_data):
+        return "hello"
+
+    monkeypatch.setattr(voice_handler, "transcribe", fake_transcribe)
+    monkeypatch.setattr(voice_handler, "stream_speech", fake_stream_speech)
+    with client.websocket_connect("/ws/voice?tts=stream") as websocket:
+        websocket.send_text(json.dumps({"type": "audio", "data": "AAAA"}))
+        assert websocket.receive_json() == {"type": "transcription", "text": "hello"}
+        assert websocket.receive_json() == {"type": "response_start"}
+        assert websocket.receive_json() == {"type": "response_chunk", "text": "First sentence."}
+        assert websocket.receive_bytes() == b"First sentence."
+        assert websocket.receive_json() == {"type": "response_chunk", "text": "Second sentence."}
+        assert websocket.receive_bytes() == b"Second sentence."
+        assert websocket.receive_json() == {"type": "response_end", "text": "First sentence. Second sentence."}
+
+def test_bulk_item_endpoints_report_per_row_errors():
+    ids = [900001, 900002, 900003]
+    client.post("/items/bulk/delete", json={"ids": ids})
+    assert client.post("/items/", json={"id": 900001, "name": "one"}).status_code == 200
+    assert client.post("/items/", json={"id": 900001, "name": "one"}).status_code == 400
+
+    response = client.post("/items/bulk", json={"items": [
+        {"id": 900001, "name": "one"},
+        {"id": 900002, "name": "two"},
+        {"id": 900002, "name": "again"},
+    ]})
+    assert response.json() == {"created": [900002], "errors": [
+        {"index": 0, "id": 900001, "detail": "Item already exists"},
+        {"index": 2, "id": 900002, "detail": "Duplicate id in request"},
+    ]}
+
+    response = client.patch("/items/bulk", json={"items": [
+        {"id": 900002, "name": "two v2", "description": "d"},
+        {"id": 900003, "name": "three"},
+    ]})
+    assert response.json() == {"updated": [900002], "errors": [{"index": 1, "id": 900003, "detail": "Item not found"}]}
+    assert client.get("/items/900002").json() == {"id": 900002, "name": "two v2", "description": "d"}
+
+    response = client.put("/items/bulk", json={"items": [{"id": 900001, "name": "one v2"}, {"id": 900003, "name": "three"}]})
+    assert response.json() == {"upserted": [900001, 900003], "errors": []}
+    assert client.get("/items/900001").json()["name"] == "one v2"
+
+    response = client.post("/items/bulk/delete", json={"ids": ids + [900004]})
+    assert response.json() == {"deleted": ids, "errors": [{"index": 3, "id": 900004, "detail": "Item not found"}]}
+
+def test_read_items_keyset_pages_prefix_filter_and_ndjson_export():
+    ids = list(range(910001, 910006))
+    client.post("/items/bulk/delete", json={"ids": ids})
+    client.post("/items/bulk", json={"items": [
+        {"id": item_id, "name": f"{'pager' if item_id % 2 else 'other'}-{item_id}", "description": "x"}
+        for item_id in ids
+    ]})
+
+    response = client.get("/items/", params={"name_prefix": "pager-", "limit": 2, "fields": "name"})
+    assert response.json() == [{"id": 910001, "name": "pager-910001"}, {"id": 910003, "name": "pager-910003"}]
+    cursor = response.headers["x-next-cursor"]
+    response = client.get("/items/", params={"name_prefix": "pager-", "limit": 2, "fields": "name", "after": cursor})
+    assert response.json() == [{"id": 910005, "name": "pager-910005"}]
+    assert "x-next-cursor" not in response.headers
+
+    response = client.get("/items/", params={"name_prefix": "other-", "format": "ndjson"})
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert [json.loads(line) for line in response.text.splitlines()] == [
+        {"id": 910002, "name": "other-910002", "description": "x"},
+        {"id": 910004, "name": "other-910004", "description": "x"},
+    ]
+    assert client.get("/items/", params={"fields": "secret"}).status_code == 400
+    client.post("/items/bulk/delete", json={"ids": ids})
+
+def test_name_prefix_matches_exactly_with_mixed_case_and_punctuation():
+    names = ["Pager-1", "pager-2", "pager.3", "pagerx", "pager-", "PAGER-4", "pager", "a-b", "ab", "a-"]
+    ids = list(range(915001, 915001 + len(names)))
+    client.post("/items/bulk/delete", json={"ids": ids})
+    client.post("/items/bulk", json={"items": [{"id": i, "name": n} for i, n in zip(ids, names)]})
+
+    def matching(prefix):
+        rows = client.get("/items/", params={"name_prefix": prefix, "fields": "name", "after": ids[0] - 1}).json()
+        return [row["name"] for row in rows if row["id"] in ids]
+
+    assert matching("pager-") == ["pager-2", "pager-"]
+    assert matching("Pager") == ["Pager-1"]
+    assert matching("a-") == ["a-b", "a-"]
+    client.post("/items/bulk/delete", json={"ids": ids})
+
+def test_name_prefix_compares_by_code_point_on_postgres():
+    sql = str(name_prefix_filter("a-", "postgresql").compile(dialect=postgresql.dialect()))
+    assert sql.count('(items.name COLLATE "C")') == 2
+    assert 'COLLATE' not in str(name_prefix_filter("a-", "sqlite"))
+
+def test_item_reads_see_writes_through_the_cache():
+    client.post("/items/bulk/delete", json={"ids": [920001]})
+    assert client.get("/items/920001").status_code == 404
+    client.post("/items/", json={"id": 920001, "name": "cached"})
+    assert client.get("/items/920001").json()["name"] == "cached"
+    client.put("/items/920001", json={"id": 920001, "name": "renamed"})
+    assert client.get("/items/920001").json()["name"] == "renamed"
+    client.delete("/items/920001")
+    assert client.get("/items/920001").status_code == 404
+
+def test_metrics_reports_latency_per_route_template_and_stats():
+    client.get("/items/424242")
+    body = client.get("/metrics").text
+    assert 'http_request_duration_seconds_count{method="GET",route="/items/{item_id}",status="404"}' in body
+    assert "/items/424242" not in body
+    assert "item_cache_misses" in body and "db_pool_checkouts" in body
@@ -0,0 +1,44 @@
+from metrics import NULL_TIMER, Registry
+
+
+def test_histogram_renders_cumulative_buckets_per_label_set():
+    registry = Registry(enabled=True)
+    latency = registry.histogram("stage_seconds", "Stage latency", ("stage",), buckets=(0.1, 1.0))
+    latency.observe(0.05, stage="stt")
+    latency.observe(0.5, stage="stt")
+    latency.observe(5, stage="tts")
+
+    lines = registry.render().splitlines()
+    assert 'stage_seconds_bucket{stage="stt",le="0.1"} 1' in lines
+    assert 'stage_seconds_bucket{stage="stt",le="1.0"} 2' in lines
+    assert 'stage_seconds_bucket{stage="stt",le="+Inf"} 2' in lines
+    assert 'stage_seconds_bucket{stage="tts",le="1.0"} 0' in lines
+    assert 'stage_seconds_count{stage="tts"} 1' in lines
+    assert "# TYPE stage_seconds histogram" in lines
+
+
+def test_counters_gauges_and_stats_dictionaries():
+    registry = Registry(enabled=True)
+    frames = registry.counter("frames_total", "Frames", ("room", "direction"))
+    frames.inc(room="a", direction="in")
+    frames.inc(2, room='b"c', direction="in")
+    frames.remove(room="a")
+    registry.gauge("depth", "Queue depth", ("room",), collect=lambda: {("a",): 3})
+    registry.stats("cache", lambda: {"hits": 4, "enabled": True, "tier": {"size": 1.5}, "name": "x"})
+
+    lines = registry.render().splitlines()
+    assert 'frames_total{room="b\\"c",direction="in"} 2' in lines
+    assert not any(line.startswith('frames_total{room="a"') for line in lines)
+    assert 'depth{room="a"} 3' in lines
+    assert "cache_hits 4" in lines and "cache_enabled 1" in lines and "cache_tier_size 1.5" in lines
+    assert not any(line.startswith("cache_name") for line in lines)
+
+
+def test_disabled_registry_records_nothing():
+    registry = Registry(enabled=False)
+    latency = registry.histogram("stage_seconds", "Stage latency", ("stage",))
+    latency.observe(1, stage="stt")
+    assert latency.time(stage="stt") is NULL_TIMER
+    with latency.time(stage="stt"):
+        pass
+    assert latency.count(stage="stt") == 0
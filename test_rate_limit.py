@@ -0,0 +1,78 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+from redis.exceptions import ConnectionError
+
+import main
+from rate_limit import RateLimited, RateLimiter, rate_limiter
+from worker_pool import PoolSaturated
+
+fakeredis = pytest.importorskip("fakeredis")
+pytest.importorskip("lupa")  # fakeredis runs the token bucket script through lupa
+
+client = TestClient(main.app)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_workers_share_one_bucket_per_client_and_route():
+    async def run():
+        redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+        clock = Clock()
+        worker_a = RateLimiter(redis=redis, limits="ask=2/10,chat=1/10", clock=clock)
+        worker_b = RateLimiter(redis=redis, limits="ask=2/10,chat=1/10", clock=clock)
+
+        await worker_a.hit("ask", "1.2.3.4")
+        await worker_b.hit("ask", "1.2.3.4")
+        with pytest.raises(RateLimited) as limited:
+            await worker_a.hit("ask", "1.2.3.4")
+        assert limited.value.retry_after == 5
+        # Other clients and other routes have their own buckets
+        await worker_b.hit("ask", "5.6.7.8")
+        await worker_b.hit("chat", "1.2.3.4")
+
+        clock.now += 5
+        await worker_b.hit("ask", "1.2.3.4")
+        assert worker_a.stats()["limited_by_route"] == {"ask": 1}
+
+    asyncio.run(run())
+
+
+def test_falls_back_to_local_buckets_when_redis_fails():
+    class BrokenRedis:
+        def register_script(self, script):
+            async def call(**kwargs):
+                raise ConnectionError("down")
+            return call
+
+    async def run():
+        limiter = RateLimiter(redis=BrokenRedis(), limits="ask=1/60", clock=Clock())
+        await limiter.hit("ask", "client")
+        with pytest.raises(RateLimited):
+            await limiter.hit("ask", "client")
+        assert limiter.errors == 1
+
+    asyncio.run(run())
+
+
+def test_endpoints_answer_429_and_503_with_retry_after(monkeypatch):
+    async def busy(prompt, session_id=None):
+        raise PoolSaturated("gpt-4", retry_after=3)
+
+    monkeypatch.setattr(main, "ask_openai", busy)
+    response = client.post("/ask", json={"prompt": "hi"})
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "3"
+
+    monkeypatch.setitem(rate_limiter.limits, "ask", (1, 3600))
+    client.post("/ask", json={"prompt": "hi"})
+    response = client.post("/ask", json={"prompt": "hi"})
+    assert response.status_code == 429
+    assert int(response.headers["retry-after"]) > 0
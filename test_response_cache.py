@@ -0,0 +1,101 @@
+import asyncio
+
+import pytest
+
+from assistant.response_cache import ResponseCache, cache_key
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+def make_cache(**kwargs):
+    return ResponseCache(redis=fakeredis.FakeAsyncRedis(decode_responses=True), ttl=60, **kwargs)
+
+
+def counting_upstream(calls, delay=0.0):
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(delay)
+        return f"reply {len(calls)}"
+    return compute
+
+
+def test_cache_key_normalizes_prompt_but_not_agent_or_model():
+    assert cache_key("main", "gpt-4", "sys", "Hello   World ") == cache_key("main", "gpt-4", "sys", "hello world")
+    assert cache_key("main", "gpt-4", "sys", "hello") != cache_key("info", "gpt-4", "sys", "hello")
+    assert cache_key("main", "gpt-4", "sys", "hello") != cache_key("main", "gpt-3.5-turbo", "sys", "hello")
+    assert cache_key("main", "gpt-4", "sys", "hello") != cache_key("main", "gpt-4", "other", "hello")
+
+
+def test_local_and_redis_tiers():
+    async def run():
+        cache = make_cache()
+        calls = []
+        assert await cache.get_or_compute("main", "gpt-4", "sys", "hi", counting_upstream(calls)) == "reply 1"
+        assert await cache.get_or_compute("main", "gpt-4", "sys", "hi", counting_upstream(calls)) == "reply 1"
+        cache.clear_local()
+        assert await cache.get_or_compute("main", "gpt-4", "sys", " HI", counting_upstream(calls)) == "reply 1"
+        assert len(calls) == 1
+        stats = cache.stats.as_dict()
+        assert (stats["local_hits"], stats["redis_hits"], stats["misses"]) == (1, 1, 1)
+    asyncio.run(run())
+
+
+def test_concurrent_identical_prompts_hit_upstream_once():
+    async def run():
+        cache = make_cache()
+        calls = []
+        replies = await asyncio.gather(*(
+            cache.get_or_compute("main", "gpt-4", "sys", "same", counting_upstream(calls, delay=0.05))
+            for _ in range(10)
+        ))
+        assert replies == ["reply 1"] * 10
+        assert len(calls) == 1
+        assert cache.stats.coalesced == 9
+    asyncio.run(run())
+
+
+def test_cancelled_leader_does_not_fail_coalesced_callers():
+    async def run():
+        cache = make_cache()
+        calls = []
+        leader = asyncio.create_task(
+            cache.get_or_compute("main", "gpt-4", "sys", "same", counting_upstream(calls, delay=0.05))
+        )
+        await asyncio.sleep(0.01)
+        follower = asyncio.create_task(
+            cache.get_or_compute("main", "gpt-4", "sys", "same", counting_upstream(calls, delay=0.05))
+        )
+        await asyncio.sleep(0.01)
+        # e.g. the leader's WebSocket disconnected
+        leader.cancel()
+        assert await follower == "reply 1"
+        assert leader.cancelled() and len(calls) == 1
+    asyncio.run(run())
+
+
+def test_redis_tier_is_size_bounded():
+    async def run():
+        cache = make_cache(redis_max_entries=3)
+        for i in range(5):
+            await cache.get_or_compute("main", "gpt-4", "sys", f"prompt {i}", counting_upstream([]))
+        assert await cache.redis.zcard("llm-cache:index") == 3
+        assert len(await cache.redis.keys("llm-cache:*")) == 4  # 3 entries + index
+    asyncio.run(run())
+
+
+def test_errors_are_not_cached_and_redis_outage_falls_through():
+    class BrokenRedis:
+        async def get(self, key):
+            raise ConnectionError("redis down")
+
+    async def failing():
+        raise RuntimeError("upstream failed")
+
+    async def run():
+        cache = ResponseCache(redis=BrokenRedis(), ttl=60)
+        with pytest.raises(RuntimeError):
+            await cache.get_or_compute("main", "gpt-4", "sys", "hi", failing)
+        calls = []
+        assert await cache.get_or_compute("main", "gpt-4", "sys", "hi", counting_upstream(calls)) == "reply 1"
+        assert cache.stats.errors == 1
+    asyncio.run(run())
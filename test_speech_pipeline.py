@@ -0,0 +1,70 @@
+import asyncio
+
+import pytest
+
+from speech_pipeline import split_sentences, stream_speech
+
+
+async def tokens_of(text, delay=0.0):
+    for word in text.split(" "):
+        await asyncio.sleep(delay)
+        yield word + " "
+
+
+async def collect(iterator):
+    return [item async for item in iterator]
+
+
+def test_split_sentences_merges_short_ones():
+    text = "Hi. It is sunny and warm today! Do you want a forecast for tomorrow? Ok"
+    sentences = asyncio.run(collect(split_sentences(tokens_of(text), min_chars=10)))
+    assert sentences == ["Hi. It is sunny and warm today!", "Do you want a forecast for tomorrow?", "Ok"]
+
+
+def test_stream_speech_synthesizes_ahead_and_keeps_order():
+    started = []
+
+    async def synthesize(sentence):
+        started.append(sentence)
+        # Later sentences finish first; output order must not change
+        await asyncio.sleep(0.05 if sentence.startswith("First") else 0.0)
+        return sentence.encode()
+
+    text = "First sentence is long enough. Second sentence is here too. Third one closes it."
+    chunks = asyncio.run(collect(stream_speech(tokens_of(text), synthesize, lookahead=2)))
+    assert [sentence for sentence, _ in chunks] == [
+        "First sentence is long enough.", "Second sentence is here too.", "Third one closes it."
+    ]
+    assert all(audio == sentence.encode() for sentence, audio in chunks)
+    assert len(started) == 3
+
+
+def test_stream_speech_fails_on_empty_audio():
+    async def synthesize(sentence):
+        return None
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(collect(stream_speech(tokens_of("A sentence that is long enough."), synthesize)))
+
+
+def test_stream_speech_cancels_every_synthesis_when_the_listener_goes_away():
+    synthesizing = []
+
+    async def synthesize(sentence):
+        if not sentence.startswith("First"):
+            synthesizing.append(asyncio.current_task())
+            await asyncio.Event().wait()
+        return sentence.encode()
+
+    async def run():
+        text = "First sentence is long enough. Second sentence is here too. Third one closes it. Fourth is never read."
+        speech = stream_speech(tokens_of(text), synthesize, lookahead=1)
+        assert (await speech.__anext__())[0] == "First sentence is long enough."
+        # One synthesis is queued and the producer holds the next one, waiting for room
+        await asyncio.sleep(0.01)
+        assert len(synthesizing) == 2
+        await speech.aclose()
+        await asyncio.sleep(0.01)
+        assert all(task.cancelled() for task in synthesizing)
+
+    asyncio.run(run())
@@ -0,0 +1,141 @@
+import asyncio
+import math
+from array import array
+
+from streaming_stt import FRAME_MS, StreamingTranscriber, UtteranceSegmenter
+
+SAMPLE_RATE = 16000
+
+
+def silence(ms):
+    return bytes(SAMPLE_RATE * 2 * ms // 1000)
+
+
+def tone(ms, amplitude=4000):
+    count = SAMPLE_RATE * ms // 1000
+    return array("h", (int(amplitude * math.sin(2 * math.pi * 440 * i / SAMPLE_RATE)) for i in range(count))).tobytes()
+
+
+def test_segmenter_finds_utterance_boundaries():
+    segmenter = UtteranceSegmenter(end_silence_ms=300, preroll_ms=90, partial_interval_ms=300)
+    events = []
+    # Feed in uneven chunks to exercise frame reassembly
+    stream = silence(600) + tone(900) + silence(600) + tone(300) + silence(600)
+    for offset in range(0, len(stream), 1234):
+        events.extend(segmenter.feed(stream[offset:offset + 1234]))
+
+    finals = [pcm for kind, pcm in events if kind == "final"]
+    partials = [pcm for kind, pcm in events if kind == "partial"]
+    assert len(finals) == 2
+    assert len(partials) >= 2
+    frame_bytes = SAMPLE_RATE * 2 * FRAME_MS // 1000
+    # Preroll + speech + closing silence, at frame granularity
+    assert abs(len(finals[0]) - len(silence(90) + tone(900) + silence(300))) <= 2 * frame_bytes
+    assert segmenter.flush() is None
+
+
+def test_segmenter_partials_cover_only_the_latest_window():
+    segmenter = UtteranceSegmenter(end_silence_ms=300, partial_interval_ms=300, partial_window_ms=600)
+    events = segmenter.feed(tone(5000))
+    partials = [pcm for kind, pcm in events if kind == "partial"]
+    assert len(partials) >= 10
+    # A long utterance costs the recognizer the same per partial as a short one
+    assert max(len(pcm) for pcm in partials) == len(silence(600))
+
+
+def test_segmenter_flush_returns_open_utterance():
+    segmenter = UtteranceSegmenter(end_silence_ms=300)
+    segmenter.feed(tone(500))
+    assert segmenter.in_speech
+    assert segmenter.flush()
+
+
+class PassthroughDecoder:
+    """Stands in for ffmpeg: the 'WebM' chunks are already PCM"""
+
+    def __init__(self):
+        self.stdout = asyncio.StreamReader()
+        self.stdin = self
+        self.returncode = None
+
+    def write(self, data):
+        self.stdout.feed_data(data)
+
+    async def drain(self):
+        await asyncio.sleep(0)
+
+    def close(self):
+        self.stdout.feed_eof()
+
+    async def wait(self):
+        self.returncode = 0
+
+    def kill(self):
+        self.returncode = -9
+
+
+def test_transcriber_emits_partials_and_only_final_segments():
+    partials, finals, errors = [], [], []
+
+    async def recognize(pcm):
+        return f"{len(pcm)} bytes"
+
+    async def run():
+        async def decoder_factory():
+            return PassthroughDecoder()
+
+        transcriber = StreamingTranscriber(
+            recognize,
+            on_partial=lambda text: asyncio.sleep(0, partials.append(text)),
+            on_final=lambda text, ended_at: asyncio.sleep(0, finals.append(text)),
+            on_error=lambda text: asyncio.sleep(0, errors.append(text)),
+            decoder_factory=decoder_factory,
+            segmenter=UtteranceSegmenter(end_silence_ms=300, partial_interval_ms=150),
+        )
+        stream = silence(300) + tone(600) + silence(400) + tone(400)
+        for offset in range(0, len(stream), 3200):
+            await transcriber.feed(stream[offset:offset + 3200])
+            await asyncio.sleep(0)
+        await transcriber.finish()
+        await transcriber.close()
+
+    asyncio.run(run())
+    assert len(finals) == 2  # one closed by silence, one flushed on stop
+    assert partials
+    assert errors == []
+
+
+class CrashingDecoder(PassthroughDecoder):
+    """ffmpeg that rejects the stream after its first chunk"""
+
+    def write(self, data):
+        if self.returncode is not None:
+            raise BrokenPipeError("Broken pipe")
+        super().write(data)
+        self.stdout.feed_eof()
+        self.returncode = 1
+
+
+def test_decoder_failure_is_reported_once_and_later_chunks_are_dropped():
+    errors = []
+
+    async def run():
+        async def decoder_factory():
+            return CrashingDecoder()
+
+        transcriber = StreamingTranscriber(
+            lambda pcm: asyncio.sleep(0, "text"),
+            on_partial=lambda text: asyncio.sleep(0),
+            on_final=lambda text, ended_at: asyncio.sleep(0),
+            on_error=lambda text: asyncio.sleep(0, errors.append(text)),
+            decoder_factory=decoder_factory,
+        )
+        for _ in range(5):
+            await transcriber.feed(silence(100))
+            await asyncio.sleep(0)
+        assert transcriber.failed
+        await transcriber.finish()
+        await transcriber.close()
+
+    asyncio.run(run())
+    assert len(errors) == 1 and "decoding" in errors[0]
@@ -0,0 +1,65 @@
+import os
+import pickle
+
+import voice_handler as voice_module
+from gtts import gTTS
+from tts_cache import TTSCache
+from voice_handler import VoiceHandler
+
+
+def test_memory_tier_is_bounded_by_bytes(tmp_path):
+    cache = TTSCache(directory=str(tmp_path), memory_bytes=10, disk_bytes=1000)
+    cache.put("a", b"12345")
+    cache.put("b", b"12345")
+    cache.put("c", b"12345")
+    stats = cache.stats()
+    assert stats["memory_bytes"] == 10 and stats["memory_entries"] == 2
+    assert stats["disk_entries"] == 3
+
+
+def test_disk_tier_survives_restart_and_returns_bytes(tmp_path):
+    TTSCache(directory=str(tmp_path)).put("hello", b"mp3-bytes", "en", "com")
+    cache = TTSCache(directory=str(tmp_path))
+    audio = cache.get("hello", "en", "com")
+    # bytes, so a process voice pool can pickle it back to the caller
+    assert pickle.loads(pickle.dumps(audio)) == b"mp3-bytes"
+    assert cache.get("hello", "en", "co.uk") is None
+    assert cache.stats()["disk_hits"] == 1
+
+
+def test_disk_hits_hold_no_open_files(tmp_path):
+    writer = TTSCache(directory=str(tmp_path))
+    for i in range(200):
+        writer.put(f"phrase {i}", b"mp3" * 10)
+    cache = TTSCache(directory=str(tmp_path))
+    open_files = len(os.listdir("/proc/self/fd")) if os.path.isdir("/proc/self/fd") else None
+    assert all(cache.get(f"phrase {i}") == b"mp3" * 10 for i in range(200))
+    assert cache.stats()["disk_hits"] == cache.stats()["memory_entries"] == 200
+    if open_files is not None:
+        assert len(os.listdir("/proc/self/fd")) == open_files
+
+
+def test_disk_tier_evicts_least_recently_used(tmp_path):
+    cache = TTSCache(directory=str(tmp_path), memory_bytes=0, disk_bytes=10)
+    cache.put("a", b"12345")
+    cache.put("b", b"12345")
+    assert cache.get("a") is not None  # a is now more recent than b
+    cache.put("c", b"12345")
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.stats()["disk_bytes"] == 10
+
+
+def test_repeated_phrase_skips_synthesis(tmp_path, monkeypatch):
+    monkeypatch.setattr(voice_module, "tts_cache", TTSCache(directory=str(tmp_path)))
+    calls = []
+
+    def write_to_fp(tts, fp):
+        calls.append(tts.text)
+        fp.write(b"mp3")
+
+    monkeypatch.setattr(gTTS, "write_to_fp", write_to_fp)
+    handler = VoiceHandler()
+    assert handler.text_to_speech("Sure!") == b"mp3"
+    assert handler.text_to_speech("Sure!") == b"mp3"
+    assert calls == ["Sure!"]
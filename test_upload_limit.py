@@ -0,0 +1,60 @@
+from fastapi import FastAPI, File, UploadFile
+from fastapi.testclient import TestClient
+
+from upload_limit import UploadLimitMiddleware, uploads_rejected
+
+received = []
+
+app = FastAPI()
+app.add_middleware(UploadLimitMiddleware, max_bytes=10_000, paths=["/upload"])
+
+
+@app.post("/upload")
+async def upload(audio_file: UploadFile = File(...)):
+    received.append(len(await audio_file.read()))
+    return {"ok": True}
+
+
+@app.post("/other")
+async def other(audio_file: UploadFile = File(...)):
+    return {"size": len(await audio_file.read())}
+
+
+client = TestClient(app)
+
+
+def multipart(size):
+    boundary = "bound"
+    yield f'--{boundary}\r\nContent-Disposition: form-data; name="audio_file"; filename="a.webm"\r\n\r\n'.encode()
+    for _ in range(size // 1000):
+        yield b"\x00" * 1000
+    yield f"\r\n--{boundary}--\r\n".encode()
+
+
+def test_small_uploads_and_other_paths_pass():
+    received.clear()
+    assert client.post("/upload", files={"audio_file": ("a.webm", b"a" * 5000)}).status_code == 200
+    assert client.post("/other", files={"audio_file": ("a.webm", b"a" * 50_000)}).json() == {"size": 50_000}
+    assert received == [5000]
+
+
+def test_content_length_over_the_limit_is_refused_before_reading():
+    received.clear()
+    before = uploads_rejected.value(path="/upload", reason="content_length")
+    response = client.post("/upload", files={"audio_file": ("a.webm", b"a" * 50_000)})
+    assert response.status_code == 413
+    assert response.json() == {"detail": "Upload is larger than 10000 bytes"}
+    assert received == []
+    assert uploads_rejected.value(path="/upload", reason="content_length") == before + 1
+
+
+def test_streamed_upload_without_length_stops_at_the_limit():
+    received.clear()
+    before = uploads_rejected.value(path="/upload", reason="streamed")
+    headers = {"Content-Type": "multipart/form-data; boundary=bound"}
+    response = client.post("/upload", content=multipart(50_000), headers=headers)
+    assert response.status_code == 413
+    assert received == []
+    assert uploads_rejected.value(path="/upload", reason="streamed") == before + 1
+    assert client.post("/upload", content=multipart(5000), headers=headers).status_code == 200
+    assert received == [5000]
@@ -0,0 +1,59 @@
+import asyncio
+import base64
+from io import BytesIO
+
+import pytest
+
+from video_analyzer import RoomAnalyzer, frame_fingerprint, hamming_distance
+
+Image = pytest.importorskip("PIL.Image")
+
+
+def jpeg_frame(shade_left, shade_right):
+    image = Image.new("L", (320, 240), shade_left)
+    image.paste(shade_right, (160, 0, 320, 240))
+    buffer = BytesIO()
+    image.save(buffer, format="JPEG", quality=50)
+    return "data:image/jpeg;base64," + base64.b64encode(buffer.getvalue()).decode()
+
+
+def fingerprint(frame):
+    return frame_fingerprint(base64.b64decode(frame.split(",")[1]))
+
+
+def test_near_duplicate_frames_have_close_fingerprints():
+    base = fingerprint(jpeg_frame(40, 200))
+    assert hamming_distance(base, fingerprint(jpeg_frame(42, 198))) <= 6
+    assert hamming_distance(base, fingerprint(jpeg_frame(200, 40))) > 6
+
+
+def test_analyzer_samples_coalesces_and_skips_duplicates():
+    analyzed, emitted = [], []
+
+    async def analyze(frame):
+        analyzed.append(frame)
+        await asyncio.sleep(0.05)
+        return f"analysis {len(analyzed)}"
+
+    async def emit(sender, content):
+        emitted.append((sender, content))
+
+    async def run():
+        analyzer = RoomAnalyzer("room", analyze, emit, interval=0.1, dedup_distance=6)
+        analyzer.start()
+        first, changed = jpeg_frame(40, 200), jpeg_frame(200, 40)
+        analyzer.submit(first, "alice")
+        await asyncio.sleep(0.01)
+        # Burst while the first analysis is running: only the newest survives
+        for shade in range(5):
+            analyzer.submit(jpeg_frame(40 + shade, 200), "bob")
+        analyzer.submit(changed, "carol")
+        await asyncio.sleep(0.3)
+        analyzer.submit(jpeg_frame(201, 41), "dave")  # near-duplicate of the last analyzed frame
+        await asyncio.sleep(0.2)
+        analyzer.stop()
+        return analyzer.stats()
+
+    stats = asyncio.run(run())
+    assert emitted == [("alice", "analysis 1"), ("carol", "analysis 2")]
+    assert stats == {"analyzed": 2, "coalesced": 5, "duplicates": 1, "shed": 0}
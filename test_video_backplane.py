@@ -0,0 +1,103 @@
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+import fakeredis
+import pytest
+import redis
+
+from video_backplane import RedisBackplane
+from video_call import VideoCallManager
+from video_frames import encode_frame
+
+
+class FakeSocket:
+    def __init__(self):
+        self.received = []
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, message):
+        self.received.append(message)
+
+    async def send_bytes(self, message):
+        self.received.append(message)
+
+
+async def wait_for(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+
+def test_rooms_are_relayed_between_nodes():
+    async def run():
+        server = fakeredis.FakeServer()
+        node_a = VideoCallManager(RedisBackplane(fakeredis.FakeAsyncRedis(server=server), node_id="a"))
+        node_b = VideoCallManager(RedisBackplane(fakeredis.FakeAsyncRedis(server=server), node_id="b"))
+
+        alice, bob, carol = FakeSocket(), FakeSocket(), FakeSocket()
+        await node_a.connect(alice, "room")
+        # Alone in the room: nothing goes to Redis
+        await node_a.broadcast("hello?", "room", alice)
+        assert node_a.backplane.skipped_local == 1
+
+        await node_b.connect(bob, "room")
+        await node_b.connect(carol, "room")
+        await wait_for(lambda: node_a.backplane.remote_nodes["room"] == {"b"})
+
+        frame = encode_frame("room", "alice", 1, b"jpeg")
+        await node_a.broadcast(frame, "room", alice)
+        await wait_for(lambda: bob.received == [frame] and carol.received == [frame])
+        await node_b.broadcast({"type": "system", "content": "hi"}, "room", bob)
+        await wait_for(lambda: alice.received == ['{"type": "system", "content": "hi"}'])
+        assert carol.received == [frame, '{"type": "system", "content": "hi"}']
+
+        for socket in (bob, carol):
+            node_b.disconnect(socket, "room")
+        await wait_for(lambda: not node_a.backplane.remote_nodes["room"])
+        node_a.disconnect(alice, "room")
+        await node_a.aclose()
+        await node_b.aclose()
+
+    asyncio.run(run())
+
+
+def test_crashed_node_ages_out_of_membership():
+    async def run():
+        server = fakeredis.FakeServer()
+        crashed = RedisBackplane(fakeredis.FakeAsyncRedis(server=server), node_id="crashed", presence_ttl=0.3)
+        live = RedisBackplane(fakeredis.FakeAsyncRedis(server=server), node_id="live", presence_ttl=0.3)
+        live.deliver = crashed.deliver = lambda *args: None
+        await crashed.join("room")
+        await live.join("room")
+        assert live.remote_nodes["room"] == {"crashed"}
+        # Stop heartbeating without leaving
+        crashed._heartbeat.cancel()
+        crashed._reader.cancel()
+        await wait_for(lambda: not live.remote_nodes["room"])
+        await live.close()
+
+    asyncio.run(run())
+
+
+def local_redis_available():
+    try:
+        return redis.Redis(host=os.getenv("REDIS_HOST", "localhost"), port=int(os.getenv("REDIS_PORT", 6379))).ping()
+    except redis.RedisError:
+        return False
+
+
+@pytest.mark.skipif(not local_redis_available(), reason="needs a local Redis")
+def test_cross_process_relay_latency_and_throughput():
+    result = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_video_backplane", "--frames", "200"],
+        capture_output=True, text=True, timeout=120,
+    )
+    print(result.stdout)
+    assert result.returncode == 0, result.stderr
+    assert "frames/s" in result.stdout
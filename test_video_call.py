@@ -0,0 +1,124 @@
+import asyncio
+
+import pytest
+
+from video_call import PeerConnection, VideoCallManager
+from video_frames import FrameError, encode_frame
+
+
+class FakeSocket:
+    def __init__(self, delay=0.0, fail=False):
+        self.delay = delay
+        self.fail = fail
+        self.received = []
+        self.closed_with = None
+
+    async def accept(self):
+        pass
+
+    async def close(self, code=1000, reason=None):
+        self.closed_with = code
+
+    async def send_text(self, message):
+        if self.fail:
+            raise RuntimeError("connection reset")
+        await asyncio.sleep(self.delay)
+        self.received.append(message)
+
+    async def send_bytes(self, message):
+        await self.send_text(message)
+
+
+def test_slow_peer_does_not_delay_the_room_and_dead_peers_are_evicted():
+    async def run():
+        manager = VideoCallManager()
+        sender, fast, slow, dead = FakeSocket(), FakeSocket(), FakeSocket(delay=0.2), FakeSocket(fail=True)
+        for socket in (sender, fast, slow, dead):
+            await manager.connect(socket, "room")
+
+        for i in range(5):
+            await manager.broadcast(f"frame {i}", "room", sender)
+            await asyncio.sleep(0.01)
+        await manager.broadcast({"type": "system", "content": "bye"}, "room", sender)
+        await asyncio.sleep(0.05)
+
+        assert fast.received == [f"frame {i}" for i in range(5)] + ['{"type": "system", "content": "bye"}']
+        # The slow peer only got the frames it had time for, but the control message is kept
+        assert len(slow.received) < 5
+        assert dead not in manager.active_connections["room"] and dead not in manager.peers
+        # Closed too, so its endpoint loop ends and the client knows to reconnect
+        assert dead.closed_with == 1013 and slow.closed_with is None
+        await asyncio.sleep(0.8)
+        assert slow.received == ["frame 0", "frame 4", '{"type": "system", "content": "bye"}']
+        for socket in (sender, fast, slow):
+            manager.disconnect(socket, "room")
+        assert manager.active_connections == {} and manager.peers == {}
+
+    asyncio.run(run())
+
+
+class FakeBackplane:
+    def __init__(self):
+        self.left = []
+        self.closed = False
+
+    async def join(self, room_id):
+        pass
+
+    async def leave(self, room_id):
+        await asyncio.sleep(0.01)
+        if room_id == "broken":
+            raise ConnectionError("backplane down")
+        self.left.append(room_id)
+
+    async def close(self):
+        self.closed = True
+
+
+def test_backplane_leaves_are_kept_logged_and_awaited_on_shutdown(caplog):
+    async def run():
+        backplane = FakeBackplane()
+        manager = VideoCallManager(backplane)
+        for room_id in ("room", "broken"):
+            socket = FakeSocket()
+            await manager.connect(socket, room_id)
+            manager.disconnect(socket, room_id)
+        assert len(manager._leaving) == 2
+        await manager.aclose()
+        assert backplane.left == ["room"] and backplane.closed and not manager._leaving
+
+    asyncio.run(run())
+    assert "backplane down" in caplog.text
+
+
+def test_drop_oldest_policy_keeps_queue_bounded():
+    peer = PeerConnection(FakeSocket(), on_dead=None, max_queue=3, policy="drop_oldest")
+    peer.enqueue("control", droppable=False)
+    for i in range(5):
+        peer.enqueue(f"frame {i}")
+    assert [message for _, message in peer.queue] == ["control", "frame 3", "frame 4"]
+    assert peer.dropped == 3
+
+
+def test_binary_frames_are_relayed_as_is_and_analyzed_from_the_payload():
+    async def run():
+        manager = VideoCallManager()
+        sender, receiver = FakeSocket(), FakeSocket()
+        for socket in (sender, receiver):
+            await manager.connect(socket, "room")
+        submitted = []
+        manager.submit_frame = lambda image, room_id, socket: submitted.append(image)
+
+        data = encode_frame("room", "alice", 1, b"jpeg-bytes")
+        await manager.relay_frame(data, "room", sender)
+        await asyncio.sleep(0.01)
+        assert receiver.received[0] is data
+        assert bytes(submitted[0]) == b"jpeg-bytes"
+        assert manager.frame_stats.as_dict()["binary"]["bytes"] == len(data)
+
+        with pytest.raises(FrameError):
+            await manager.relay_frame(encode_frame("other", "alice", 2, b"x"), "room", sender)
+        for socket in (sender, receiver):
+            manager.disconnect(socket, "room")
+
+    asyncio.run(run())
@@ -0,0 +1,20 @@
+import pytest
+
+from video_frames import HEADER, FrameError, decode_frame, encode_frame
+
+
+def test_frame_round_trip_without_copying_payload():
+    jpeg = b"\xff\xd8" + bytes(range(256)) * 4
+    data = encode_frame("room-1", "alice", 7, jpeg, timestamp_ms=1234)
+    assert len(data) == HEADER.size + len("room-1") + len("alice") + len(jpeg)
+
+    frame = decode_frame(data)
+    assert (frame.room, frame.sender, frame.seq, frame.timestamp_ms) == ("room-1", "alice", 7, 1234)
+    assert isinstance(frame.payload, memoryview) and frame.payload.obj is data
+    assert frame.payload == jpeg
+
+
+@pytest.mark.parametrize("data", [b"", b"VF", b"XX" + bytes(16), encode_frame("room", "bob", 1, b"")[:20]])
+def test_malformed_frames_are_rejected(data):
+    with pytest.raises(FrameError):
+        decode_frame(data)
@@ -0,0 +1,64 @@
+import io
+import subprocess
+
+import pytest
+
+import audio_codec
+import voice_handler as voice_module
+from audio_codec import AudioDecodeError, AudioTooLong, FfmpegPool, OutputTooLarge
+from gtts import gTTS
+from tts_cache import TTSCache
+from voice_handler import VoiceHandler
+
+
+def test_speech_to_text_hands_pcm_to_recognizer_in_memory(monkeypatch):
+    handler = VoiceHandler()
+    monkeypatch.setattr(voice_module, "decode_to_pcm", lambda data: b"\x00\x01" * 1600)
+
+    def recognize_google(audio, **kwargs):
+        assert audio.sample_rate == 16000 and audio.sample_width == 2
+        return f"{len(audio.frame_data)} bytes"
+
+    monkeypatch.setattr(handler.recognizer, "recognize_google", recognize_google)
+    assert handler.speech_to_text(b"webm") == "3200 bytes"
+
+
+def test_text_to_speech_writes_into_memory(monkeypatch):
+    monkeypatch.setattr(voice_module, "tts_cache", TTSCache(enabled=False))
+    monkeypatch.setattr(gTTS, "write_to_fp", lambda tts, fp: fp.write(b"mp3:" + tts.text.encode()))
+    monkeypatch.setattr(gTTS, "save", lambda tts, path: (_ for _ in ()).throw(AssertionError("touched disk")))
+    assert VoiceHandler().text_to_speech("hi") == b"mp3:hi"
+
+
+class EndlessUpload:
+    """A file that never runs out, like an upload with no end"""
+
+    def read(self, size=-1):
+        return b"\x00" * size
+
+
+def cat_pool(monkeypatch, command=("cat",)):
+    pool = FfmpegPool([], size=0)
+    spawn = lambda: subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    monkeypatch.setattr(pool, "_spawn", spawn)
+    return pool
+
+
+def test_decoder_streams_files_and_stops_at_max_output(monkeypatch):
+    pool = cat_pool(monkeypatch)
+    data = bytes(range(256)) * 1000
+    assert pool.run(io.BytesIO(data)) == data
+    assert pool.run(data, max_output=len(data)) == data
+    with pytest.raises(OutputTooLarge):
+        pool.run(EndlessUpload(), max_output=100_000)
+
+    failing = cat_pool(monkeypatch, ("sh", "-c", "cat >/dev/null; echo bad input >&2; exit 1"))
+    with pytest.raises(AudioDecodeError, match="bad input"):
+        failing.run(io.BytesIO(data))
+
+
+def test_too_long_recording_is_raised_not_swallowed(monkeypatch):
+    monkeypatch.setattr(audio_codec, "webm_decoder", cat_pool(monkeypatch))
+    with pytest.raises(AudioTooLong):
+        VoiceHandler().speech_to_text(EndlessUpload())
+    assert len(audio_codec.decode_to_pcm(b"\x00" * 32000, max_seconds=1)) == 32000
@@ -0,0 +1,89 @@
+import asyncio
+import threading
+
+import pytest
+
+from worker_pool import BoundedExecutor, PoolSaturated, UpstreamLimiter
+
+
+def test_rejects_work_past_queue_limit():
+    pool = BoundedExecutor("test", max_workers=1, max_queue=1)
+    release = threading.Event()
+
+    async def run():
+        running = [asyncio.create_task(pool.run(release.wait)) for _ in range(2)]
+        await asyncio.sleep(0.05)
+        assert pool.queue_depth == 1
+        with pytest.raises(PoolSaturated):
+            await pool.run(release.wait)
+        release.set()
+        await asyncio.gather(*running)
+
+    asyncio.run(run())
+    assert pool.stats()["rejected"] == 1
+    assert pool.in_flight == 0
+    pool.shutdown()
+
+
+def test_runs_off_the_event_loop_thread():
+    pool = BoundedExecutor("test", max_workers=2, max_queue=0)
+
+    async def run():
+        return await pool.run(threading.get_ident)
+
+    assert asyncio.run(run()) != threading.get_ident()
+    pool.shutdown()
+
+
+def test_upstream_limiter_queues_within_budget_and_sheds_past_it():
+    limiter = UpstreamLimiter("test", limit=1, budget=0.5)
+    order = []
+
+    async def call(name, release):
+        async with limiter.slot():
+            order.append(name)
+            await release.wait()
+
+    async def run():
+        release = asyncio.Event()
+        first = asyncio.create_task(call("first", release))
+        await asyncio.sleep(0)
+        # Expected wait is unknown until a call has finished, so the second one queues
+        second = asyncio.create_task(call("second", release))
+        await asyncio.sleep(0.01)
+        release.set()
+        await asyncio.gather(first, second)
+        assert order == ["first", "second"]
+
+        # One slot at 0.12s per call: four callers ahead fit the 0.5s budget, a fifth does not
+        limiter.avg_service = 0.12
+        release = asyncio.Event()
+        running = [asyncio.create_task(call(i, release)) for i in range(5)]
+        await asyncio.sleep(0)
+        with pytest.raises(PoolSaturated) as shed:
+            await call("late", release)
+        assert shed.value.retry_after == 1
+        release.set()
+        await asyncio.gather(*running)
+
+    asyncio.run(run())
+    assert order[2:] == [0, 1, 2, 3, 4]
+    assert limiter.in_flight == 0
+    assert limiter.stats()["rejected"] == 1
+
+
+def test_upstream_limiter_sheds_waiters_after_the_budget():
+    limiter = UpstreamLimiter("test", limit=1, budget=0.05)
+
+    async def run():
+        holder = asyncio.create_task(limiter.acquire())
+        await holder
+        with pytest.raises(PoolSaturated):
+            await limiter.acquire()
+        limiter.release()
+        # The abandoned waiter did not take the slot with it
+        await asyncio.wait_for(limiter.acquire(), 1)
+        limiter.release()
+
+    asyncio.run(run())
+    assert limiter.in_flight == 0
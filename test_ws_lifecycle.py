@@ -0,0 +1,185 @@
+import asyncio
+import gc
+import tracemalloc
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from main import app, manager
+from rate_limit import rate_limiter
+from video_call import PeerConnection
+from ws_lifecycle import ConnectionReaped, ConnectionTracker, connection_tracker
+
+
+class FakeSocket:
+    """Replays messages, then goes quiet like a half-open connection"""
+
+    def __init__(self, messages=(), fail_sends=False):
+        self.messages = list(messages)
+        self.fail_sends = fail_sends
+        self.sent = []
+        self.closed_with = None
+        self.client = None
+        self.query_params = {}
+
+    async def accept(self):
+        pass
+
+    async def receive(self):
+        if self.messages:
+            return self.messages.pop(0)
+        await asyncio.Event().wait()
+
+    async def send_text(self, message):
+        if self.fail_sends:
+            raise RuntimeError("connection reset")
+        self.sent.append(message)
+
+    async def send_bytes(self, message):
+        await self.send_text(message)
+
+    async def send_json(self, data):
+        await self.send_text(data)
+
+    async def close(self, code=1000, reason=None):
+        self.closed_with = code
+
+
+def text(data):
+    return {"type": "websocket.receive", "text": data}
+
+
+def test_receive_swallows_pongs_and_reaps_oversized_and_idle_connections():
+    async def run():
+        tracker = ConnectionTracker(heartbeat_interval=10, idle_timeout=0.05)
+        socket = FakeSocket([text('{"type": "pong"}'), text("hi"), {"type": "websocket.receive", "bytes": b"x" * 101}])
+        tracker.open(socket, "voice")
+        assert await tracker.receive(socket, max_bytes=100) == text("hi")
+        with pytest.raises(ConnectionReaped) as too_big:
+            await tracker.receive(socket, max_bytes=100)
+        assert (too_big.value.reason, too_big.value.code) == ("too_big", 1009)
+        with pytest.raises(ConnectionReaped) as idle:
+            await tracker.receive(socket, max_bytes=100)
+        assert (idle.value.reason, idle.value.code) == ("idle", 1001)
+        await tracker.reap(socket, idle.value)
+        assert socket.closed_with == 1001
+        assert tracker.stats()["bytes_in"] == 16 + 2 + 101
+
+        tracker.close(socket, "idle")
+        assert tracker.stats()["connections"] == {}
+        assert tracker.stats()["closed"] == {"idle": 1}
+        await tracker.aclose()
+
+    asyncio.run(run())
+
+
+def test_buffered_bytes_over_the_cap_close_the_connection():
+    async def run():
+        tracker = ConnectionTracker(max_buffered=1000)
+        socket = FakeSocket([text("a")])
+        buffered = [0]
+        tracker.open(socket, "video", "room", buffered=lambda: buffered[0])
+        assert await tracker.receive(socket, max_bytes=100) == text("a")
+        buffered[0] = 1001
+        assert tracker.stats()["bytes_in_flight"] == 1001
+        with pytest.raises(ConnectionReaped, match="buffered"):
+            await tracker.receive(socket, max_bytes=100)
+        tracker.close(socket, "buffer")
+        await tracker.aclose()
+
+    asyncio.run(run())
+
+
+def test_heartbeat_pings_only_quiet_connections_and_stops_when_none_are_left():
+    async def run():
+        tracker = ConnectionTracker(heartbeat_interval=0.02, idle_timeout=10)
+        quiet, dead = FakeSocket(), FakeSocket(fail_sends=True)
+        tracker.open(quiet, "voice")
+        tracker.open(dead, "video", "room")
+        await asyncio.sleep(0.05)
+        assert quiet.sent and set(quiet.sent) == {'{"type": "ping"}'}
+        assert tracker.ping_failures >= 1
+        tracker.close(quiet, "disconnect")
+        tracker.close(dead, "idle")
+        await asyncio.sleep(0.05)
+        assert tracker._heartbeat.done()
+
+    asyncio.run(run())
+
+
+def test_peer_buffer_drops_frames_and_evicts_a_peer_drowning_in_control_messages():
+    async def run():
+        evicted, socket = [], FakeSocket()
+        peer = PeerConnection(socket, evicted.append, max_queue=10, policy="drop_oldest", max_bytes=100)
+        for i in range(3):
+            peer.enqueue(f"frame {i}".ljust(40))
+        # The oldest frame made room for the third
+        assert [message.strip() for _, message in peer.queue] == ["frame 1", "frame 2"]
+        assert (peer.queued_bytes, peer.dropped) == (80, 1)
+
+        peer.enqueue("c" * 90, droppable=False)
+        assert [message for _, message in peer.queue] == ["c" * 90]
+        peer.enqueue("d" * 20, droppable=False)
+        assert evicted and not peer.queue and peer.queued_bytes == 0
+        # Its buffer is empty now, so the tracker would not reap it: eviction closes it
+        await asyncio.sleep(0.01)
+        assert socket.closed_with == 1013
+
+    asyncio.run(run())
+
+
+@pytest.fixture
+def fast_reaping(monkeypatch):
+    monkeypatch.setattr(rate_limiter, "enabled", False)
+    monkeypatch.setattr(connection_tracker, "idle_timeout", 0.2)
+    monkeypatch.setattr(connection_tracker, "heartbeat_interval", 0.05)
+
+
+def test_idle_and_oversized_websockets_are_closed_and_cleaned_up(fast_reaping, monkeypatch):
+    monkeypatch.setattr(main, "WS_VOICE_MAX_MESSAGE", 1000)
+    client = TestClient(app)
+    with client.websocket_connect("/ws/video/idle-room") as websocket:
+        # Pings do not keep a silent client alive
+        message = websocket.receive()
+        assert message["text"] == '{"type": "ping"}'
+        while message["type"] != "websocket.close":
+            message = websocket.receive()
+        assert message["code"] == 1001
+    with client.websocket_connect("/ws/voice") as websocket:
+        websocket.send_text("x" * 1001)
+        assert websocket.receive()["code"] == 1009
+
+    stats = client.get("/stats/connections").json()
+    assert stats["connections"] == {} and stats["video_rooms"] == stats["video_peers"] == 0
+    assert stats["closed"]["idle"] >= 1 and stats["closed"]["too_big"] >= 1
+
+
+def test_soak_abandoned_connections_do_not_grow_memory(fast_reaping, monkeypatch):
+    """Thousands of clients connect and vanish without a close frame"""
+    monkeypatch.setattr(connection_tracker, "idle_timeout", 0.05)
+
+    async def abandon(count, round_number):
+        await asyncio.gather(*(
+            main.video_call_endpoint(FakeSocket(), f"soak-{round_number}-{i % 50}") if i % 2
+            else main.voice_chat_websocket(FakeSocket())
+            for i in range(count)
+        ))
+
+    async def run():
+        tracemalloc.start()
+        await abandon(500, 0)
+        gc.collect()
+        baseline = tracemalloc.take_snapshot()
+        for round_number in range(1, 5):
+            await abandon(500, round_number)
+            assert connection_tracker.connections == {}
+            assert manager.active_connections == {} and manager.peers == {} and manager.analyzers == {}
+        gc.collect()
+        growth = sum(stat.size_diff for stat in tracemalloc.take_snapshot().compare_to(baseline, "filename"))
+        tracemalloc.stop()
+        await connection_tracker.aclose()
+        return growth
+
+    # 2000 more connections after the warm-up round; a leak of even 100 bytes each would show
+    assert asyncio.run(run()) < 150_000
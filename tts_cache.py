@@ -0,0 +1,173 @@
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+TTS_CACHE_ENABLED = os.getenv("TTS_CACHE_ENABLED", "true").lower() == "true"
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", os.path.join(tempfile.gettempdir(), "tts-cache"))
+TTS_CACHE_MEMORY_BYTES = int(os.getenv("TTS_CACHE_MEMORY_BYTES", 32 * 1024 * 1024))
+TTS_CACHE_DISK_BYTES = int(os.getenv("TTS_CACHE_DISK_BYTES", 512 * 1024 * 1024))
+# Long answers are unlikely to repeat; don't let them churn the cache
+TTS_CACHE_MAX_TEXT = int(os.getenv("TTS_CACHE_MAX_TEXT", 500))
+
+
+def phrase_key(text: str, lang: str, voice: str) -> str:
+    return hashlib.sha256(f"{lang}\0{voice}\0{text}".encode()).hexdigest()
+
+
+class TTSCache:
+    """Content-addressed MP3 cache: byte-bounded memory LRU over a byte-bounded disk LRU.
+
+    A disk hit is read into bytes and promoted to the memory tier, so no
+    file stays open and the audio can cross to a process voice pool.
+    """
+
+    def __init__(
+        self,
+        directory: str = TTS_CACHE_DIR,
+        memory_bytes: int = TTS_CACHE_MEMORY_BYTES,
+        disk_bytes: int = TTS_CACHE_DISK_BYTES,
+        max_text: int = TTS_CACHE_MAX_TEXT,
+        enabled: bool = TTS_CACHE_ENABLED,
+    ):
+        self.directory = directory
+        self.memory_limit = memory_bytes
+        self.disk_limit = disk_bytes
+        self.max_text = max_text
+        self.enabled = enabled
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_bytes = 0
+        self._disk: Optional["OrderedDict[str, int]"] = None
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.hit_seconds = 0.0
+        self.miss_seconds = 0.0
+
+    def cacheable(self, text: str) -> bool:
+        return self.enabled and len(text) <= self.max_text
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.mp3")
+
+    def _load_disk_index(self):
+        # Rebuild LRU order from mtimes once per process
+        entries = []
+        if os.path.isdir(self.directory):
+            for root, _, files in os.walk(self.directory):
+                for name in files:
+                    if name.endswith(".mp3"):
+                        stat = os.stat(os.path.join(root, name))
+                        entries.append((stat.st_mtime, name[:-4], stat.st_size))
+        self._disk = OrderedDict((key, size) for _, key, size in sorted(entries))
+        self._disk_bytes = sum(self._disk.values())
+
+    def get(self, text: str, lang: str = "en", voice: str = "com") -> Optional[bytes]:
+        start = time.perf_counter()
+        key = phrase_key(text, lang, voice)
+        with self._lock:
+            audio = self._memory.get(key)
+            if audio is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                self.hit_seconds += time.perf_counter() - start
+                return audio
+            if self._disk is None:
+                self._load_disk_index()
+            if key not in self._disk:
+                return None
+            try:
+                audio = self._read(key)
+            except OSError:
+                self._disk_bytes -= self._disk.pop(key)
+                return None
+            self._disk.move_to_end(key)
+            os.utime(self._path(key))
+            self._remember(key, audio)
+            self.disk_hits += 1
+            self.hit_seconds += time.perf_counter() - start
+            return audio
+
+    def _read(self, key: str) -> bytes:
+        with open(self._path(key), "rb") as f:
+            return f.read()
+
+    def put(self, text: str, audio: bytes, lang: str = "en", voice: str = "com", synthesis_seconds: float = 0.0):
+        if not audio:
+            return
+        key = phrase_key(text, lang, voice)
+        with self._lock:
+            self.misses += 1
+            self.miss_seconds += synthesis_seconds
+            self._remember(key, audio)
+            if self._disk is None:
+                self._load_disk_index()
+            if key not in self._disk and len(audio) <= self.disk_limit:
+                try:
+                    self._write(key, audio)
+                except OSError as e:
+                    logger.warning("Could not write TTS cache entry: %s", e)
+                    return
+                self._disk[key] = len(audio)
+                self._disk_bytes += len(audio)
+                self._evict_disk()
+
+    def _write(self, key: str, audio: bytes):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, "wb") as f:
+            f.write(audio)
+        os.replace(temp_path, path)
+
+    def _remember(self, key: str, audio: bytes):
+        if len(audio) > self.memory_limit:
+            return
+        previous = self._memory.pop(key, None)
+        if previous is not None:
+            self._memory_bytes -= len(previous)
+        self._memory[key] = audio
+        self._memory_bytes += len(audio)
+        while self._memory_bytes > self.memory_limit:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+            self.evictions += 1
+
+    def _evict_disk(self):
+        while self._disk_bytes > self.disk_limit:
+            key, size = self._disk.popitem(last=False)
+            self._disk_bytes -= size
+            self.evictions += 1
+            try:
+                os.unlink(self._path(key))
+            except OSError:
+                pass
+
+    def stats(self) -> dict:
+        hits = self.memory_hits + self.disk_hits
+        lookups = hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "avg_hit_ms": round(self.hit_seconds / hits * 1000, 3) if hits else 0.0,
+            "avg_synthesis_ms": round(self.miss_seconds / self.misses * 1000, 3) if self.misses else 0.0,
+            "memory_bytes": self._memory_bytes,
+            "memory_entries": len(self._memory),
+            "disk_bytes": self._disk_bytes,
+            "disk_entries": len(self._disk or ()),
+            "evictions": self.evictions,
+        }
+
+
+tts_cache = TTSCache()
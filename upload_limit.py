@@ -0,0 +1,65 @@
+import os
+from typing import Iterable
+
+from fastapi import HTTPException
+from starlette.responses import JSONResponse
+
+from metrics import registry
+
+# Largest request body accepted by the upload endpoints (the audio plus multipart framing)
+VOICE_UPLOAD_MAX_BYTES = int(os.getenv("VOICE_UPLOAD_MAX_BYTES", 10 * 1024 * 1024))
+UPLOAD_LIMITED_PATHS = ("/voice-chat", "/jobs/transcribe")
+
+uploads_rejected = registry.counter(
+    "uploads_rejected_total", "Uploads refused for size, by the header or while streaming", ("path", "reason"),
+)
+
+
+class UploadTooLarge(HTTPException):
+    def __init__(self, max_bytes: int):
+        super().__init__(status_code=413, detail=f"Upload is larger than {max_bytes} bytes")
+
+
+class UploadLimitMiddleware:
+    """ASGI middleware capping the request body of the upload endpoints.
+
+    A Content-Length over the limit is answered with 413 before any of the
+    body is read. Otherwise (including chunked uploads without a length) the
+    body is counted as it streams in and parsing stops with a 413 once it
+    passes the limit, so an oversized upload is never spooled in full.
+    """
+
+    def __init__(self, app, max_bytes: int = VOICE_UPLOAD_MAX_BYTES, paths: Iterable[str] = UPLOAD_LIMITED_PATHS):
+        self.app = app
+        self.max_bytes = max_bytes
+        self.paths = frozenset(paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        length = dict(scope["headers"]).get(b"content-length")
+        if length is not None and length.isdigit() and int(length) > self.max_bytes:
+            uploads_rejected.inc(path=scope["path"], reason="content_length")
+            error = UploadTooLarge(self.max_bytes)
+            # Connection: close, the unread body is not drained
+            response = JSONResponse({"detail": error.detail}, status_code=413, headers={"Connection": "close"})
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    uploads_rejected.inc(path=scope["path"], reason="streamed")
+                    # Raised inside body parsing; FastAPI passes HTTPExceptions through as the response
+                    raise UploadTooLarge(self.max_bytes)
+            return message
+
+        await self.app(scope, limited_receive, send)
+
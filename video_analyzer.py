@@ -0,0 +1,137 @@
+import asyncio
+import base64
+import hashlib
+import logging
+import os
+import time
+from io import BytesIO
+from typing import Awaitable, Callable, Optional
+
+from worker_pool import PoolSaturated
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow is optional: without it only exact duplicates are skipped
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+# Minimum seconds between two vision requests for the same room
+VIDEO_ANALYSIS_INTERVAL = float(os.getenv("VIDEO_ANALYSIS_INTERVAL", 5.0))
+# Frames whose dHash differs from the last analyzed frame by at most this many bits are skipped
+VIDEO_DEDUP_DISTANCE = int(os.getenv("VIDEO_DEDUP_DISTANCE", 6))
+
+
+def decode_data_url(frame: str) -> bytes:
+    _, _, payload = frame.partition(",")
+    return base64.b64decode(payload or frame)
+
+
+def frame_fingerprint(jpeg: bytes) -> Optional[int]:
+    """64-bit difference hash of the frame, or a digest when Pillow is unavailable"""
+    if Image is None:
+        return int.from_bytes(hashlib.blake2b(jpeg, digest_size=8).digest(), "big")
+    try:
+        with Image.open(BytesIO(jpeg)) as image:
+            # draft() lets the JPEG decoder scale down while decoding, which is far cheaper
+            image.draft("L", (64, 64))
+            pixels = list(image.convert("L").resize((9, 8)).getdata())
+    except Exception:
+        return None
+    fingerprint = 0
+    for row in range(8):
+        for col in range(8):
+            fingerprint = (fingerprint << 1) | (pixels[row * 9 + col] > pixels[row * 9 + col + 1])
+    return fingerprint
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+class RoomAnalyzer:
+    """Background vision analysis for one room.
+
+    submit() only stores the newest frame, so frames that arrive while a
+    request is running or before the sampling interval has passed are
+    coalesced into the latest one. The relay path never waits on it.
+    """
+
+    def __init__(
+        self,
+        room_id: str,
+        analyze: Callable[[str], Awaitable[str]],
+        emit: Callable[[object, str], Awaitable[None]],
+        interval: float = VIDEO_ANALYSIS_INTERVAL,
+        dedup_distance: int = VIDEO_DEDUP_DISTANCE,
+    ):
+        self.room_id = room_id
+        self.analyze = analyze
+        self.emit = emit
+        self.interval = interval
+        self.dedup_distance = dedup_distance
+        self._latest = None
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._last_run = float("-inf")
+        self._last_fingerprint: Optional[int] = None
+        self.analyzed = 0
+        self.coalesced = 0
+        self.duplicates = 0
+        self.shed = 0
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def submit(self, frame, sender):
+        if self._latest is not None:
+            self.coalesced += 1
+        self._latest = (frame, sender)
+        self._wake.set()
+
+    async def _run(self):
+        while True:
+            await self._wake.wait()
+            delay = self._last_run + self.interval - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._wake.clear()
+            if self._latest is None:
+                continue
+            frame, sender = self._latest
+            self._latest = None
+            try:
+                await self._analyze_frame(frame, sender)
+            except Exception as e:
+                logger.error("Video analysis failed for room %s: %s", self.room_id, e)
+
+    async def _analyze_frame(self, frame, sender):
+        jpeg = decode_data_url(frame) if isinstance(frame, str) else frame
+        fingerprint = await asyncio.to_thread(frame_fingerprint, jpeg)
+        if (
+            fingerprint is not None
+            and self._last_fingerprint is not None
+            and hamming_distance(fingerprint, self._last_fingerprint) <= self.dedup_distance
+        ):
+            self.duplicates += 1
+            return
+        self._last_run = time.monotonic()
+        self._last_fingerprint = fingerprint
+        try:
+            content = await self.analyze(frame)
+        except PoolSaturated:
+            # The vision model is over capacity: skip this frame, the next one gets another chance
+            self.shed += 1
+            self._last_fingerprint = None
+            return
+        self.analyzed += 1
+        await self.emit(sender, content)
+
+    def stats(self) -> dict:
+        return {"analyzed": self.analyzed, "coalesced": self.coalesced, "duplicates": self.duplicates, "shed": self.shed}
@@ -0,0 +1,195 @@
+import asyncio
+import logging
+import os
+import socket
+import struct
+import time
+import uuid
+from typing import Callable, Dict, Optional, Set, Union
+
+from redis.exceptions import RedisError
+
+logger = logging.getLogger(__name__)
+
+VIDEO_BACKPLANE = os.getenv("VIDEO_BACKPLANE", "false").lower() in ("true", "redis")
+# A node that stops heartbeating drops out of room membership after this many seconds
+VIDEO_PRESENCE_TTL = float(os.getenv("VIDEO_PRESENCE_TTL", 30))
+NODE_ID = os.getenv("NODE_ID") or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+
+CHANNEL_PREFIX = "video:room:"
+MEMBERS_SUFFIX = ":nodes"
+
+# Envelope: kind u8 | droppable u8 | node id length u8 | node id | payload
+ENVELOPE = struct.Struct("!BBB")
+TEXT, BINARY, JOIN, LEAVE = range(4)
+
+Message = Union[str, bytes]
+Deliver = Callable[[str, Message, bool], None]
+
+
+def pack(kind: int, node_id: bytes, payload: Union[bytes, memoryview] = b"", droppable: bool = False) -> bytes:
+    return b"".join((ENVELOPE.pack(kind, droppable, len(node_id)), node_id, payload))
+
+
+def unpack(data: bytes):
+    kind, droppable, node_len = ENVELOPE.unpack_from(data)
+    node_end = ENVELOPE.size + node_len
+    return kind, bool(droppable), data[ENVELOPE.size:node_end].decode(), memoryview(data)[node_end:]
+
+
+class RedisBackplane:
+    """Relays room traffic between processes over Redis pub/sub.
+
+    Each room has a channel and a sorted set of the nodes that have local
+    participants in it, scored by presence expiry. A node refreshes its
+    entries every presence_ttl / 3 seconds, so a crashed node ages out.
+    Nothing is published for a room that no other node has joined.
+    """
+
+    def __init__(self, redis, node_id: str = NODE_ID, presence_ttl: float = VIDEO_PRESENCE_TTL):
+        self.redis = redis
+        self.node_id = node_id
+        self._node_bytes = node_id.encode()
+        self.presence_ttl = presence_ttl
+        self.deliver: Optional[Deliver] = None
+        self.rooms: Set[str] = set()
+        self.remote_nodes: Dict[str, Set[str]] = {}
+        self._pubsub = None
+        self._reader: Optional[asyncio.Task] = None
+        self._heartbeat: Optional[asyncio.Task] = None
+        self.published = 0
+        self.received = 0
+        self.skipped_local = 0
+        self.errors = 0
+
+    @staticmethod
+    def channel(room_id: str) -> str:
+        return CHANNEL_PREFIX + room_id
+
+    def _start(self):
+        if self._pubsub is None:
+            self._pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+        if self._reader is None:
+            self._reader = asyncio.create_task(self._read())
+            self._heartbeat = asyncio.create_task(self._beat())
+
+    async def join(self, room_id: str):
+        """First local participant in room_id: subscribe and announce this node"""
+        self._start()
+        self.rooms.add(room_id)
+        try:
+            await self._pubsub.subscribe(self.channel(room_id))
+            await self._refresh(room_id)
+            await self.redis.publish(self.channel(room_id), pack(JOIN, self._node_bytes))
+        except (RedisError, OSError) as e:
+            self._failed(e)
+
+    async def leave(self, room_id: str):
+        """Last local participant left room_id"""
+        self.rooms.discard(room_id)
+        self.remote_nodes.pop(room_id, None)
+        try:
+            await self.redis.zrem(self.channel(room_id) + MEMBERS_SUFFIX, self.node_id)
+            await self.redis.publish(self.channel(room_id), pack(LEAVE, self._node_bytes))
+            if self._pubsub is not None:
+                await self._pubsub.unsubscribe(self.channel(room_id))
+        except (RedisError, OSError) as e:
+            self._failed(e)
+
+    async def publish(self, room_id: str, message: Message, droppable: bool = True):
+        if not self.remote_nodes.get(room_id):
+            self.skipped_local += 1
+            return
+        if isinstance(message, str):
+            envelope = pack(TEXT, self._node_bytes, message.encode(), droppable)
+        else:
+            envelope = pack(BINARY, self._node_bytes, message, droppable)
+        try:
+            await self.redis.publish(self.channel(room_id), envelope)
+        except (RedisError, OSError) as e:
+            self._failed(e)
+            return
+        self.published += 1
+
+    async def close(self):
+        for task in (self._reader, self._heartbeat):
+            if task is not None:
+                task.cancel()
+        self._reader = self._heartbeat = None
+        for room_id in list(self.rooms):
+            await self.leave(room_id)
+        if self._pubsub is not None:
+            await self._pubsub.aclose()
+            self._pubsub = None
+
+    def _failed(self, error: Exception):
+        self.errors += 1
+        logger.warning("Video backplane Redis error: %s", error)
+
+    async def _refresh(self, room_id: str):
+        key = self.channel(room_id) + MEMBERS_SUFFIX
+        now = time.time()
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.zadd(key, {self.node_id: now + self.presence_ttl})
+            pipe.zremrangebyscore(key, "-inf", now)
+            pipe.expire(key, int(self.presence_ttl) + 1)
+            pipe.zrange(key, 0, -1)
+            *_, members = await pipe.execute()
+        nodes = {m.decode() if isinstance(m, bytes) else m for m in members}
+        nodes.discard(self.node_id)
+        if room_id in self.rooms:
+            self.remote_nodes[room_id] = nodes
+
+    async def _beat(self):
+        while True:
+            await asyncio.sleep(self.presence_ttl / 3)
+            for room_id in list(self.rooms):
+                try:
+                    await self._refresh(room_id)
+                except (RedisError, OSError) as e:
+                    self._failed(e)
+
+    async def _read(self):
+        while True:
+            if not self._pubsub.subscribed:
+                await asyncio.sleep(0.1)
+                continue
+            try:
+                message = await self._pubsub.get_message(timeout=1.0)
+            except (RedisError, OSError) as e:
+                self._failed(e)
+                await asyncio.sleep(1)
+                continue
+            if message is None or message["type"] != "message":
+                continue
+            channel = message["channel"]
+            room_id = (channel.decode() if isinstance(channel, bytes) else channel)[len(CHANNEL_PREFIX):]
+            try:
+                self._handle(room_id, message["data"])
+            except Exception as e:
+                logger.error("Bad backplane message on %s: %s", room_id, e)
+
+    def _handle(self, room_id: str, data: bytes):
+        kind, droppable, node_id, payload = unpack(data)
+        if node_id == self.node_id or room_id not in self.rooms:
+            return
+        if kind == JOIN:
+            self.remote_nodes.setdefault(room_id, set()).add(node_id)
+        elif kind == LEAVE:
+            self.remote_nodes.get(room_id, set()).discard(node_id)
+        else:
+            self.received += 1
+            # One copy per node; every local peer then shares it
+            message = str(payload, "utf-8") if kind == TEXT else bytes(payload)
+            self.deliver(room_id, message, droppable)
+
+    def stats(self) -> dict:
+        return {
+            "node_id": self.node_id,
+            "rooms": len(self.rooms),
+            "remote_rooms": sum(1 for nodes in self.remote_nodes.values() if nodes),
+            "published": self.published,
+            "received": self.received,
+            "skipped_local": self.skipped_local,
+            "errors": self.errors,
+        }
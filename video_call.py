@@ -1,45 +1,292 @@
 from fastapi import WebSocket, WebSocketDisconnect
-from typing import Dict, List
-import json
+from typing import Deque, Dict, List, Optional, Set, Tuple, Union
+from collections import deque
+from contextlib import suppress
+import asyncio
 import base64
-import openai
-from dotenv import load_dotenv
+import json
+import logging
 import os
+import time
+from assistant.llm_client import chat_completion
+from metrics import registry, video_frames
+from redis_client import redis_binary_client
+from video_analyzer import RoomAnalyzer
+from video_backplane import VIDEO_BACKPLANE, RedisBackplane
+from video_frames import FrameError, decode_frame
+from worker_pool import PoolSaturated
 
-load_dotenv()
+logger = logging.getLogger(__name__)
+
+VISION_MODEL = os.getenv("VISION_MODEL", "gpt-4-vision-preview")
+# Outbound messages buffered per peer before the slow-consumer policy kicks in
+VIDEO_PEER_QUEUE = int(os.getenv("VIDEO_PEER_QUEUE", 8))
+# "drop_oldest" drops the oldest queued frame, "latest" keeps only the newest frame
+VIDEO_SLOW_PEER_POLICY = os.getenv("VIDEO_SLOW_PEER_POLICY", "latest")
+# A send that takes longer than this marks the peer as dead
+VIDEO_SEND_TIMEOUT = float(os.getenv("VIDEO_SEND_TIMEOUT", 5.0))
+# Outbound bytes buffered per peer; past it frames are dropped, and a peer whose control messages alone fill it is evicted
+VIDEO_PEER_MAX_BYTES = int(os.getenv("VIDEO_PEER_MAX_BYTES", 4 * 1024 * 1024))
+
+Message = Union[str, bytes]
+
+# Close handshakes of evicted peers, referenced until they finish
+_closing: Set[asyncio.Task] = set()
+
+class PeerConnection:
+    """Outbound side of one participant: a bounded queue drained by its own writer task.
+
+    Frames may be dropped for a slow peer according to VIDEO_SLOW_PEER_POLICY
+    or once max_bytes are queued; control messages (joins, leaves, analysis)
+    are always delivered, unless they alone fill max_bytes and the peer is
+    evicted as dead.
+    """
+
+    def __init__(self, websocket: WebSocket, on_dead, max_queue: int = VIDEO_PEER_QUEUE, policy: str = VIDEO_SLOW_PEER_POLICY, room_id: str = "", max_bytes: int = VIDEO_PEER_MAX_BYTES):
+        self.websocket = websocket
+        self.room_id = room_id
+        self.on_dead = on_dead
+        self.max_queue = max_queue
+        self.policy = policy
+        self.max_bytes = max_bytes
+        self.queue: Deque[Tuple[bool, Message]] = deque()
+        self.queued_bytes = 0
+        self.sent = 0
+        self.dropped = 0
+        self._ready = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.closed = False
+
+    def start(self):
+        self._task = asyncio.create_task(self._write())
+
+    def stop(self):
+        # The flag as well as cancel(): on Python 3.11 wait_for() can swallow a
+        # cancellation that arrives as the send completes, leaving the writer parked forever
+        self.closed = True
+        self.queue.clear()
+        self.queued_bytes = 0
+        self._ready.set()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def enqueue(self, message: Message, droppable: bool = True):
+        if droppable:
+            if self.policy == "latest":
+                self._drop_frames(len(self.queue))
+            elif len(self.queue) >= self.max_queue:
+                self._drop_frames(1)
+        while self.queued_bytes + len(message) > self.max_bytes and any(d for d, _ in self.queue):
+            self._drop_frames(1)
+        if self.queued_bytes + len(message) > self.max_bytes:
+            if droppable:
+                self._count_dropped()
+                return
+            logger.info("Evicting video peer with %d bytes of undelivered messages", self.queued_bytes)
+            self.queue.clear()
+            self.queued_bytes = 0
+            # With the queue emptied the tracker's buffer check no longer sees it: close it here
+            self.evict(1013, "Too many undelivered messages")
+            return
+        self.queue.append((droppable, message))
+        self.queued_bytes += len(message)
+        self._ready.set()
+
+    def evict(self, code: int, reason: str):
+        """Drop the peer from its room and close its socket, so its endpoint stops and the client can reconnect"""
+        self.on_dead(self.websocket)
+        # on_dead stops this peer's writer, which may be the caller: close from a task of its own
+        task = asyncio.ensure_future(self._close(code, reason))
+        _closing.add(task)
+        task.add_done_callback(_closing.discard)
+
+    async def _close(self, code: int, reason: str):
+        with suppress(Exception):
+            await asyncio.wait_for(self.websocket.close(code=code, reason=reason), VIDEO_SEND_TIMEOUT)
+
+    def _count_dropped(self):
+        self.dropped += 1
+        video_frames.inc(room=self.room_id, direction="dropped")
+
+    def _drop_frames(self, limit: int):
+        kept = deque()
+        while self.queue:
+            droppable, message = self.queue.popleft()
+            if droppable and limit > 0:
+                limit -= 1
+                self.queued_bytes -= len(message)
+                self._count_dropped()
+            else:
+                kept.append((droppable, message))
+        self.queue = kept
+
+    async def _write(self):
+        while not self.closed:
+            await self._ready.wait()
+            self._ready.clear()
+            while self.queue and not self.closed:
+                _, message = self.queue.popleft()
+                self.queued_bytes -= len(message)
+                try:
+                    if isinstance(message, str):
+                        await asyncio.wait_for(self.websocket.send_text(message), VIDEO_SEND_TIMEOUT)
+                    else:
+                        await asyncio.wait_for(self.websocket.send_bytes(message), VIDEO_SEND_TIMEOUT)
+                except Exception as e:
+                    logger.info("Evicting unresponsive video peer: %r", e)
+                    self.evict(1013, "Too slow to keep up with the call")
+                    return
+                self.sent += 1
+                video_frames.inc(room=self.room_id, direction="out")
+
+class FrameStats:
+    """Wire bytes and server handling time per frame, split by transport"""
 
-class VideoCallManager:
     def __init__(self):
+        self.frames = {"text": 0, "binary": 0}
+        self.bytes = {"text": 0, "binary": 0}
+        self.seconds = {"text": 0.0, "binary": 0.0}
+
+    def observe(self, mode: str, size: int, seconds: float):
+        self.frames[mode] += 1
+        self.bytes[mode] += size
+        self.seconds[mode] += seconds
+
+    def as_dict(self) -> dict:
+        return {
+            mode: {
+                "frames": frames,
+                "bytes": self.bytes[mode],
+                "avg_frame_bytes": round(self.bytes[mode] / frames) if frames else 0,
+                "avg_relay_us": round(self.seconds[mode] / frames * 1e6, 1) if frames else 0.0,
+            }
+            for mode, frames in self.frames.items()
+        }
+
+class VideoCallManager:
+    def __init__(self, backplane: Optional[RedisBackplane] = None):
         self.active_connections: Dict[str, List[WebSocket]] = {}
-        self.openai_client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        self.analyzers: Dict[str, RoomAnalyzer] = {}
+        self.peers: Dict[WebSocket, PeerConnection] = {}
+        self.frame_stats = FrameStats()
+        # Relays rooms to participants connected to other processes
+        self.backplane = backplane
+        if backplane is not None:
+            backplane.deliver = self.deliver_local
+        # Backplane leaves of emptied rooms, referenced until they finish
+        self._leaving: Set[asyncio.Task] = set()
 
     async def connect(self, websocket: WebSocket, room_id: str):
         await websocket.accept()
         if room_id not in self.active_connections:
             self.active_connections[room_id] = []
+            self.analyzers[room_id] = RoomAnalyzer(room_id, self.process_video_frame, self.send_analysis)
+            self.analyzers[room_id].start()
+            if self.backplane is not None:
+                await self.backplane.join(room_id)
         self.active_connections[room_id].append(websocket)
+        peer = PeerConnection(websocket, lambda ws: self.disconnect(ws, room_id), room_id=room_id)
+        peer.start()
+        self.peers[websocket] = peer
 
     def disconnect(self, websocket: WebSocket, room_id: str):
-        if room_id in self.active_connections:
-            self.active_connections[room_id].remove(websocket)
-            if not self.active_connections[room_id]:
+        peer = self.peers.pop(websocket, None)
+        if peer is not None:
+            peer.stop()
+        connections = self.active_connections.get(room_id)
+        if connections and websocket in connections:
+            connections.remove(websocket)
+            if not connections:
                 del self.active_connections[room_id]
+                self.analyzers.pop(room_id).stop()
+                video_frames.remove(room=room_id)
+                if self.backplane is not None:
+                    task = asyncio.create_task(self.backplane.leave(room_id))
+                    self._leaving.add(task)
+                    task.add_done_callback(self._left)
+
+    def _left(self, task: asyncio.Task):
+        self._leaving.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning("Video backplane leave failed: %r", task.exception())
+
+    async def aclose(self):
+        """Finish pending backplane leaves and socket closes, then close the backplane"""
+        await asyncio.gather(*self._leaving, *_closing, return_exceptions=True)
+        if self.backplane is not None:
+            await self.backplane.close()
 
-    async def broadcast(self, message: str, room_id: str, sender: WebSocket):
-        if room_id in self.active_connections:
-            for connection in self.active_connections[room_id]:
-                if connection != sender:
-                    await connection.send_text(message)
+    async def broadcast(self, message: Union[Message, dict], room_id: str, sender: WebSocket, droppable: bool = True):
+        """Queue one message for every other peer; never waits on a peer's socket"""
+        if isinstance(message, dict):
+            # Serialize once for the whole room
+            message = json.dumps(message)
+            droppable = False
+        self.deliver_local(room_id, message, droppable, sender)
+        if self.backplane is not None:
+            await self.backplane.publish(room_id, message, droppable)
 
-    async def process_video_frame(self, frame_data: str, room_id: str):
+    def deliver_local(self, room_id: str, message: Message, droppable: bool = True, sender: Optional[WebSocket] = None):
+        for connection in self.active_connections.get(room_id, ()):
+            if connection != sender:
+                peer = self.peers.get(connection)
+                if peer is not None:
+                    peer.enqueue(message, droppable)
+
+    async def relay_frame(self, data: Message, room_id: str, sender: WebSocket):
+        """Relay one incoming frame to the room and hand it to the analyzer.
+
+        Binary frames are forwarded as the same bytes object to every peer and
+        the analyzer gets a memoryview of the JPEG payload, so nothing is copied.
+        """
+        started = time.perf_counter()
+        if isinstance(data, str):
+            mode, image = "text", data
+        else:
+            frame = decode_frame(data)
+            if frame.room != room_id:
+                raise FrameError(f"Frame is addressed to room {frame.room!r}")
+            mode, image = "binary", frame.payload
+        await self.broadcast(data, room_id, sender)
+        # Vision analysis runs in the room's background analyzer
+        self.submit_frame(image, room_id, sender)
+        self.frame_stats.observe(mode, len(data), time.perf_counter() - started)
+        video_frames.inc(room=room_id, direction="in")
+
+    def queue_depths(self) -> Dict[Tuple[str], int]:
+        depths = {}
+        for peer in self.peers.values():
+            depths[(peer.room_id,)] = depths.get((peer.room_id,), 0) + len(peer.queue)
+        return depths
+
+    def submit_frame(self, frame_data: Union[str, memoryview], room_id: str, sender: WebSocket):
+        """Queue the frame for background analysis; never blocks the relay"""
+        analyzer = self.analyzers.get(room_id)
+        if analyzer is not None:
+            analyzer.submit(frame_data, sender)
+
+    async def send_analysis(self, websocket: WebSocket, content: str):
+        peer = self.peers.get(websocket)
+        if peer is not None:
+            peer.enqueue(json.dumps({
+                "type": "ai_analysis",
+                "content": content
+            }), droppable=False)
+
+    async def process_video_frame(self, frame_data: Union[str, memoryview]):
         try:
-            # Decode base64 image
-            image_data = base64.b64decode(frame_data.split(',')[1])
-            
+            if not isinstance(frame_data, str):
+                image_url = "data:image/jpeg;base64," + base64.b64encode(frame_data).decode()
+            elif frame_data.startswith("data:"):
+                image_url = frame_data
+            else:
+                image_url = f"data:image/jpeg;base64,{frame_data}"
+
             # Process with OpenAI Vision API
-            response = self.openai_client.chat.completions.create(
-                model="gpt-4-vision-preview",
-                messages=[
+            return await chat_completion(
+                VISION_MODEL,
+                [
                     {
                         "role": "user",
                         "content": [
@@ -47,17 +294,19 @@ class VideoCallManager:
                             {
                                 "type": "image_url",
                                 "image_url": {
-                                    "url": f"data:image/jpeg;base64,{frame_data}"
+                                    "url": image_url
                                 }
                             }
                         ]
                     }
                 ],
+                agent="vision",
                 max_tokens=300
             )
-            
-            return response.choices[0].message.content
+        except PoolSaturated:
+            raise
         except Exception as e:
             return f"Error processing frame: {str(e)}"
 
-manager = VideoCallManager() 
\ No newline at end of file
+manager = VideoCallManager(RedisBackplane(redis_binary_client) if VIDEO_BACKPLANE else None)
+registry.gauge("video_room_queue_depth", "Messages waiting in the room's peer queues", ("room",), collect=manager.queue_depths)
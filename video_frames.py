@@ -0,0 +1,54 @@
+import struct
+import time
+from typing import NamedTuple, Union
+
+# Binary video frame, all integers big-endian:
+#   magic "VF" | version u8 | room length u8 | sender length u8 | reserved u8 | seq u32 | timestamp ms u64
+#   | room (utf-8) | sender (utf-8) | JPEG payload
+MAGIC = b"VF"
+VERSION = 1
+HEADER = struct.Struct("!2sBBBxIQ")
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+
+class FrameError(ValueError):
+    pass
+
+
+class VideoFrame(NamedTuple):
+    room: str
+    sender: str
+    seq: int
+    timestamp_ms: int
+    payload: memoryview
+
+
+def encode_frame(room: str, sender: str, seq: int, payload: Buffer, timestamp_ms: int = None) -> bytes:
+    room_bytes, sender_bytes = room.encode(), sender.encode()
+    if len(room_bytes) > 255 or len(sender_bytes) > 255:
+        raise FrameError("room and sender ids must be at most 255 bytes")
+    if timestamp_ms is None:
+        timestamp_ms = int(time.time() * 1000)
+    header = HEADER.pack(MAGIC, VERSION, len(room_bytes), len(sender_bytes), seq & 0xFFFFFFFF, timestamp_ms)
+    return b"".join((header, room_bytes, sender_bytes, payload))
+
+
+def decode_frame(data: Buffer) -> VideoFrame:
+    """Parse the header; the payload is a view into data, not a copy"""
+    view = memoryview(data)
+    if len(view) < HEADER.size:
+        raise FrameError("frame is shorter than its header")
+    magic, version, room_len, sender_len, seq, timestamp_ms = HEADER.unpack_from(view)
+    if magic != MAGIC or version != VERSION:
+        raise FrameError("not a version 1 video frame")
+    room_end = HEADER.size + room_len
+    sender_end = room_end + sender_len
+    if len(view) < sender_end:
+        raise FrameError("frame is shorter than its header")
+    try:
+        room = str(view[HEADER.size:room_end], "utf-8")
+        sender = str(view[room_end:sender_end], "utf-8")
+    except UnicodeDecodeError:
+        raise FrameError("room and sender ids must be utf-8")
+    return VideoFrame(room, sender, seq, timestamp_ms, view[sender_end:])
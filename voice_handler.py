@@ -1,97 +1,187 @@
-import speech_recognition as sr
-from gtts import gTTS
-import tempfile
-import os
-from openai import OpenAI
-from dotenv import load_dotenv
+import asyncio
 import logging
-from pydub import AudioSegment
 import io
+import os
+import time
+from urllib.parse import urlsplit
+from assistant.llm_client import chat_completion, stream_chat_completion
+from audio_codec import SAMPLE_RATE, SAMPLE_WIDTH, AudioTooLong, decode_to_pcm
+from assistant.response_cache import response_cache
+from assistant.conversation import conversation_store
+from worker_pool import PoolSaturated, UpstreamLimiter, voice_pool
+from speech_pipeline import stream_speech
+from tts_cache import tts_cache
+from metrics import voice_stage_seconds
+from container import container
 
-# Настройка логирования
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-load_dotenv()
+# Google endpoints; point them at local stand-ins (benchmarks/stub_speech.py) to run without the internet
+GOOGLE_STT_ENDPOINT = os.getenv("GOOGLE_STT_ENDPOINT", "http://www.google.com/speech-api/v2/recognize")
+# Replaces https://translate.google.<tld> in gTTS requests when set
+GTTS_URL = os.getenv("GTTS_URL")
+
+# Concurrent calls to Google STT and gTTS per process; past the queue budget callers get a 503
+STT_CONCURRENCY = int(os.getenv("STT_CONCURRENCY", 4))
+TTS_CONCURRENCY = int(os.getenv("TTS_CONCURRENCY", 4))
+
+stt_limiter = UpstreamLimiter("stt", STT_CONCURRENCY)
+tts_limiter = UpstreamLimiter("tts", TTS_CONCURRENCY)
+
+AI_MODEL = "gpt-3.5-turbo"
+AI_SYSTEM_PROMPT = "You are a helpful assistant. Keep your responses concise and clear."
+
+def build_recognizer():
+    import speech_recognition as sr
+    return sr.Recognizer()
+
+container.provide("speech_recognizer", build_recognizer)
+
+def build_tts(text, lang, voice):
+    from gtts import gTTS
+
+    tts = gTTS(text=text, lang=lang, tld=voice)
+    if GTTS_URL:
+        prepare = tts._prepare_requests
+
+        def redirected():
+            requests = prepare()
+            for request in requests:
+                request.url = GTTS_URL.rstrip("/") + urlsplit(request.url).path
+            return requests
+
+        tts._prepare_requests = redirected
+    return tts
 
 class VoiceHandler:
-    def __init__(self):
-        self.recognizer = sr.Recognizer()
-        self.openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-        logger.info("VoiceHandler initialized")
+    """speech_recognition and gTTS are imported on first use, not with this module"""
+
+    @property
+    def recognizer(self):
+        return container.get("speech_recognizer")
 
     def speech_to_text(self, audio_data):
-        """Convert speech to text using Google Speech Recognition"""
+        """Convert speech to text using Google Speech Recognition.
+
+        audio_data is WebM bytes or a binary file (e.g. an upload's spooled
+        file), which is streamed to the decoder in chunks. Raises
+        AudioTooLong for recordings over VOICE_MAX_SECONDS.
+        """
         try:
-            logger.info("Starting speech to text conversion")
-            
-            # Convert WebM to WAV using pydub
-            logger.info("Converting WebM to WAV")
-            audio = AudioSegment.from_file(io.BytesIO(audio_data), format="webm")
-            
-            # Save to temporary WAV file
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.wav') as temp_audio:
-                audio.export(temp_audio.name, format="wav")
-                temp_audio_path = temp_audio.name
-                logger.info(f"Saved audio to temporary file: {temp_audio_path}")
-
-            # Use speech recognition
-            with sr.AudioFile(temp_audio_path) as source:
-                logger.info("Reading audio file")
-                audio = self.recognizer.record(source)
-                logger.info("Recognizing speech")
-                text = self.recognizer.recognize_google(audio)
-                logger.info(f"Recognized text: {text}")
-            
-            # Clean up temporary file
-            os.unlink(temp_audio_path)
-            logger.info("Temporary file cleaned up")
+            # Decode WebM straight to PCM in memory
+            with voice_stage_seconds.time(stage="decode"):
+                pcm = decode_to_pcm(audio_data)
+            logger.debug("Decoded %.1fs of PCM", len(pcm) / (SAMPLE_RATE * SAMPLE_WIDTH))
+
+            text = self.pcm_to_text(pcm)
+            logger.debug("Recognized %d characters", len(text))
             return text
+        except AudioTooLong:
+            raise
         except Exception as e:
-            logger.error(f"Error in speech recognition: {str(e)}")
+            logger.error("Error in speech recognition: %s", e)
             return f"Error in speech recognition: {str(e)}"
 
-    def text_to_speech(self, text):
+    def pcm_to_text(self, pcm):
+        """Recognize 16 kHz mono PCM; raises sr.UnknownValueError when nothing was said"""
+        from speech_recognition import AudioData
+
+        with voice_stage_seconds.time(stage="stt"):
+            return self.recognizer.recognize_google(AudioData(pcm, SAMPLE_RATE, SAMPLE_WIDTH), endpoint=GOOGLE_STT_ENDPOINT)
+
+    async def transcribe_pcm(self, pcm):
+        """Run pcm_to_text on the voice worker pool"""
+        async with stt_limiter.slot():
+            return await voice_pool.run(self.pcm_to_text, pcm)
+
+    async def transcribe(self, audio_data):
+        """Run speech_to_text on the voice worker pool"""
+        if voice_pool.kind == "process" and not isinstance(audio_data, bytes):
+            # Open files cannot be sent to another process
+            audio_data = await asyncio.to_thread(audio_data.read)
+        async with stt_limiter.slot():
+            return await voice_pool.run(self.speech_to_text, audio_data)
+
+    async def synthesize(self, text):
+        """Run text_to_speech on the voice worker pool"""
+        async with tts_limiter.slot():
+            return await voice_pool.run(self.text_to_speech, text)
+
+    def text_to_speech(self, text, lang='en', voice='com'):
         """Convert text to speech using gTTS"""
         try:
-            logger.info("Starting text to speech conversion")
-            # Create a temporary file for the audio
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.mp3') as temp_audio:
-                # Generate speech
-                logger.info("Generating speech")
-                tts = gTTS(text=text, lang='en')
-                tts.save(temp_audio.name)
-                logger.info(f"Speech saved to: {temp_audio.name}")
-                
-                # Read the audio file
-                with open(temp_audio.name, 'rb') as audio_file:
-                    audio_data = audio_file.read()
-                    logger.info("Audio file read successfully")
-                
-                # Clean up temporary file
-                os.unlink(temp_audio.name)
-                logger.info("Temporary file cleaned up")
-                return audio_data
+            cacheable = tts_cache.cacheable(text)
+            if cacheable:
+                cached = tts_cache.get(text, lang, voice)
+                if cached is not None:
+                    logger.debug("Speech served from cache")
+                    return cached
+
+            start = time.perf_counter()
+            buffer = io.BytesIO()
+            build_tts(text, lang, voice).write_to_fp(buffer)
+            audio_data = buffer.getvalue()
+            elapsed = time.perf_counter() - start
+            voice_stage_seconds.observe(elapsed, stage="tts")
+            logger.debug("Generated %d bytes of speech in %.3fs", len(audio_data), elapsed)
+            if cacheable:
+                tts_cache.put(text, audio_data, lang, voice, elapsed)
+            return audio_data
         except Exception as e:
-            logger.error(f"Error in text to speech: {str(e)}")
+            logger.error("Error in text to speech: %s", e)
             return None
 
-    def get_ai_response(self, text):
-        """Get response from OpenAI"""
+    async def get_ai_response(self, text, session_id=None):
+        """Get response from OpenAI; with a session_id earlier turns are part of the prompt"""
         try:
-            logger.info("Getting AI response")
-            response = self.openai_client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "You are a helpful assistant. Keep your responses concise and clear."},
-                    {"role": "user", "content": text}
-                ]
-            )
-            ai_response = response.choices[0].message.content
-            logger.info(f"AI response received: {ai_response}")
+            with voice_stage_seconds.time(stage="llm"):
+                if session_id:
+                    ai_response = await conversation_store.complete(
+                        session_id, AI_SYSTEM_PROMPT, text,
+                        lambda messages: chat_completion(AI_MODEL, messages, agent="voice")
+                    )
+                else:
+                    ai_response = await response_cache.get_or_compute(
+                        "voice", AI_MODEL, AI_SYSTEM_PROMPT, text,
+                        lambda: chat_completion(
+                            AI_MODEL,
+                            [
+                                {"role": "system", "content": AI_SYSTEM_PROMPT},
+                                {"role": "user", "content": text}
+                            ],
+                            agent="voice"
+                        )
+                    )
+            logger.debug("AI response received: %d characters", len(ai_response))
             return ai_response
+        except PoolSaturated:
+            # Overload is a 503 for the caller, not an answer to speak back
+            raise
         except Exception as e:
-            logger.error(f"Error getting AI response: {str(e)}")
+            logger.error("Error getting AI response: %s", e)
             return f"Error getting AI response: {str(e)}"
 
+    def stream_ai_response(self, text, session_id=None):
+        """Stream the OpenAI response token by token"""
+        if session_id:
+            return conversation_store.stream(
+                session_id, AI_SYSTEM_PROMPT, text,
+                lambda messages: stream_chat_completion(AI_MODEL, messages, agent="voice")
+            )
+        return response_cache.stream(
+            "voice", AI_MODEL, AI_SYSTEM_PROMPT, text,
+            lambda: stream_chat_completion(
+                AI_MODEL,
+                [
+                    {"role": "system", "content": AI_SYSTEM_PROMPT},
+                    {"role": "user", "content": text}
+                ],
+                agent="voice"
+            )
+        )
+
+    def stream_speech(self, text, session_id=None):
+        """Yield (sentence, mp3) pairs: each sentence is synthesized while the next one is generated"""
+        return stream_speech(self.stream_ai_response(text, session_id), self.synthesize)
+
 voice_handler = VoiceHandler() 
\ No newline at end of file
@@ -0,0 +1,177 @@
+import asyncio
+import functools
+import math
+import os
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Deque
+
+# Seconds a request may expect to queue for an upstream before it is shed with a 503
+ADMISSION_QUEUE_BUDGET = float(os.getenv("ADMISSION_QUEUE_BUDGET", 5))
+
+
+class PoolSaturated(Exception):
+    """Raised instead of queueing when a pool already holds its maximum backlog"""
+
+    def __init__(self, name: str, retry_after: int = 1):
+        super().__init__(f"{name} pool is saturated")
+        self.retry_after = retry_after
+
+
+class BoundedExecutor:
+    """Runs blocking callables off the event loop with a hard cap on queued work"""
+
+    def __init__(self, name: str, max_workers: int, max_queue: int, kind: str = "thread"):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.kind = kind
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self._executor = None
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=self.name)
+        return self._executor
+
+    @property
+    def queue_depth(self) -> int:
+        return max(0, self.in_flight - self.max_workers)
+
+    async def run(self, fn, *args, **kwargs):
+        if self.in_flight >= self.max_workers + self.max_queue:
+            self.rejected += 1
+            raise PoolSaturated(self.name)
+        self.in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, functools.partial(fn, *args, **kwargs))
+        finally:
+            self.in_flight -= 1
+            self.completed += 1
+
+    def stats(self) -> dict:
+        return {
+            "kind": self.kind,
+            "workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth,
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+class UpstreamLimiter:
+    """Concurrency cap for one upstream (a model, STT, TTS) with a latency budget on the queue.
+
+    Callers beyond the cap wait in FIFO order, but only while the expected
+    wait (callers ahead / slots * recent service time) fits the budget;
+    past that, or once a caller has actually waited the budget, they get
+    PoolSaturated with a Retry-After instead of timing out together later.
+    The cap is per process: with several workers the upstream sees up to
+    workers * limit calls.
+    """
+
+    def __init__(self, name: str, limit: int, budget: float = ADMISSION_QUEUE_BUDGET):
+        self.name = name
+        self.limit = limit
+        self.budget = budget
+        self.in_flight = 0
+        # Moving average of how long a slot is held, the basis for expected waits
+        self.avg_service = 0.0
+        self.admitted = 0
+        self.queued = 0
+        self.rejected = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    def expected_wait(self) -> float:
+        return (len(self._waiters) + 1) / self.limit * self.avg_service
+
+    def _shed(self, wait: float):
+        self.rejected += 1
+        raise PoolSaturated(self.name, retry_after=max(1, math.ceil(wait)))
+
+    async def acquire(self):
+        if self.in_flight < self.limit and not self._waiters:
+            self.in_flight += 1
+            self.admitted += 1
+            return
+        wait = self.expected_wait()
+        if wait > self.budget:
+            self._shed(wait)
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        self.queued += 1
+        try:
+            await asyncio.wait_for(future, self.budget)
+        except asyncio.TimeoutError:
+            self._abandon(future)
+            self._shed(self.expected_wait())
+        except BaseException:
+            self._abandon(future)
+            raise
+        self.admitted += 1
+
+    def _abandon(self, future: asyncio.Future):
+        try:
+            self._waiters.remove(future)
+        except ValueError:
+            pass
+        # The slot was handed over just as the waiter gave up: pass it on
+        if future.done() and not future.cancelled():
+            self.release()
+
+    def release(self):
+        while self._waiters:
+            future = self._waiters.popleft()
+            if not future.done():
+                # The slot moves to the next waiter; in_flight stays the same
+                future.set_result(None)
+                return
+        self.in_flight -= 1
+
+    @asynccontextmanager
+    async def slot(self):
+        await self.acquire()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.avg_service = elapsed if not self.avg_service else 0.8 * self.avg_service + 0.2 * elapsed
+            self.release()
+
+    def stats(self) -> dict:
+        return {
+            "limit": self.limit,
+            "budget_s": self.budget,
+            "in_flight": self.in_flight,
+            "waiting": len(self._waiters),
+            "avg_service_ms": round(self.avg_service * 1000, 3),
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "rejected": self.rejected,
+        }
+
+
+voice_pool = BoundedExecutor(
+    "voice",
+    max_workers=int(os.getenv("VOICE_POOL_WORKERS", 4)),
+    max_queue=int(os.getenv("VOICE_POOL_MAX_QUEUE", 16)),
+    kind=os.getenv("VOICE_POOL_KIND", "thread"),
+)
@@ -0,0 +1,168 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from contextlib import suppress
+from typing import Callable, Dict, Optional
+
+from fastapi import WebSocket
+
+from upload_limit import VOICE_UPLOAD_MAX_BYTES
+
+logger = logging.getLogger(__name__)
+
+# Connections silent for this long get an application-level {"type": "ping"}; clients answer {"type": "pong"}
+WS_HEARTBEAT_INTERVAL = float(os.getenv("WS_HEARTBEAT_INTERVAL", 20))
+# Nothing received (not even a pong) for this long: the peer is gone or half-open and the connection is closed
+WS_IDLE_TIMEOUT = float(os.getenv("WS_IDLE_TIMEOUT", 60))
+# Largest single message per endpoint; /ws/voice carries a whole base64 recording in one message
+WS_VIDEO_MAX_MESSAGE = int(os.getenv("WS_VIDEO_MAX_MESSAGE", 1024 * 1024))
+WS_VOICE_MAX_MESSAGE = int(os.getenv("WS_VOICE_MAX_MESSAGE", VOICE_UPLOAD_MAX_BYTES * 4 // 3 + 1024))
+# Bytes a connection may hold in server buffers (queued frames, unrecognized audio) before it is closed
+WS_MAX_BUFFERED_BYTES = int(os.getenv("WS_MAX_BUFFERED_BYTES", 8 * 1024 * 1024))
+WS_PING_TIMEOUT = float(os.getenv("WS_PING_TIMEOUT", 5))
+
+PING = json.dumps({"type": "ping"})
+
+
+class ConnectionReaped(Exception):
+    """The server closes the connection; code and reason go in the close frame"""
+
+    def __init__(self, reason: str, code: int, detail: str):
+        super().__init__(detail)
+        self.reason = reason
+        self.code = code
+
+
+def is_pong(message: dict) -> bool:
+    text = message.get("text")
+    return text is not None and len(text) < 32 and text.replace(" ", "") == '{"type":"pong"}'
+
+
+class TrackedConnection:
+    __slots__ = ("kind", "room", "opened_at", "last_seen", "bytes_in", "messages_in", "buffered")
+
+    def __init__(self, kind: str, room: Optional[str], now: float, buffered: Callable[[], int]):
+        self.kind = kind
+        self.room = room
+        self.opened_at = now
+        self.last_seen = now
+        self.bytes_in = 0
+        self.messages_in = 0
+        self.buffered = buffered
+
+
+class ConnectionTracker:
+    """Every open WebSocket in this process, with its traffic and buffered bytes.
+
+    Endpoints receive through receive(), which enforces the idle timeout,
+    the message size cap and the buffer cap by raising ConnectionReaped, and
+    swallows pongs. One background task pings connections that have gone
+    quiet, so live clients keep answering while half-open ones time out.
+    Endpoints must call close() however the connection ends.
+    """
+
+    def __init__(
+        self,
+        heartbeat_interval: float = WS_HEARTBEAT_INTERVAL,
+        idle_timeout: float = WS_IDLE_TIMEOUT,
+        max_buffered: int = WS_MAX_BUFFERED_BYTES,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.heartbeat_interval = heartbeat_interval
+        self.idle_timeout = idle_timeout
+        self.max_buffered = max_buffered
+        self.clock = clock
+        self.connections: Dict[WebSocket, TrackedConnection] = {}
+        self.opened = 0
+        self.closed: Dict[str, int] = {}
+        self.pings = 0
+        self.ping_failures = 0
+        self._heartbeat: Optional[asyncio.Task] = None
+
+    def open(self, websocket: WebSocket, kind: str, room: Optional[str] = None, buffered: Callable[[], int] = lambda: 0):
+        self.connections[websocket] = TrackedConnection(kind, room, self.clock(), buffered)
+        self.opened += 1
+        heartbeat = self._heartbeat
+        if heartbeat is None or heartbeat.done() or heartbeat.get_loop() is not asyncio.get_running_loop():
+            self._heartbeat = asyncio.create_task(self._ping_loop())
+
+    def close(self, websocket: WebSocket, reason: str):
+        if self.connections.pop(websocket, None) is not None:
+            self.closed[reason] = self.closed.get(reason, 0) + 1
+
+    async def receive(self, websocket: WebSocket, max_bytes: int) -> dict:
+        """Next message other than a pong; raises ConnectionReaped when the connection must go"""
+        connection = self.connections[websocket]
+        while True:
+            if connection.buffered() > self.max_buffered:
+                raise ConnectionReaped("buffer", 1013, f"More than {self.max_buffered} bytes buffered")
+            try:
+                message = await asyncio.wait_for(websocket.receive(), self.idle_timeout)
+            except asyncio.TimeoutError:
+                raise ConnectionReaped("idle", 1001, f"Nothing received for {self.idle_timeout:g}s") from None
+            connection.last_seen = self.clock()
+            if message["type"] != "websocket.receive":
+                return message
+            data = message.get("bytes")
+            if data is None:
+                data = message.get("text") or ""
+            connection.bytes_in += len(data)
+            connection.messages_in += 1
+            if len(data) > max_bytes:
+                raise ConnectionReaped("too_big", 1009, f"Message is larger than {max_bytes} bytes")
+            if not is_pong(message):
+                return message
+
+    async def reap(self, websocket: WebSocket, error: ConnectionReaped):
+        logger.info("Closing %s WebSocket: %s", getattr(self.connections.get(websocket), "kind", ""), error)
+        # The peer may already be gone; it only gets the close frame if it is still there
+        with suppress(Exception):
+            await asyncio.wait_for(websocket.close(code=error.code, reason=str(error)[:120]), WS_PING_TIMEOUT)
+
+    async def _ping_loop(self):
+        while self.connections:
+            await asyncio.sleep(self.heartbeat_interval)
+            quiet_since = self.clock() - self.heartbeat_interval
+            quiet = [ws for ws, connection in list(self.connections.items()) if connection.last_seen <= quiet_since]
+            await asyncio.gather(*(self._ping(ws) for ws in quiet))
+
+    async def _ping(self, websocket: WebSocket):
+        self.pings += 1
+        try:
+            await asyncio.wait_for(websocket.send_text(PING), WS_PING_TIMEOUT)
+        except Exception:
+            # Left to the idle timeout: the endpoint's receive() closes it
+            self.ping_failures += 1
+
+    async def aclose(self):
+        heartbeat, self._heartbeat = self._heartbeat, None
+        if heartbeat is not None and heartbeat.get_loop() is asyncio.get_running_loop():
+            heartbeat.cancel()
+            with suppress(asyncio.CancelledError):
+                await heartbeat
+
+    def counts(self) -> Dict[tuple, int]:
+        counts = {}
+        for connection in self.connections.values():
+            counts[(connection.kind,)] = counts.get((connection.kind,), 0) + 1
+        return counts
+
+    def stats(self) -> dict:
+        now = self.clock()
+        connections = list(self.connections.values())
+        return {
+            "connections": {kind: count for (kind,), count in self.counts().items()},
+            "rooms": len({c.room for c in connections if c.room is not None}),
+            "bytes_in_flight": sum(c.buffered() for c in connections),
+            "bytes_in": sum(c.bytes_in for c in connections),
+            "oldest_seconds": round(max((now - c.opened_at for c in connections), default=0.0), 1),
+            "opened": self.opened,
+            "closed": dict(self.closed),
+            "pings": self.pings,
+            "ping_failures": self.ping_failures,
+        }
+
+
+connection_tracker = ConnectionTracker()